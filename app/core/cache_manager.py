@@ -1,5 +1,8 @@
 import hashlib
+import mmap
+import os
 import pickle
+import tempfile
 from typing import Any, Optional, Callable
 from cachetools import TTLCache
 from functools import wraps
@@ -7,6 +10,8 @@ import sympy as sp
 import time
 import logging
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 class CacheManager:
@@ -24,16 +29,9 @@ class CacheManager:
         """
         Gera uma chave única baseada na função e parâmetros.
         """
-        # Serializar argumentos de forma consistente
-        cache_data = {
-            'function': func_name,
-            'args': args,
-            'kwargs': sorted(kwargs.items()) if kwargs else {}
-        }
-        
-        # Criar hash MD5 da representação dos dados
-        cache_str = str(cache_data)
-        return hashlib.md5(cache_str.encode()).hexdigest()
+        # Tupla serializada com repr + blake2b (mais rápido que dict + str + md5)
+        cache_data = (func_name, args, tuple(sorted(kwargs.items())) if kwargs else ())
+        return hashlib.blake2b(repr(cache_data).encode(), digest_size=16).hexdigest()
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -79,9 +77,134 @@ class CacheManager:
         self.hit_count = 0
         self.miss_count = 0
 
+class SharedPayloadCache:
+    """
+    Cache de payloads serializados em arquivos (tmpfs), compartilhado entre workers.
+    """
+    
+    def __init__(self, directory: str = "", ttl: int = 3600, enabled: bool = True,
+                 max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "integramente_cache")
+        self.ttl = ttl
+        self.enabled = enabled
+        # O diretório costuma ficar em /dev/shm (RAM): limitar entradas e bytes
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        
+        if self.enabled:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Cache compartilhado desabilitado: {str(e)}")
+                self.enabled = False
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Lê payload via mmap; retorna None se ausente ou expirado.
+        """
+        if not self.enabled:
+            return None
+        
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                if time.time() - os.fstat(f.fileno()).st_mtime > self.ttl:
+                    os.remove(path)
+                    return None
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return mm[:]
+        except (OSError, ValueError):
+            return None
+    
+    def set(self, key: str, payload: bytes) -> None:
+        """
+        Grava payload de forma atômica (arquivo temporário + rename) e aplica os limites.
+        """
+        if not self.enabled or len(payload) > self.max_bytes:
+            return
+        
+        try:
+            # Prefixo "." marca temporários em escrita, ignorados pela varredura
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.debug(f"Falha ao gravar cache compartilhado: {str(e)}")
+            return
+        
+        self._varrer()
+    
+    def _varrer(self) -> None:
+        """
+        Remove arquivos expirados e, acima dos limites, os mais antigos por mtime.
+        """
+        agora = time.time()
+        arquivos = []
+        try:
+            with os.scandir(self.directory) as entradas:
+                for entrada in entradas:
+                    if entrada.name.startswith('.'):
+                        continue
+                    try:
+                        info = entrada.stat()
+                    except OSError:
+                        continue
+                    if agora - info.st_mtime > self.ttl:
+                        self._remover(entrada.path)
+                    else:
+                        arquivos.append((info.st_mtime, info.st_size, entrada.path))
+        except OSError:
+            return
+        
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        if len(arquivos) <= self.max_entries and total <= self.max_bytes:
+            return
+        
+        arquivos.sort()
+        restantes = len(arquivos)
+        for _, tamanho, path in arquivos:
+            if restantes <= self.max_entries and total <= self.max_bytes:
+                break
+            self._remover(path)
+            restantes -= 1
+            total -= tamanho
+    
+    @staticmethod
+    def _remover(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def clear(self) -> None:
+        """
+        Remove todos os payloads do cache compartilhado.
+        """
+        if not self.enabled:
+            return
+        
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
 # Instância global do cache
 cache_manager = CacheManager()
 
+# Cache compartilhado entre workers para payloads grandes (gráficos 3D)
+shared_payload_cache = SharedPayloadCache(
+    directory=settings.shared_cache_dir,
+    ttl=settings.cache_ttl,
+    enabled=settings.shared_cache_enabled,
+    max_entries=settings.shared_cache_max_entries,
+    max_bytes=settings.shared_cache_max_mb * 1024 * 1024
+)
+
 def cached_calculation(cache_key_func: Optional[Callable] = None):
     """
     Decorator para cache automático de cálculos matemáticos.
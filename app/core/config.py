@@ -26,9 +26,13 @@ class Settings(BaseSettings):
     cache_enabled: bool = True
     cache_size: int = 1000
     cache_ttl: int = 3600  # 1 hora
+    shared_cache_enabled: bool = True  # Cache de payloads compartilhado entre workers
+    shared_cache_dir: str = "/dev/shm/integramente_cache" if os.path.isdir("/dev/shm") else ""
+    shared_cache_max_entries: int = 1000  # Limites do cache compartilhado (fica em RAM no /dev/shm)
+    shared_cache_max_mb: int = 64
     
     # Configurações de performance
-    enable_numba_jit: bool = False  # Desabilitado para Python 3.13
+    enable_numba_jit: bool = False  # Requer numba instalado (opcional, indisponível no Python 3.13)
     parallel_processing: bool = True
     max_workers: int = min(4, (os.cpu_count() or 1))
     
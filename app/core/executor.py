@@ -0,0 +1,80 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import threading
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pool para os cálculos SymPy das rotas async (evita bloquear o event loop)
+_POOL: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def iniciar_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """
+    Cria o pool de cálculo (chamado na inicialização da aplicação).
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = concurrent.futures.ThreadPoolExecutor(
+                max_workers=settings.max_workers, thread_name_prefix='calculo'
+            )
+            logger.info(f"Pool de cálculo iniciado com {settings.max_workers} workers")
+        return _POOL
+
+def encerrar_pool():
+    """
+    Finaliza o pool de cálculo (chamado no desligamento da aplicação).
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+# Pool de processos para trabalho numérico pesado (integração por painéis)
+_POOL_PROCESSOS: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+def iniciar_pool_processos() -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Cria o pool de processos (chamado na inicialização da aplicação).
+    """
+    global _POOL_PROCESSOS
+    with _POOL_LOCK:
+        if _POOL_PROCESSOS is None:
+            # fork a partir do servidor multi-thread pode herdar locks travados
+            metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _POOL_PROCESSOS = concurrent.futures.ProcessPoolExecutor(
+                max_workers=settings.max_workers, mp_context=multiprocessing.get_context(metodo)
+            )
+            logger.info(f"Pool de processos iniciado com {settings.max_workers} workers ({metodo})")
+        return _POOL_PROCESSOS
+
+def encerrar_pool_processos():
+    """
+    Finaliza o pool de processos (chamado no desligamento da aplicação).
+    """
+    global _POOL_PROCESSOS
+    with _POOL_LOCK:
+        if _POOL_PROCESSOS is not None:
+            _POOL_PROCESSOS.shutdown(wait=False, cancel_futures=True)
+            _POOL_PROCESSOS = None
+
+def obter_pool_processos() -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Retorna o pool de processos, criando-o se a aplicação ainda não o iniciou.
+    """
+    return _POOL_PROCESSOS or iniciar_pool_processos()
+
+async def executar_em_pool(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Executa func(*args, **kwargs) no pool de cálculo e aguarda o resultado.
+    """
+    pool = _POOL or iniciar_pool()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
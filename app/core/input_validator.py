@@ -41,6 +41,11 @@ class AdvancedInputValidator:
         r'\\x[0-9a-fA-F]{2}',  # Caracteres hexadecimais
     ]
     
+    # Todos os padrões suspeitos combinados em uma única regex (varredura única)
+    _SUSPICIOUS_COMBINED = re.compile(
+        '|'.join(f'(?:{p})' for p in SUSPICIOUS_PATTERNS), re.IGNORECASE
+    )
+    
     # Funções matemáticas permitidas
     ALLOWED_FUNCTIONS = {
         'sin', 'cos', 'tan', 'sec', 'csc', 'cot',
@@ -64,9 +69,13 @@ class AdvancedInputValidator:
     ALLOWED_CONSTANTS = {'pi', 'e', 'I', 'oo', 'inf'}
     
     @staticmethod
-    def validate_function_input(input_str: str, max_length: int = 500) -> ValidationResult:
+    def validate_function_input(input_str: str, max_length: int = 500,
+                                pre_scanned: bool = False) -> ValidationResult:
         """
         Valida entrada de função matemática.
+        
+        pre_scanned=True indica que a entrada já passou pela varredura combinada
+        de padrões suspeitos sem nenhuma ocorrência.
         """
         issues = []
         warnings = []
@@ -85,11 +94,12 @@ class AdvancedInputValidator:
         # Limpar entrada básica
         cleaned = input_str.strip()
         
-        # Verificar padrões suspeitos
-        for pattern in AdvancedInputValidator.SUSPICIOUS_PATTERNS:
-            if re.search(pattern, cleaned, re.IGNORECASE):
-                issues.append(f"Padrão suspeito detectado: {pattern}")
-                security_score -= 50
+        # Verificar padrões suspeitos (detalhar padrão a padrão só se houver ocorrência)
+        if not pre_scanned and AdvancedInputValidator._SUSPICIOUS_COMBINED.search(cleaned):
+            for pattern in AdvancedInputValidator.SUSPICIOUS_PATTERNS:
+                if re.search(pattern, cleaned, re.IGNORECASE):
+                    issues.append(f"Padrão suspeito detectado: {pattern}")
+                    security_score -= 50
         
         # Verificar caracteres não ASCII suspeitos
         if not all(ord(c) < 127 for c in cleaned):
@@ -137,6 +147,30 @@ class AdvancedInputValidator:
             recommendations=recommendations
         )
     
+    @staticmethod
+    def validate_function_inputs(inputs: List[str],
+                                 max_length: int = 500) -> Tuple[Optional[int], List[ValidationResult]]:
+        """
+        Valida várias funções (ex.: componentes de campo vetorial) com uma única
+        varredura de padrões suspeitos. Retorna o índice da primeira função inválida
+        (ou None) e os resultados validados até ela.
+        """
+        # Varredura combinada sobre o buffer concatenado; uma ocorrência que cruze o
+        # delimitador apenas força a verificação individual, nunca gera falso negativo
+        buffer = '\x00'.join(s.strip() for s in inputs)
+        pre_scanned = AdvancedInputValidator._SUSPICIOUS_COMBINED.search(buffer) is None
+        
+        results = []
+        for index, input_str in enumerate(inputs):
+            result = AdvancedInputValidator.validate_function_input(
+                input_str, max_length, pre_scanned=pre_scanned
+            )
+            results.append(result)
+            if not result.is_valid:
+                return index, results
+        
+        return None, results
+    
     @staticmethod
     def validate_numeric_input(value: Any, min_val: float = None, max_val: float = None,
                              param_name: str = "valor") -> ValidationResult:
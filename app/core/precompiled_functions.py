@@ -0,0 +1,61 @@
+import numpy as np
+import sympy as sp
+from typing import Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Funções de exemplo (ExemplosService) implementadas diretamente em NumPy
+# (dispensam lambdify nos caminhos numéricos e de gráfico)
+_FUNCOES_COMUNS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'x': lambda x: x,
+    'x^2': lambda x: x * x,
+    'x^3': lambda x: x * x * x,
+    '2*x': lambda x: 2 * x,
+    'x^2 + 3*x': lambda x: x * (x + 3),
+    'x^3 - 2*x + 1': lambda x: x * x * x - 2 * x + 1,
+    'sin(x)': np.sin,
+    'cos(x)': np.cos,
+    'tan(x)': np.tan,
+    'sin(x)^2': lambda x: np.sin(x) ** 2,
+    'cos(2*x)': lambda x: np.cos(2 * x),
+    'sin(x)*cos(x)': lambda x: np.sin(x) * np.cos(x),
+    'exp(x)': np.exp,
+    '2^x': np.exp2,
+    'exp(-x)': lambda x: np.exp(-x),
+    'x*exp(x)': lambda x: x * np.exp(x),
+    'exp(x^2)': lambda x: np.exp(x * x),
+    'log(x)': np.log,
+    'log(x^2)': lambda x: np.log(x * x),
+    'x*log(x)': lambda x: x * np.log(x),
+    'log(x)/x': lambda x: np.log(x) / x,
+    'sqrt(x)': np.sqrt,
+    'sqrt(x^2 + 1)': lambda x: np.sqrt(x * x + 1),
+    'x*sqrt(x)': lambda x: x * np.sqrt(x),
+    '1/sqrt(x)': lambda x: 1 / np.sqrt(x),
+    'sqrt(1 - x^2)': lambda x: np.sqrt(1 - x * x),
+    '1/x': lambda x: 1 / x,
+    '1/x^2': lambda x: 1 / (x * x),
+    'x/(x^2 + 1)': lambda x: x / (x * x + 1),
+    '(x + 1)/(x - 1)': lambda x: (x + 1) / (x - 1),
+    'x^2/(x + 1)': lambda x: x * x / (x + 1),
+}
+
+def _construir_tabela() -> Dict[str, Callable[[np.ndarray], np.ndarray]]:
+    """
+    Indexa as funções pela forma canônica (srepr) da expressão SymPy.
+    """
+    x = sp.Symbol('x', real=True)
+    tabela = {}
+    for funcao_str, func in _FUNCOES_COMUNS.items():
+        expr = sp.sympify(funcao_str.replace('^', '**'), locals={'x': x})
+        tabela[sp.srepr(expr)] = func
+    return tabela
+
+PRECOMPILED_FUNCTIONS = _construir_tabela()
+
+def get_precompiled_function(expr_srepr: str) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """
+    Retorna a implementação NumPy pré-definida para o srepr da expressão, se existir.
+    """
+    return PRECOMPILED_FUNCTIONS.get(expr_srepr)
@@ -0,0 +1,50 @@
+import numpy as np
+import sympy as sp
+from typing import Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Superfícies mais requisitadas, implementadas diretamente em NumPy
+# (dispensam sympify + lambdify no caminho quente)
+_SUPERFICIES_COMUNS: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    'x**2 + y**2': lambda x, y: x * x + y * y,
+    'x**2 - y**2': lambda x, y: x * x - y * y,
+    'x*y': lambda x, y: x * y,
+    'x + y': lambda x, y: x + y,
+    'sqrt(x**2 + y**2)': lambda x, y: np.sqrt(x * x + y * y),
+    'exp(-(x**2 + y**2))': lambda x, y: np.exp(-(x * x + y * y)),
+    'sin(x**2 + y**2)': lambda x, y: np.sin(x * x + y * y),
+    'cos(x**2 + y**2)': lambda x, y: np.cos(x * x + y * y),
+    'sin(sqrt(x**2 + y**2))': lambda x, y: np.sin(np.sqrt(x * x + y * y)),
+    'sin(x)*cos(y)': lambda x, y: np.sin(x) * np.cos(y),
+    'cos(x)*sin(y)': lambda x, y: np.cos(x) * np.sin(y),
+    'sin(x) + cos(y)': lambda x, y: np.sin(x) + np.cos(y),
+    'sin(x*y)': lambda x, y: np.sin(x * y),
+    'cos(x*y)': lambda x, y: np.cos(x * y),
+    'sin(x)': lambda x, y: np.sin(x) + 0 * y,
+    'cos(y)': lambda x, y: np.cos(y) + 0 * x,
+    'x**3 - 3*x*y**2': lambda x, y: x * x * x - 3 * x * y * y,
+    'x*exp(-(x**2 + y**2))': lambda x, y: x * np.exp(-(x * x + y * y)),
+    'log(x**2 + y**2 + 1)': lambda x, y: np.log(x * x + y * y + 1),
+}
+
+def _construir_tabela() -> Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]]:
+    """
+    Indexa as superfícies pela forma canônica (srepr) da expressão SymPy.
+    """
+    tabela = {}
+    for funcao_str, func in _SUPERFICIES_COMUNS.items():
+        tabela[sp.srepr(sp.sympify(funcao_str))] = func
+    return tabela
+
+PRECOMPILED_SURFACES = _construir_tabela()
+
+def get_precompiled_surface(expr: sp.Expr) -> Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]]:
+    """
+    Retorna a implementação NumPy pré-definida para a expressão, se existir.
+    """
+    try:
+        return PRECOMPILED_SURFACES.get(sp.srepr(expr))
+    except Exception:
+        return None
@@ -1,5 +1,17 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Optional, List, Tuple, Union
+
+# Ordem da derivada por nome; formas numéricas ("2", "4a", "n4") são convertidas direto
+_ORDEM_MAP = {"primeira": 1, "segunda": 2, "terceira": 3, "quarta": 4, "quinta": 5}
+
+def ordem_da_derivada(tipo_derivada: Union[str, int]) -> int:
+    """
+    Converte o tipo de derivada (nome, número ou int) na ordem inteira.
+    """
+    if isinstance(tipo_derivada, int):
+        return tipo_derivada
+    tipo = tipo_derivada.strip().lower()
+    return _ORDEM_MAP.get(tipo) or int(tipo.strip("na") or 1)
 
 class AreaRequest(BaseModel):
     funcao: str = Field(..., description="Função matemática em formato string")
@@ -13,6 +25,16 @@ class AreaRequest(BaseModel):
             raise ValueError('Função não pode estar vazia')
         return v.strip()
 
+class AreaBatchRequest(BaseModel):
+    funcao: str = Field(..., description="Função matemática em formato string")
+    intervalos: List[Tuple[float, float]] = Field(..., description="Lista de intervalos [a, b]", min_length=1, max_length=100)
+    
+    @validator('funcao')
+    def validar_funcao_nao_vazia(cls, v):
+        if not v.strip():
+            raise ValueError('Função não pode estar vazia')
+        return v.strip()
+
 class SimbolicoRequest(BaseModel):
     funcao: str = Field(..., description="Função matemática em formato string")
     a: Optional[float] = Field(None, description="Limite inferior (opcional para integral definida)")
@@ -46,6 +68,21 @@ class DerivadaRequest(BaseModel):
         if not v.strip():
             raise ValueError('Função não pode estar vazia')
         return v.strip()
+    
+    @validator('tipo_derivada')
+    def validar_tipo_derivada(cls, v):
+        v = (v or "primeira").strip().lower()
+        try:
+            ordem = ordem_da_derivada(v)
+        except ValueError:
+            raise ValueError('Tipo de derivada inválido (use primeira, segunda, terceira ou um número)')
+        if not 1 <= ordem <= 10:
+            raise ValueError('Ordem da derivada deve estar entre 1 e 10')
+        return v
+    
+    @property
+    def ordem(self) -> int:
+        return ordem_da_derivada(self.tipo_derivada)
 
 class LimiteRequest(BaseModel):
     funcao: str = Field(..., description="Função matemática em formato string")
@@ -6,6 +6,20 @@ class PontoGrafico(BaseModel):
     x: float
     y: float
 
+    @classmethod
+    def de_arrays(cls, xs, ys) -> List["PontoGrafico"]:
+        """
+        Materializa os pontos a partir de arrays x/y (valores já validados como floats finitos).
+        """
+        return [cls.model_construct(x=xv, y=yv) for xv, yv in zip(xs.tolist(), ys.tolist())]
+
+class PontosGraficoColunar(BaseModel):
+    """
+    Pontos do gráfico em formato colunar ({"x": [...], "y": [...]}).
+    """
+    x: List[float]
+    y: List[float]
+
 class AreaResponse(BaseModel):
     sucesso: bool
     valor_integral: Optional[float] = None
@@ -18,6 +32,13 @@ class AreaResponse(BaseModel):
     calculado_em: Optional[str] = None
     erro: Optional[str] = None
 
+class AreaBatchResponse(BaseModel):
+    sucesso: bool
+    valores_integral: Optional[List[float]] = None
+    erro_estimado: Optional[float] = None
+    funcao_formatada: Optional[str] = None
+    erro: Optional[str] = None
+
 class CalculoSimbolicoResponse(BaseModel):
     sucesso: bool
     antiderivada: Optional[str] = None
@@ -33,6 +54,7 @@ class ValidarResponse(BaseModel):
     funcao_simplificada: Optional[str] = None
     mensagem: str
     erro: Optional[str] = None
+    info_adicional: Optional[Dict[str, Any]] = None
 
 class ExemplosResponse(BaseModel):
     exemplos: Dict[str, List[str]]
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException
-from app.models.requests import AreaRequest
-from app.models.responses import AreaResponse
+from app.models.requests import AreaRequest, AreaBatchRequest
+from app.models.responses import AreaResponse, AreaBatchResponse, PontoGrafico
 from app.services.math_service import MathService
 from app.services.enhanced_math_service import EnhancedMathService
 from app.core.performance_monitor import performance_monitor
 from app.core.cache_manager import cache_manager
+from app.core.executor import executar_em_pool
 
 router = APIRouter()
 
@@ -15,8 +16,10 @@ async def calcular_area(request: AreaRequest):
     """
     with performance_monitor.measure_calculation("area_calculation", request.funcao):
         try:
-            # Validar função com serviço aprimorado
-            valida, expr, mensagem, analise = EnhancedMathService.validar_e_processar_funcao_avancada(request.funcao)
+            # Validar função com serviço aprimorado (no pool, fora do event loop)
+            valida, expr, mensagem, analise = await executar_em_pool(
+                EnhancedMathService.validar_e_processar_funcao_avancada, request.funcao
+            )
             if not valida:
                 return AreaResponse(
                     sucesso=False,
@@ -33,13 +36,15 @@ async def calcular_area(request: AreaRequest):
                 performance_monitor.mark_cache_hit(request.funcao)
                 return cached_result
             
-            # Calcular integral numérica com método avançado
-            valor_integral, erro_estimado, info_calculo = EnhancedMathService.calcular_integral_numerica_avancada(
+            # Calcular integral numérica com método avançado (pode esperar o pool de processos)
+            valor_integral, erro_estimado, info_calculo = await executar_em_pool(
+                EnhancedMathService.calcular_integral_numerica_avancada,
                 expr, request.a, request.b, tolerancia=1e-10
             )
             
             # Gerar gráfico otimizado
-            grafico_base64, pontos_grafico, info_grafico = EnhancedMathService.gerar_grafico_otimizado(
+            grafico_base64, x_pontos, y_pontos, info_grafico = await executar_em_pool(
+                EnhancedMathService.gerar_grafico_otimizado,
                 expr, request.a, request.b, request.resolucao
             )
             
@@ -50,7 +55,7 @@ async def calcular_area(request: AreaRequest):
                 area_total=abs(valor_integral),  # Área sempre positiva
                 erro_estimado=erro_estimado,
                 grafico_base64=grafico_base64,
-                pontos_grafico=pontos_grafico,
+                pontos_grafico=PontoGrafico.de_arrays(x_pontos, y_pontos),
                 funcao_formatada=str(expr),
                 intervalo={"a": request.a, "b": request.b},
                 calculado_em=MathService.obter_timestamp(),
@@ -74,4 +79,34 @@ async def calcular_area(request: AreaRequest):
             return AreaResponse(
                 sucesso=False,
                 erro=f"Erro no cálculo da área: {str(e)}"
-            ) 
\ No newline at end of file
+            )
+
+@router.post("/area/batch", response_model=AreaBatchResponse)
+async def calcular_areas_batch(request: AreaBatchRequest):
+    """
+    Calcula a integral da mesma função em vários intervalos de uma só vez.
+    """
+    with performance_monitor.measure_calculation("area_batch_calculation", request.funcao):
+        try:
+            valida, expr, mensagem, _ = EnhancedMathService.validar_e_processar_funcao_avancada(request.funcao)
+            if not valida:
+                return AreaBatchResponse(
+                    sucesso=False,
+                    erro=mensagem
+                )
+            
+            valores, erro_estimado = MathService.calcular_integrais_batch(expr, request.intervalos)
+            
+            return AreaBatchResponse(
+                sucesso=True,
+                valores_integral=valores.tolist(),
+                erro_estimado=erro_estimado,
+                funcao_formatada=str(expr),
+                erro=None
+            )
+            
+        except Exception as e:
+            return AreaBatchResponse(
+                sucesso=False,
+                erro=f"Erro no cálculo das áreas: {str(e)}"
+            )
@@ -5,6 +5,7 @@ from app.services.math_service import MathService
 from app.services.enhanced_math_service import EnhancedMathService
 from app.core.performance_monitor import performance_monitor
 from app.core.cache_manager import cache_manager
+from app.core.executor import executar_em_pool
 
 router = APIRouter()
 
@@ -26,8 +27,10 @@ async def calcular_derivada(request: DerivadaRequest):
                 performance_monitor.mark_cache_hit(request.funcao)
                 return cached_result
             
-            # Validar função com análise avançada
-            valida, expr, mensagem, analise = EnhancedMathService.validar_e_processar_funcao_avancada(request.funcao)
+            # Validar função com análise avançada (no pool, fora do event loop)
+            valida, expr, mensagem, analise = await executar_em_pool(
+                EnhancedMathService.validar_e_processar_funcao_avancada, request.funcao
+            )
             if not valida:
                 return CalculoDerivadaResponse(
                     sucesso=False,
@@ -35,8 +38,8 @@ async def calcular_derivada(request: DerivadaRequest):
                 )
             
             # Calcular derivada com método avançado
-            resultado_derivada = EnhancedMathService.calcular_derivada_avancada(
-                expr, request.tipo_derivada
+            resultado_derivada = await executar_em_pool(
+                EnhancedMathService.calcular_derivada_avancada, expr, request.ordem
             )
             
             # Gerar passos se solicitado
@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Response
+import orjson
 from app.models.requests import GraficoRequest
-from app.models.responses import GraficoResponse
+from app.models.responses import GraficoResponse, PontoGrafico, PontosGraficoColunar
 from app.services.math_service import MathService
 from app.services.enhanced_math_service import EnhancedMathService
 from app.core.performance_monitor import performance_monitor
@@ -9,7 +10,9 @@ from app.core.cache_manager import cache_manager
 router = APIRouter()
 
 @router.post("/grafico", response_model=GraficoResponse)
-async def gerar_grafico(request: GraficoRequest):
+async def gerar_grafico(request: GraficoRequest,
+                        estilo: str = Query("matplotlib", pattern="^(matplotlib|rapido)$",
+                                            description="matplotlib (completo) ou rapido (rasterização direta)")):
     """
     Gera gráfico otimizado com detecção de singularidades e renderização adaptativa.
     """
@@ -17,7 +20,7 @@ async def gerar_grafico(request: GraficoRequest):
         try:
             # Verificar cache primeiro
             cache_key = cache_manager.generate_cache_key(
-                "grafico_generation", request.funcao, request.a, request.b, request.resolucao
+                "grafico_generation", request.funcao, request.a, request.b, request.resolucao, estilo
             )
             cached_result = cache_manager.get(cache_key)
             
@@ -34,15 +37,15 @@ async def gerar_grafico(request: GraficoRequest):
                 )
             
             # Gerar gráfico otimizado
-            grafico_base64, pontos_grafico, info_grafico = EnhancedMathService.gerar_grafico_otimizado(
-                expr, request.a, request.b, request.resolucao
+            grafico_base64, x_pontos, y_pontos, info_grafico = EnhancedMathService.gerar_grafico_otimizado(
+                expr, request.a, request.b, request.resolucao, estilo
             )
             
             # Criar resposta
             resposta = GraficoResponse(
                 sucesso=True,
                 grafico_base64=grafico_base64,
-                pontos_grafico=pontos_grafico,
+                pontos_grafico=PontoGrafico.de_arrays(x_pontos, y_pontos),
                 erro=None
             )
             
@@ -64,4 +67,49 @@ async def gerar_grafico(request: GraficoRequest):
             return GraficoResponse(
                 sucesso=False,
                 erro=f"Erro ao gerar gráfico: {str(e)}"
-            ) 
\ No newline at end of file
+            )
+
+@router.post("/grafico/pontos", response_model=PontosGraficoColunar)
+async def gerar_pontos_grafico(request: GraficoRequest):
+    """
+    Retorna apenas os pontos do gráfico em formato colunar ({"x": [...], "y": [...]}).
+    """
+    with performance_monitor.measure_calculation("grafico_pontos", request.funcao):
+        valida, expr, mensagem, _ = EnhancedMathService.validar_e_processar_funcao_avancada(request.funcao)
+        if not valida:
+            raise HTTPException(status_code=400, detail=mensagem)
+        
+        try:
+            x_vals, y_vals = MathService.gerar_pontos_grafico_colunar(
+                expr, request.a, request.b, request.resolucao
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Arrays serializados diretamente pelo orjson (sem objeto Python por ponto)
+        return Response(
+            content=orjson.dumps({'x': x_vals, 'y': y_vals}, option=orjson.OPT_SERIALIZE_NUMPY),
+            media_type="application/json"
+        )
+
+
+@router.post("/grafico/png", response_class=Response,
+             responses={200: {"content": {"image/png": {}}}})
+async def gerar_grafico_png(request: GraficoRequest,
+                            estilo: str = Query("matplotlib", pattern="^(matplotlib|rapido)$")):
+    """
+    Retorna o gráfico como image/png cru (sem base64 nem JSON).
+    """
+    with performance_monitor.measure_calculation("grafico_png", request.funcao):
+        valida, expr, mensagem, _ = EnhancedMathService.validar_e_processar_funcao_avancada(request.funcao)
+        if not valida:
+            raise HTTPException(status_code=400, detail=mensagem)
+        
+        try:
+            png, _, _, _ = EnhancedMathService.gerar_grafico_png(
+                expr, request.a, request.b, request.resolucao, estilo
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return Response(content=png, media_type="image/png")
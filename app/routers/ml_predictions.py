@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Tuple, Any, Dict
-from app.services.ml_prediction_service import ml_prediction_service
+from app.services.ml_prediction_service import get_ml_prediction_service, canonizar_funcao
 from app.core.performance_monitor import performance_monitor
 from app.core.cache_manager import cache_manager
 from app.core.input_validator import input_validator
@@ -59,16 +59,20 @@ async def analisar_funcao_completa(request: FunctionAnalysisRequest):
             )
         
         # Verificar cache
-        cache_key = cache_manager.generate_cache_key("ml_analysis", request.funcao)
+        cache_key = cache_manager.generate_cache_key("ml_analysis", canonizar_funcao(request.funcao))
         cached_result = cache_manager.get(cache_key)
         
         if cached_result:
             performance_monitor.mark_cache_hit(request.funcao)
+            # Chave canônica: devolver a grafia desta requisição, sem alterar o cacheado
+            if cached_result.analise_completa:
+                analise = {**cached_result.analise_completa, 'function': validation.cleaned_input}
+                return cached_result.model_copy(update={'analise_completa': analise})
             return cached_result
         
         try:
             # Realizar análise completa
-            analysis = ml_prediction_service.analyze_function_behavior(validation.cleaned_input)
+            analysis = get_ml_prediction_service().analyze_function_behavior(validation.cleaned_input)
             
             if 'error' not in analysis:
                 response = FunctionAnalysisResponse(
@@ -110,7 +114,7 @@ async def predizer_dificuldade_integracao(request: IntegrationDifficultyRequest)
             )
         
         # Verificar cache
-        cache_key = cache_manager.generate_cache_key("ml_integration_difficulty", request.funcao)
+        cache_key = cache_manager.generate_cache_key("ml_integration_difficulty", canonizar_funcao(request.funcao))
         cached_result = cache_manager.get(cache_key)
         
         if cached_result:
@@ -119,7 +123,7 @@ async def predizer_dificuldade_integracao(request: IntegrationDifficultyRequest)
         
         try:
             # Predizer dificuldade
-            prediction = ml_prediction_service.predict_integration_difficulty(validation.cleaned_input)
+            prediction = await get_ml_prediction_service().predict_integration_difficulty_async(validation.cleaned_input)
             
             # Gerar recomendações baseadas na predição
             recomendacoes = []
@@ -189,7 +193,7 @@ async def predizer_tempo_computacao(request: ComputationTimeRequest):
         
         # Verificar cache
         cache_key = cache_manager.generate_cache_key(
-            "ml_computation_time", request.funcao, request.metodo, request.a, request.b
+            "ml_computation_time", canonizar_funcao(request.funcao), request.metodo, request.a, request.b
         )
         cached_result = cache_manager.get(cache_key)
         
@@ -199,7 +203,7 @@ async def predizer_tempo_computacao(request: ComputationTimeRequest):
         
         try:
             # Predizer tempo
-            prediction = ml_prediction_service.predict_computation_time(
+            prediction = get_ml_prediction_service().predict_computation_time(
                 validation.cleaned_input, 
                 request.metodo,
                 (request.a, request.b)
@@ -268,7 +272,7 @@ async def predizer_resolucao_otima(request: ResolutionOptimizationRequest):
         
         # Verificar cache
         cache_key = cache_manager.generate_cache_key(
-            "ml_optimal_resolution", request.funcao, request.a, request.b
+            "ml_optimal_resolution", canonizar_funcao(request.funcao), request.a, request.b
         )
         cached_result = cache_manager.get(cache_key)
         
@@ -278,7 +282,7 @@ async def predizer_resolucao_otima(request: ResolutionOptimizationRequest):
         
         try:
             # Predizer resolução ótima
-            prediction = ml_prediction_service.predict_optimal_resolution(
+            prediction = get_ml_prediction_service().predict_optimal_resolution(
                 validation.cleaned_input,
                 (request.a, request.b)
             )
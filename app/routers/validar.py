@@ -1,15 +1,16 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks
 from app.models.requests import ValidarRequest
 from app.models.responses import ValidarResponse
 from app.services.math_service import MathService
 from app.services.enhanced_math_service import EnhancedMathService
 from app.core.performance_monitor import performance_monitor
 from app.core.cache_manager import cache_manager
+from app.routers.visualization_3d import aquecer_superficie
 
 router = APIRouter()
 
 @router.post("/validar", response_model=ValidarResponse)
-async def validar_funcao(request: ValidarRequest):
+async def validar_funcao(request: ValidarRequest, background_tasks: BackgroundTasks):
     """
     Valida uma função matemática com análise de complexidade e otimizações avançadas.
     """
@@ -47,16 +48,13 @@ async def validar_funcao(request: ValidarRequest):
                     valida=True,
                     funcao_simplificada=str(expr),
                     mensagem=mensagem_detalhada,
-                    erro=None
-                )
-                
-                # Adicionar informações de análise se disponíveis
-                if hasattr(resposta, 'info_adicional'):
-                    resposta.info_adicional = {
+                    erro=None,
+                    info_adicional={
                         'analise_complexidade': analise,
                         'funcao_original': request.funcao,
                         'recomendacoes': _gerar_recomendacoes_validacao(analise)
                     }
+                )
             else:
                 resposta = ValidarResponse(
                     valida=False,
@@ -68,6 +66,10 @@ async def validar_funcao(request: ValidarRequest):
             # Cachear resultado
             cache_manager.set(cache_key, resposta)
             
+            # Aquecer cache do gráfico 3D enquanto o usuário lê a validação
+            if valida:
+                background_tasks.add_task(aquecer_superficie, request.funcao)
+            
             return resposta
             
         except Exception as e:
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional, Tuple, Any, Dict
+from functools import lru_cache
+import asyncio
+import sympy as sp
 from app.services.visualization_3d_service import visualization_3d_service
 from app.core.performance_monitor import performance_monitor
-from app.core.cache_manager import cache_manager
+from app.core.cache_manager import cache_manager, shared_payload_cache
 from app.core.input_validator import input_validator
+from app.core.executor import executar_em_pool
+from app.core.config import settings
 
 router = APIRouter(prefix="/3d", tags=["Visualização 3D"])
 
@@ -67,7 +72,47 @@ class GradientFieldRequest(BaseModel):
     y_max: float = Field(3, description="Valor máximo de y")
     densidade: int = Field(15, ge=5, le=25, description="Densidade do campo")
 
-# Modelo de resposta
+@lru_cache(maxsize=4096)
+def _parse(funcao_str: str) -> sp.Expr:
+    """
+    Parse memoizado compartilhado entre os endpoints 3D.
+    """
+    return sp.sympify(funcao_str.replace('^', '**'))
+
+def aquecer_superficie(funcao: str) -> None:
+    """
+    Aquece os caches de parse e de compilação usados por /surface (sem gerar a figura).
+    """
+    validation = input_validator.validate_function_input(funcao)
+    if not validation.is_valid:
+        return
+    
+    try:
+        expr = _parse(validation.cleaned_input)
+    except Exception:
+        return
+    
+    # Só funções de (x, y) que de fato dependem de y viram superfície
+    simbolos = {str(s) for s in expr.free_symbols}
+    if 'y' not in simbolos or not simbolos <= {'x', 'y'}:
+        return
+    
+    visualization_3d_service.precompilar_superficie(expr)
+
+def _argumentos_superficie(request: SurfacePlotRequest, expr: sp.Expr) -> Dict[str, Any]:
+    """
+    Argumentos de create_surface_plot para uma requisição de /surface.
+    """
+    return dict(
+        function_str=expr,
+        x_range=(request.x_min, request.x_max),
+        y_range=(request.y_min, request.y_max),
+        resolution=request.resolucao,
+        colorscale=request.esquema_cor,
+        title=request.titulo
+    )
+
+# Modelo de resposta (respostas de sucesso usam model_construct: dados vindos do serviço já são confiáveis)
 class Visualization3DResponse(BaseModel):
     sucesso: bool
     plotly_json: Optional[str] = None
@@ -77,11 +122,62 @@ class Visualization3DResponse(BaseModel):
     info_adicional: Optional[Dict[str, Any]] = None
     erro: Optional[str] = None
 
+async def _gerar_no_pool(metodo, **kwargs) -> Dict[str, Any]:
+    """
+    Executa o método do serviço 3D no pool de cálculo, com tempo limite.
+    """
+    # wait_for não interrompe a thread do pool: após o timeout o cálculo segue
+    # ocupando o worker até terminar, e o resultado é descartado
+    try:
+        return await asyncio.wait_for(
+            executar_em_pool(metodo, **kwargs), timeout=settings.calculation_timeout
+        )
+    except asyncio.TimeoutError:
+        return {
+            'success': False,
+            'error': f"Tempo limite de {settings.calculation_timeout}s excedido"
+        }
+
+def _buscar_cache(cache_key: str) -> Optional[Any]:
+    """
+    Busca no cache em memória e, em seguida, no cache compartilhado entre workers.
+    """
+    cached_result = cache_manager.get(cache_key)
+    if cached_result:
+        return cached_result
+    
+    payload = shared_payload_cache.get(cache_key)
+    if payload is not None:
+        return Response(content=payload, media_type="application/json")
+    
+    return None
+
+def _armazenar_cache(cache_key: str, response: Visualization3DResponse) -> None:
+    """
+    Armazena a resposta nos caches; falhas e timeouts não são cacheados.
+    """
+    if not response.sucesso:
+        return
+    
+    cache_manager.set(cache_key, response)
+    shared_payload_cache.set(cache_key, response.model_dump_json().encode())
+
 @router.post("/surface", response_model=Visualization3DResponse)
 async def criar_superficie_3d(request: SurfacePlotRequest):
     """
     Cria gráfico de superfície 3D para função de duas variáveis.
     """
+    # Verificar cache antes de medir: cache hits não passam pelo monitor
+    cache_key = cache_manager.generate_cache_key(
+        "surface_3d", request.funcao, request.x_min, request.x_max,
+        request.y_min, request.y_max, request.resolucao, request.esquema_cor
+    )
+    cached_result = _buscar_cache(cache_key)
+    
+    if cached_result:
+        performance_monitor.mark_cache_hit(request.funcao)
+        return cached_result
+    
     with performance_monitor.measure_calculation("surface_3d", request.funcao):
         # Validar entrada
         validation = input_validator.validate_function_input(request.funcao)
@@ -91,30 +187,18 @@ async def criar_superficie_3d(request: SurfacePlotRequest):
                 erro=f"Função inválida: {', '.join(validation.issues)}"
             )
         
-        # Verificar cache
-        cache_key = cache_manager.generate_cache_key(
-            "surface_3d", request.funcao, request.x_min, request.x_max,
-            request.y_min, request.y_max, request.resolucao, request.esquema_cor
-        )
-        cached_result = cache_manager.get(cache_key)
-        
-        if cached_result:
-            performance_monitor.mark_cache_hit(request.funcao)
-            return cached_result
-        
         try:
+            # A resolução pedida é o teto; o serviço a reduz para superfícies suaves
+            argumentos = _argumentos_superficie(request, _parse(validation.cleaned_input))
+            resolucao = argumentos['resolution']
+            
             # Gerar superfície 3D
-            result = visualization_3d_service.create_surface_plot(
-                function_str=validation.cleaned_input,
-                x_range=(request.x_min, request.x_max),
-                y_range=(request.y_min, request.y_max),
-                resolution=request.resolucao,
-                colorscale=request.esquema_cor,
-                title=request.titulo
+            result = await _gerar_no_pool(
+                visualization_3d_service.create_surface_plot, **argumentos
             )
             
             if result['success']:
-                response = Visualization3DResponse(
+                response = Visualization3DResponse.model_construct(
                     sucesso=True,
                     plotly_json=result['plotly_json'],
                     tipo_grafico=result['plot_type'],
@@ -123,7 +207,7 @@ async def criar_superficie_3d(request: SurfacePlotRequest):
                     info_adicional={
                         'interactive': result.get('interactive', True),
                         'colorscale': request.esquema_cor,
-                        'resolution': request.resolucao
+                        'resolution': result.get('resolution', resolucao)
                     }
                 )
             else:
@@ -133,7 +217,7 @@ async def criar_superficie_3d(request: SurfacePlotRequest):
                 )
             
             # Cachear resultado
-            cache_manager.set(cache_key, response)
+            _armazenar_cache(cache_key, response)
             return response
             
         except Exception as e:
@@ -147,6 +231,17 @@ async def criar_contorno_3d(request: ContourPlotRequest):
     """
     Cria gráfico de contorno 3D com linhas de nível.
     """
+    # Verificar cache
+    cache_key = cache_manager.generate_cache_key(
+        "contour_3d", request.funcao, request.x_min, request.x_max,
+        request.y_min, request.y_max, request.niveis, request.resolucao
+    )
+    cached_result = _buscar_cache(cache_key)
+    
+    if cached_result:
+        performance_monitor.mark_cache_hit(request.funcao)
+        return cached_result
+    
     with performance_monitor.measure_calculation("contour_3d", request.funcao):
         # Validar entrada
         validation = input_validator.validate_function_input(request.funcao)
@@ -156,20 +251,10 @@ async def criar_contorno_3d(request: ContourPlotRequest):
                 erro=f"Função inválida: {', '.join(validation.issues)}"
             )
         
-        # Verificar cache
-        cache_key = cache_manager.generate_cache_key(
-            "contour_3d", request.funcao, request.x_min, request.x_max,
-            request.y_min, request.y_max, request.niveis, request.resolucao
-        )
-        cached_result = cache_manager.get(cache_key)
-        
-        if cached_result:
-            performance_monitor.mark_cache_hit(request.funcao)
-            return cached_result
-        
         try:
-            result = visualization_3d_service.create_contour_3d(
-                function_str=validation.cleaned_input,
+            result = await _gerar_no_pool(
+                visualization_3d_service.create_contour_3d,
+                function_str=_parse(validation.cleaned_input),
                 x_range=(request.x_min, request.x_max),
                 y_range=(request.y_min, request.y_max),
                 z_levels=request.niveis,
@@ -177,7 +262,7 @@ async def criar_contorno_3d(request: ContourPlotRequest):
             )
             
             if result['success']:
-                response = Visualization3DResponse(
+                response = Visualization3DResponse.model_construct(
                     sucesso=True,
                     plotly_json=result['plotly_json'],
                     tipo_grafico=result['plot_type'],
@@ -193,7 +278,7 @@ async def criar_contorno_3d(request: ContourPlotRequest):
                     erro=result['error']
                 )
             
-            cache_manager.set(cache_key, response)
+            _armazenar_cache(cache_key, response)
             return response
             
         except Exception as e:
@@ -207,34 +292,34 @@ async def criar_campo_vetorial_3d(request: VectorFieldRequest):
     """
     Cria visualização de campo vetorial 3D.
     """
+    # Verificar cache
+    cache_key = cache_manager.generate_cache_key(
+        "vector_field_3d", request.fx, request.fy, request.fz, request.x_min, request.x_max,
+        request.y_min, request.y_max, request.z_min, request.z_max, request.densidade
+    )
+    cached_result = _buscar_cache(cache_key)
+    
+    if cached_result:
+        performance_monitor.mark_cache_hit(f"{request.fx},{request.fy},{request.fz}")
+        return cached_result
+    
     with performance_monitor.measure_calculation("vector_field_3d", f"{request.fx},{request.fy},{request.fz}"):
-        # Validar todas as componentes
-        validations = []
-        for func_str in [request.fx, request.fy, request.fz]:
-            validation = input_validator.validate_function_input(func_str)
-            if not validation.is_valid:
-                return Visualization3DResponse(
-                    sucesso=False,
-                    erro=f"Função inválida '{func_str}': {', '.join(validation.issues)}"
-                )
-            validations.append(validation.cleaned_input)
-        
-        # Verificar cache
-        cache_key = cache_manager.generate_cache_key(
-            "vector_field_3d", *validations, request.x_min, request.x_max,
-            request.y_min, request.y_max, request.z_min, request.z_max, request.densidade
-        )
-        cached_result = cache_manager.get(cache_key)
-        
-        if cached_result:
-            performance_monitor.mark_cache_hit(f"{request.fx},{request.fy},{request.fz}")
-            return cached_result
+        # Validar todas as componentes em uma única passada
+        componentes = [request.fx, request.fy, request.fz]
+        invalida, resultados = input_validator.validate_function_inputs(componentes)
+        if invalida is not None:
+            return Visualization3DResponse(
+                sucesso=False,
+                erro=f"Função inválida '{componentes[invalida]}': {', '.join(resultados[invalida].issues)}"
+            )
+        validations = [r.cleaned_input for r in resultados]
         
         try:
-            result = visualization_3d_service.create_vector_field_3d(
-                fx_str=validations[0],
-                fy_str=validations[1],
-                fz_str=validations[2],
+            result = await _gerar_no_pool(
+                visualization_3d_service.create_vector_field_3d,
+                fx_str=_parse(validations[0]),
+                fy_str=_parse(validations[1]),
+                fz_str=_parse(validations[2]),
                 x_range=(request.x_min, request.x_max),
                 y_range=(request.y_min, request.y_max),
                 z_range=(request.z_min, request.z_max),
@@ -242,7 +327,7 @@ async def criar_campo_vetorial_3d(request: VectorFieldRequest):
             )
             
             if result['success']:
-                response = Visualization3DResponse(
+                response = Visualization3DResponse.model_construct(
                     sucesso=True,
                     plotly_json=result['plotly_json'],
                     tipo_grafico=result['plot_type'],
@@ -257,7 +342,7 @@ async def criar_campo_vetorial_3d(request: VectorFieldRequest):
                     erro=result['error']
                 )
             
-            cache_manager.set(cache_key, response)
+            _armazenar_cache(cache_key, response)
             return response
             
         except Exception as e:
@@ -273,41 +358,41 @@ async def criar_superficie_parametrica(request: ParametricSurfaceRequest):
     """
     functions_str = f"{request.x_func},{request.y_func},{request.z_func}"
     
+    # Verificar cache
+    cache_key = cache_manager.generate_cache_key(
+        "parametric_surface", request.x_func, request.y_func, request.z_func, request.u_min, request.u_max,
+        request.v_min, request.v_max, request.resolucao
+    )
+    cached_result = _buscar_cache(cache_key)
+    
+    if cached_result:
+        performance_monitor.mark_cache_hit(functions_str)
+        return cached_result
+    
     with performance_monitor.measure_calculation("parametric_surface", functions_str):
-        # Validar todas as funções paramétricas
-        validations = []
-        for func_str in [request.x_func, request.y_func, request.z_func]:
-            validation = input_validator.validate_function_input(func_str)
-            if not validation.is_valid:
-                return Visualization3DResponse(
-                    sucesso=False,
-                    erro=f"Função paramétrica inválida '{func_str}': {', '.join(validation.issues)}"
-                )
-            validations.append(validation.cleaned_input)
-        
-        # Verificar cache
-        cache_key = cache_manager.generate_cache_key(
-            "parametric_surface", *validations, request.u_min, request.u_max,
-            request.v_min, request.v_max, request.resolucao
-        )
-        cached_result = cache_manager.get(cache_key)
-        
-        if cached_result:
-            performance_monitor.mark_cache_hit(functions_str)
-            return cached_result
+        # Validar todas as funções paramétricas em uma única passada
+        componentes = [request.x_func, request.y_func, request.z_func]
+        invalida, resultados = input_validator.validate_function_inputs(componentes)
+        if invalida is not None:
+            return Visualization3DResponse(
+                sucesso=False,
+                erro=f"Função paramétrica inválida '{componentes[invalida]}': {', '.join(resultados[invalida].issues)}"
+            )
+        validations = [r.cleaned_input for r in resultados]
         
         try:
-            result = visualization_3d_service.create_parametric_surface(
-                x_func=validations[0],
-                y_func=validations[1],
-                z_func=validations[2],
+            result = await _gerar_no_pool(
+                visualization_3d_service.create_parametric_surface,
+                x_func=_parse(validations[0]),
+                y_func=_parse(validations[1]),
+                z_func=_parse(validations[2]),
                 u_range=(request.u_min, request.u_max),
                 v_range=(request.v_min, request.v_max),
                 resolution=request.resolucao
             )
             
             if result['success']:
-                response = Visualization3DResponse(
+                response = Visualization3DResponse.model_construct(
                     sucesso=True,
                     plotly_json=result['plotly_json'],
                     tipo_grafico=result['plot_type'],
@@ -323,7 +408,7 @@ async def criar_superficie_parametrica(request: ParametricSurfaceRequest):
                     erro=result['error']
                 )
             
-            cache_manager.set(cache_key, response)
+            _armazenar_cache(cache_key, response)
             return response
             
         except Exception as e:
@@ -337,6 +422,17 @@ async def criar_volume_integracao(request: IntegrationVolumeRequest):
     """
     Visualiza volume sob uma superfície (integral dupla).
     """
+    # Verificar cache
+    cache_key = cache_manager.generate_cache_key(
+        "integration_volume", request.funcao, request.x_min, request.x_max,
+        request.y_min, request.y_max, request.mostrar_volume, request.resolucao
+    )
+    cached_result = _buscar_cache(cache_key)
+    
+    if cached_result:
+        performance_monitor.mark_cache_hit(request.funcao)
+        return cached_result
+    
     with performance_monitor.measure_calculation("integration_volume", request.funcao):
         # Validar função
         validation = input_validator.validate_function_input(request.funcao)
@@ -353,20 +449,10 @@ async def criar_volume_integracao(request: IntegrationVolumeRequest):
                 erro="Limites de integração inválidos"
             )
         
-        # Verificar cache
-        cache_key = cache_manager.generate_cache_key(
-            "integration_volume", request.funcao, request.x_min, request.x_max,
-            request.y_min, request.y_max, request.mostrar_volume, request.resolucao
-        )
-        cached_result = cache_manager.get(cache_key)
-        
-        if cached_result:
-            performance_monitor.mark_cache_hit(request.funcao)
-            return cached_result
-        
         try:
-            result = visualization_3d_service.create_integration_volume_3d(
-                function_str=validation.cleaned_input,
+            result = await _gerar_no_pool(
+                visualization_3d_service.create_integration_volume_3d,
+                function_str=_parse(validation.cleaned_input),
                 x_range=(request.x_min, request.x_max),
                 y_range=(request.y_min, request.y_max),
                 show_volume=request.mostrar_volume,
@@ -374,7 +460,7 @@ async def criar_volume_integracao(request: IntegrationVolumeRequest):
             )
             
             if result['success']:
-                response = Visualization3DResponse(
+                response = Visualization3DResponse.model_construct(
                     sucesso=True,
                     plotly_json=result['plotly_json'],
                     tipo_grafico=result['plot_type'],
@@ -391,7 +477,7 @@ async def criar_volume_integracao(request: IntegrationVolumeRequest):
                     erro=result['error']
                 )
             
-            cache_manager.set(cache_key, response)
+            _armazenar_cache(cache_key, response)
             return response
             
         except Exception as e:
@@ -405,6 +491,17 @@ async def criar_campo_gradiente(request: GradientFieldRequest):
     """
     Visualiza campo gradiente de uma função escalar.
     """
+    # Verificar cache
+    cache_key = cache_manager.generate_cache_key(
+        "gradient_field", request.funcao, request.x_min, request.x_max,
+        request.y_min, request.y_max, request.densidade
+    )
+    cached_result = _buscar_cache(cache_key)
+    
+    if cached_result:
+        performance_monitor.mark_cache_hit(request.funcao)
+        return cached_result
+    
     with performance_monitor.measure_calculation("gradient_field", request.funcao):
         # Validar função
         validation = input_validator.validate_function_input(request.funcao)
@@ -414,27 +511,17 @@ async def criar_campo_gradiente(request: GradientFieldRequest):
                 erro=f"Função inválida: {', '.join(validation.issues)}"
             )
         
-        # Verificar cache
-        cache_key = cache_manager.generate_cache_key(
-            "gradient_field", request.funcao, request.x_min, request.x_max,
-            request.y_min, request.y_max, request.densidade
-        )
-        cached_result = cache_manager.get(cache_key)
-        
-        if cached_result:
-            performance_monitor.mark_cache_hit(request.funcao)
-            return cached_result
-        
         try:
-            result = visualization_3d_service.create_gradient_field(
-                function_str=validation.cleaned_input,
+            result = await _gerar_no_pool(
+                visualization_3d_service.create_gradient_field,
+                function_str=_parse(validation.cleaned_input),
                 x_range=(request.x_min, request.x_max),
                 y_range=(request.y_min, request.y_max),
                 density=request.densidade
             )
             
             if result['success']:
-                response = Visualization3DResponse(
+                response = Visualization3DResponse.model_construct(
                     sucesso=True,
                     plotly_json=result['plotly_json'],
                     tipo_grafico=result['plot_type'],
@@ -450,7 +537,7 @@ async def criar_campo_gradiente(request: GradientFieldRequest):
                     erro=result['error']
                 )
             
-            cache_manager.set(cache_key, response)
+            _armazenar_cache(cache_key, response)
             return response
             
         except Exception as e:
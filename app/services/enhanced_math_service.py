@@ -1,29 +1,198 @@
+import re
 import sympy as sp
 import numpy as np
 from scipy import integrate
 from scipy.integrate import quad, dblquad
 # romberg foi removido do SciPy recente
 import mpmath
-# from numba import jit, njit  # Removido para compatibilidade com Python 3.13
+# numba é opcional (pode não estar disponível no Python 3.13)
+try:
+    from numba import cfunc, njit
+    from scipy import LowLevelCallable
+    NUMBA_DISPONIVEL = True
+except ImportError:
+    NUMBA_DISPONIVEL = False
 from typing import Tuple, List, Optional, Dict, Any, Union
 import base64
 import io
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+# Estilo aplicado só nos gráficos deste serviço (plt.style.use alteraria o rcParams global)
+_ESTILO_GRAFICO = 'seaborn-v0_8'
 from datetime import datetime
 import warnings
 import concurrent.futures
 import time
 import logging
+import threading
+from functools import lru_cache
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations
+from cachetools import LRUCache
 
-from app.models.responses import PontoGrafico
 from app.core.config import settings
+from app.services.png_renderer import renderizar_grafico_png
+from app.core.precompiled_functions import get_precompiled_function
+from app.models.requests import ordem_da_derivada
 from app.core.cache_manager import cached_calculation, expression_cache_key, cache_manager
+from app.core.executor import obter_pool_processos
 
 logger = logging.getLogger(__name__)
 warnings.filterwarnings('ignore', category=RuntimeWarning)
 
+# Variável simbólica compartilhada (mesmas suposições em parsing, cálculo e avaliação)
+_X = sp.Symbol('x', real=True)
+
+# Parser montado uma vez ('^' já convertido e espaços removidos na normalização)
+_LOCALS = {'x': _X}
+_TRANS = standard_transformations
+
+# Classes de operações usadas na análise de complexidade
+_TRIGONOMETRICAS = (sp.sin, sp.cos, sp.tan, sp.sec, sp.csc, sp.cot)
+_EXPONENCIAIS = (sp.exp, sp.sinh, sp.cosh, sp.tanh)
+
+# Categoria por classe concreta do nó; subclasses (Integer, Half, One...) são
+# resolvidas na primeira ocorrência e memorizadas
+_OP_BUCKET: Dict[type, Optional[str]] = {}
+_OP_BUCKET.update(dict.fromkeys(_TRIGONOMETRICAS, 'trigonometricas'))
+_OP_BUCKET.update(dict.fromkeys(_EXPONENCIAIS, 'exponenciais'))
+_OP_BUCKET.update({sp.log: 'logaritmicas', sp.Pow: 'potencias', sp.Rational: 'racionais'})
+_OP_BASES = tuple(_OP_BUCKET.items())
+
+def _categoria_no(t: type) -> Optional[str]:
+    """
+    Retorna a categoria de operação da classe de um nó (None se não classificada).
+    """
+    try:
+        return _OP_BUCKET[t]
+    except KeyError:
+        categoria = next((cat for cls, cat in _OP_BASES if issubclass(t, cls)), None)
+        _OP_BUCKET[t] = categoria
+        return categoria
+
+# Substituições de nomes de funções aplicadas em um único passe de regex;
+# os limites de palavra evitam reescrever 'e' dentro de 'sec', 'exp' etc.
+_SUBSTITUICOES = {
+    'ln': 'log',
+    'e': 'E',
+    'sen': 'sin',
+    'tg': 'tan',
+    'arcsin': 'asin',
+    'arccos': 'acos',
+    'arctan': 'atan',
+    'arctg': 'atan',
+    'abs': 'Abs'
+}
+_SUBSTITUICOES_RE = re.compile(r'\b(' + '|'.join(_SUBSTITUICOES) + r')\b')
+
+# Precisão do evalf quando o resultado será convertido para float
+_DIGITOS_FLOAT64 = 17
+
+# Expressões já validadas indexadas pela string normalizada (após substituições)
+_PARSE_CACHE = LRUCache(maxsize=1024)
+_PARSE_LOCK = threading.Lock()
+
+# Abaixo desta complexidade o sp.simplify é dispensado
+_COMPLEXIDADE_SEM_SIMPLIFY = 20
+
+# Funções lambdificadas indexadas por (srepr da expressão, backend)
+_LAMBDIFY_CACHE = LRUCache(maxsize=512)
+_LAMBDIFY_LOCK = threading.Lock()
+
+def _lambdify_cached(expr: sp.Expr, backend: str = 'numpy'):
+    """
+    Retorna sp.lambdify(x, expr, backend) reaproveitando compilações anteriores.
+    """
+    chave = (sp.srepr(expr), backend)
+    with _LAMBDIFY_LOCK:
+        func = _LAMBDIFY_CACHE.get(chave)
+    
+    if func is None:
+        # Funções de exemplo já possuem implementação NumPy pronta
+        func = get_precompiled_function(chave[0]) if backend == 'numpy' else None
+        if func is None:
+            func = sp.lambdify(_X, expr, backend)
+        with _LAMBDIFY_LOCK:
+            _LAMBDIFY_CACHE[chave] = func
+    
+    return func
+
+# Figura reaproveitada por thread (evita recriar Figure/Axes/canvas a cada gráfico)
+_FIGURAS = threading.local()
+
+def _obter_figura() -> Tuple[Figure, Any]:
+    """
+    Retorna a figura da thread atual com os eixos limpos, criando-a na primeira chamada.
+    """
+    tamanho = (settings.graph_width, settings.graph_height)
+    fig = getattr(_FIGURAS, 'fig', None)
+    if fig is None or tuple(fig.get_size_inches()) != tamanho or fig.dpi != settings.graph_dpi:
+        fig = Figure(figsize=tamanho, dpi=settings.graph_dpi)
+        FigureCanvasAgg(fig)
+        _FIGURAS.fig, _FIGURAS.ax = fig, fig.add_subplot(111)
+    else:
+        _FIGURAS.ax.clear()
+    return fig, _FIGURAS.ax
+
+def _integrar_painel(painel: Tuple[sp.Expr, float, float, float]) -> Tuple[float, float]:
+    """
+    Integra um painel em um processo do pool (a expressão é lambdificada no worker).
+    """
+    expr, inicio, fim, tolerancia = painel
+    func = _lambdify_cached(expr, 'numpy')
+    # full_output evita o IntegrationWarning sem mexer no estado global de warnings
+    resultado, erro = quad(func, inicio, fim, epsabs=tolerancia, epsrel=tolerancia,
+                           limit=settings.max_subdivisions, full_output=1)[:2]
+    return resultado, abs(erro)
+
+# Operações simbólicas memoizadas: expressões SymPy são hashable e estruturalmente
+# iguais geram a mesma chave, então subexpressões repetidas reaproveitam o resultado
+@lru_cache(maxsize=1024)
+def _memo_simplify(expr: sp.Expr) -> sp.Expr:
+    return sp.simplify(expr)
+
+@lru_cache(maxsize=1024)
+def _memo_integrate(expr: sp.Expr, x: sp.Symbol) -> sp.Expr:
+    return sp.integrate(expr, x)
+
+@lru_cache(maxsize=1024)
+def _memo_diff(expr: sp.Expr, x: sp.Symbol, ordem: int = 1) -> sp.Expr:
+    return sp.diff(expr, x, ordem)
+
+@lru_cache(maxsize=1024)
+def _memo_limit(expr: sp.Expr, x: sp.Symbol, ponto, direcao: str = '+') -> sp.Expr:
+    return sp.limit(expr, x, ponto, direcao)
+
+@lru_cache(maxsize=1024)
+def _memo_singularidades(expr: sp.Expr, a: float, b: float) -> Tuple[float, ...]:
+    # Singularidades já restritas ao intervalo [a, b] pelo próprio SymPy
+    try:
+        candidatas = sp.singularities(expr, _X, domain=sp.Interval(a, b))
+    except Exception:
+        return ()
+    singularidades = []
+    if candidatas.is_FiniteSet:
+        for sing in candidatas:
+            try:
+                singularidades.append(float(sing))
+            except (TypeError, ValueError):
+                continue
+    return tuple(sorted(singularidades))
+
+@lru_cache(maxsize=1024)
+def _memo_contagem_nos(expr: sp.Expr) -> Tuple[int, Tuple[Tuple[str, int], ...]]:
+    # Uma única travessia conta nós e classifica operações (resultado imutável)
+    contagem = dict.fromkeys(('trigonometricas', 'exponenciais', 'logaritmicas', 'potencias', 'racionais'), 0)
+    nos_totais = 0
+    for node in sp.preorder_traversal(expr):
+        nos_totais += 1
+        categoria = _categoria_no(type(node))
+        if categoria:
+            contagem[categoria] += 1
+    return nos_totais, tuple(contagem.items())
+
 class EnhancedMathService:
     """
     Serviço matemático aprimorado com maior precisão e otimizações.
@@ -51,46 +220,35 @@ class EnhancedMathService:
         Validação avançada com análise de complexidade e propriedades.
         """
         try:
-            # Definir precisão
-            EnhancedMathService.set_precision()
-            
             # Limpar e preparar a string
             funcao_limpa = funcao_str.replace('^', '**').replace(' ', '')
             
-            # Substituições comuns para melhor interpretação
-            substituicoes = {
-                'ln': 'log',
-                'e': 'E',
-                'pi': 'pi',
-                'sen': 'sin',
-                'cos': 'cos',
-                'tg': 'tan',
-                'tan': 'tan',
-                'sec': 'sec',
-                'csc': 'csc',
-                'cot': 'cot',
-                'arcsin': 'asin',
-                'arccos': 'acos',
-                'arctan': 'atan',
-                'sqrt': 'sqrt',
-                'abs': 'Abs'
-            }
+            # Substituições comuns para melhor interpretação (um único passe, só tokens inteiros)
+            funcao_limpa = _SUBSTITUICOES_RE.sub(lambda m: _SUBSTITUICOES[m.group(0)], funcao_limpa)
             
-            for old, new in substituicoes.items():
-                funcao_limpa = funcao_limpa.replace(old, new)
+            # Caminho rápido: string normalizada já processada
+            with _PARSE_LOCK:
+                em_cache = _PARSE_CACHE.get(funcao_limpa)
+            if em_cache is not None:
+                expr_simplificada, analise = em_cache
+                return True, expr_simplificada, "Função válida", dict(analise)
+            
+            # Definir precisão
+            EnhancedMathService.set_precision()
             
             # Definir variável simbólica
-            x = sp.Symbol('x', real=True)
+            x = _X
             
-            # Parsear com tratamento de erro mais robusto
-            try:
-                expr = sp.sympify(funcao_limpa, locals={'x': x}, evaluate=False)
-            except:
-                # Tentativa com parsing mais permissivo
-                expr = sp.parse_expr(funcao_limpa, local_dict={'x': x}, evaluate=False)
+            # Parsear direto com parse_expr (sem o despacho de tipos do sympify)
+            expr = parse_expr(funcao_limpa, local_dict=_LOCALS, transformations=_TRANS,
+                              evaluate=False)
             
-            # Simplificar e validar
-            expr_simplificada = sp.simplify(expr)
+            # Expressões triviais dispensam o simplify (só avaliamos a árvore)
+            analise = EnhancedMathService._analisar_complexidade_funcao(expr)
+            if analise.get('complexidade', 999) < _COMPLEXIDADE_SEM_SIMPLIFY:
+                expr_simplificada = expr.doit()
+            else:
+                expr_simplificada = _memo_simplify(expr)
             
             # Análise de complexidade
             analise = EnhancedMathService._analisar_complexidade_funcao(expr_simplificada)
@@ -103,6 +261,9 @@ class EnhancedMathService:
             if analise['complexidade'] > settings.max_function_complexity:
                 return False, None, f"Função muito complexa (limite: {settings.max_function_complexity})", analise
             
+            with _PARSE_LOCK:
+                _PARSE_CACHE[funcao_limpa] = (expr_simplificada, dict(analise))
+            
             return True, expr_simplificada, "Função válida", analise
             
         except Exception as e:
@@ -114,29 +275,9 @@ class EnhancedMathService:
         Analisa a complexidade computacional de uma função.
         """
         try:
-            # Contar nós na árvore de expressão
-            nos_totais = len(sp.preorder_traversal(expr))
-            
-            # Identificar tipos de operações
-            operacoes = {
-                'trigonometricas': 0,
-                'exponenciais': 0,
-                'logaritmicas': 0,
-                'potencias': 0,
-                'racionais': 0
-            }
-            
-            for node in sp.preorder_traversal(expr):
-                if isinstance(node, (sp.sin, sp.cos, sp.tan, sp.sec, sp.csc, sp.cot)):
-                    operacoes['trigonometricas'] += 1
-                elif isinstance(node, (sp.exp, sp.sinh, sp.cosh, sp.tanh)):
-                    operacoes['exponenciais'] += 1
-                elif isinstance(node, (sp.log, sp.ln)):
-                    operacoes['logaritmicas'] += 1
-                elif isinstance(node, sp.Pow):
-                    operacoes['potencias'] += 1
-                elif isinstance(node, sp.Rational):
-                    operacoes['racionais'] += 1
+            # Contagem memoizada por expressão (travessia feita uma vez)
+            nos_totais, contagem = _memo_contagem_nos(expr)
+            operacoes = dict(contagem)
             
             # Calcular score de complexidade
             complexidade = nos_totais + sum(operacoes.values()) * 2
@@ -163,35 +304,44 @@ class EnhancedMathService:
             if metodo is None:
                 metodo = settings.integration_method
             
-            # Converter para função numérica otimizada
-            x = sp.Symbol('x')
+            # Converter para função numérica otimizada (reaproveitando o backend já validado)
+            chave_integrando = (sp.srepr(expr), 'integrando')
+            with _LAMBDIFY_LOCK:
+                func_numerica = _LAMBDIFY_CACHE.get(chave_integrando)
             
-            # Tentar usar lambdify com diferentes backends para otimização
-            backends = ['numpy', 'scipy', 'math']
-            func_numerica = None
-            
-            for backend in backends:
-                try:
-                    func_numerica = sp.lambdify(x, expr, backend)
-                    # Testar se funciona
-                    func_numerica(float(a))
-                    break
-                except:
-                    continue
+            if func_numerica is None:
+                # Tentar usar lambdify com diferentes backends para otimização
+                backends = ['numpy', 'scipy', 'math']
+                
+                for backend in backends:
+                    try:
+                        candidata = _lambdify_cached(expr, backend)
+                        # Testar se funciona
+                        candidata(float(a))
+                        func_numerica = candidata
+                        break
+                    except:
+                        continue
+                
+                if func_numerica is not None:
+                    with _LAMBDIFY_LOCK:
+                        _LAMBDIFY_CACHE[chave_integrando] = func_numerica
             
             if func_numerica is None:
                 raise ValueError("Não foi possível converter para função numérica")
             
-            # JIT desabilitado para compatibilidade com Python 3.13
-            # if settings.enable_numba_jit:
-            #     try:
-            #         func_numerica = EnhancedMathService._criar_funcao_jit(func_numerica)
-            #     except:
-            #         pass  # Continuar sem JIT se houver problema
+            # Integrando compilado (C function pointer) para o quad, se habilitado
+            if settings.enable_numba_jit and metodo != "fixed":
+                try:
+                    func_jit = EnhancedMathService._criar_funcao_jit(expr)
+                    if func_jit is not None:
+                        func_numerica = func_jit
+                except Exception:
+                    pass  # Continuar sem JIT se houver problema
             
             # Escolher método de integração
             resultado, erro, info = EnhancedMathService._integrar_com_metodo(
-                func_numerica, a, b, metodo, tolerancia
+                func_numerica, a, b, metodo, tolerancia, expr=expr
             )
             
             return resultado, erro, info
@@ -200,16 +350,36 @@ class EnhancedMathService:
             raise ValueError(f"Erro no cálculo numérico avançado: {str(e)}")
     
     @staticmethod
-    def _criar_funcao_jit(func):
+    def _criar_funcao_jit(expr: sp.Expr):
         """
-        Função JIT desabilitada para compatibilidade com Python 3.13.
-        Retorna a função original sem modificações.
+        Compila o integrando com numba.cfunc e o embrulha em LowLevelCallable,
+        permitindo que o quad chame um ponteiro de função C diretamente.
+        Retorna None se numba não estiver disponível.
         """
-        # JIT compilation desabilitado para compatibilidade
-        return func
+        if not NUMBA_DISPONIVEL:
+            return None
+        
+        chave = (sp.srepr(expr), 'cfunc')
+        with _LAMBDIFY_LOCK:
+            func_jit = _LAMBDIFY_CACHE.get(chave)
+        if func_jit is not None:
+            return func_jit
+        
+        func_escalar = njit(_lambdify_cached(expr, 'math'))
+        
+        @cfunc("float64(float64)")
+        def integrando(x):
+            return func_escalar(x)
+        
+        func_jit = LowLevelCallable(integrando.ctypes)
+        with _LAMBDIFY_LOCK:
+            _LAMBDIFY_CACHE[chave] = func_jit
+        
+        return func_jit
     
     @staticmethod
-    def _integrar_com_metodo(func, a: float, b: float, metodo: str, tolerancia: float) -> Tuple[float, float, Dict[str, Any]]:
+    def _integrar_com_metodo(func, a: float, b: float, metodo: str, tolerancia: float,
+                             expr: Optional[sp.Expr] = None) -> Tuple[float, float, Dict[str, Any]]:
         """
         Aplica diferentes métodos de integração numérica.
         """
@@ -218,36 +388,55 @@ class EnhancedMathService:
         try:
             if metodo == "adaptive":
                 # Integração adaptativa com subdivisions limitadas
-                resultado, erro = quad(
+                saida = quad(
                     func, a, b, 
                     epsabs=tolerancia, 
                     epsrel=tolerancia,
-                    limit=settings.max_subdivisions
+                    limit=settings.max_subdivisions,
+                    full_output=1
                 )
+                resultado, erro = saida[0], saida[1]
                 info = {
                     'metodo': 'Quadratura Adaptativa',
                     'subdivisions': 'variável',
                     'convergencia': 'adaptativa'
                 }
                 
+                # Sem convergência (ier > 0: quad devolve a mensagem como 4º item):
+                # dividir em painéis e integrar em paralelo. O ier é local à chamada,
+                # ao contrário de capturar IntegrationWarning, que é estado global
+                limite_atingido = len(saida) > 3
+                if limite_atingido and expr is not None and settings.parallel_processing:
+                    try:
+                        resultado, erro, n_paineis = EnhancedMathService._integrar_paralelo(
+                            expr, a, b, tolerancia
+                        )
+                        info = {
+                            'metodo': 'Quadratura Adaptativa Paralela',
+                            'paineis': n_paineis,
+                            'convergencia': 'adaptativa_por_paineis'
+                        }
+                    except Exception as e:
+                        logger.debug(f"Integração paralela falhou: {str(e)}")
+                
             elif metodo == "romberg":
-                # Método de alta precisão (substituto do Romberg removido)
+                # Método de alta precisão (substituto do Romberg removido do SciPy)
                 try:
-                    # Usar quad com tolerância muito baixa para simular Romberg
-                    resultado, erro = quad(
-                        func, a, b, 
-                        epsabs=tolerancia/10, 
+                    resultado, erro = integrate.quad_vec(
+                        func, a, b,
+                        epsabs=tolerancia/10,
                         epsrel=tolerancia/10,
                         limit=200  # Mais subdivisions para maior precisão
                     )
+                    resultado = float(resultado)
                     
                     info = {
-                        'metodo': 'Alta Precisão (ex-Romberg)',
+                        'metodo': 'Alta Precisão (ex-Romberg, quad_vec)',
                         'tolerancia_usada': tolerancia/10,
                         'convergencia': 'adaptativa_alta_precisao'
                     }
-                except:
-                    # Fallback para quad padrão
+                except Exception:
+                    # Fallback para quad padrão (também cobre integrandos LowLevelCallable)
                     resultado, erro = quad(func, a, b, epsabs=tolerancia)
                     info = {'metodo': 'Fallback Adaptativa'}
                     
@@ -255,7 +444,11 @@ class EnhancedMathService:
                 # Método fixo com número predefinido de pontos
                 n_pontos = settings.default_resolution
                 pontos = np.linspace(a, b, n_pontos)
-                valores = np.array([func(x) for x in pontos])
+                try:
+                    valores = np.broadcast_to(np.asarray(func(pontos), dtype=np.float64), pontos.shape)
+                except Exception:
+                    # Backends escalares (math/scipy) não aceitam arrays
+                    valores = np.fromiter((func(x) for x in pontos), dtype=np.float64, count=n_pontos)
                 
                 # Regra de Simpson composta
                 h = (b - a) / (n_pontos - 1)
@@ -280,6 +473,30 @@ class EnhancedMathService:
             resultado, erro = quad(func, a, b)
             return resultado, abs(erro), {'metodo': 'Fallback Simples', 'erro': str(e)}
     
+    @staticmethod
+    def _integrar_paralelo(expr: sp.Expr, a: float, b: float, tolerancia: float,
+                           n_paineis: int = None) -> Tuple[float, float, int]:
+        """
+        Divide [a, b] em painéis (respeitando singularidades) e integra cada um
+        em um processo separado. Erros são somados em quadratura.
+        """
+        if n_paineis is None:
+            n_paineis = 2 * settings.max_workers
+        
+        singularidades = np.asarray(EnhancedMathService._detectar_singularidades(expr, a, b), dtype=float)
+        singularidades = singularidades[(singularidades > a) & (singularidades < b)]
+        bordas = np.unique(np.concatenate((np.linspace(a, b, n_paineis + 1), singularidades))).tolist()
+        
+        paineis = [(expr, inicio, fim, tolerancia) for inicio, fim in zip(bordas[:-1], bordas[1:])]
+        resultados = list(obter_pool_processos().map(
+            _integrar_painel, paineis, timeout=settings.calculation_timeout
+        ))
+        
+        resultado = sum(r for r, _ in resultados)
+        erro = float(np.sqrt(sum(e * e for _, e in resultados)))
+        
+        return resultado, erro, len(paineis)
+    
     @staticmethod
     @cached_calculation(cache_key_func=lambda expr, *args, **kwargs: 
                        expression_cache_key(str(expr), "integral_simbolica", *args, **kwargs))
@@ -289,7 +506,7 @@ class EnhancedMathService:
         Cálculo simbólico avançado com múltiplas tentativas e simplificação inteligente.
         """
         try:
-            x = sp.Symbol('x')
+            x = _X
             
             # Tentar diferentes abordagens de integração
             antiderivada = None
@@ -297,7 +514,7 @@ class EnhancedMathService:
             
             # 1. Tentativa padrão
             try:
-                antiderivada = sp.integrate(expr, x)
+                antiderivada = _memo_integrate(expr, x)
                 metodo_usado = "integração_direta"
             except:
                 pass
@@ -306,7 +523,7 @@ class EnhancedMathService:
             if antiderivada is None:
                 try:
                     expr_expandida = sp.series(expr, x, 0, 10).removeO()
-                    antiderivada = sp.integrate(expr_expandida, x)
+                    antiderivada = _memo_integrate(expr_expandida, x)
                     metodo_usado = "expansão_serie"
                 except:
                     pass
@@ -314,8 +531,8 @@ class EnhancedMathService:
             # 3. Tentativa com simplificação prévia
             if antiderivada is None:
                 try:
-                    expr_simples = sp.simplify(expr)
-                    antiderivada = sp.integrate(expr_simples, x)
+                    expr_simples = _memo_simplify(expr)
+                    antiderivada = _memo_integrate(expr_simples, x)
                     metodo_usado = "simplificação_prévia"
                 except:
                     pass
@@ -330,10 +547,10 @@ class EnhancedMathService:
                         dv = sp.Mul(*fatores[1:])
                         
                         # Aplicar fórmula de integração por partes
-                        v = sp.integrate(dv, x)
-                        du = sp.diff(u, x)
+                        v = _memo_integrate(dv, x)
+                        du = _memo_diff(u, x)
                         
-                        antiderivada = u * v - sp.integrate(v * du, x)
+                        antiderivada = u * v - _memo_integrate(v * du, x)
                         metodo_usado = "integração_por_partes"
                 except:
                     pass
@@ -346,7 +563,7 @@ class EnhancedMathService:
                 }
             
             # Simplificar resultado
-            antiderivada_simplificada = sp.simplify(antiderivada)
+            antiderivada_simplificada = _memo_simplify(antiderivada)
             
             resultado = {
                 'sucesso': True,
@@ -359,11 +576,9 @@ class EnhancedMathService:
             # Calcular integral definida se limites fornecidos
             if a is not None and b is not None:
                 try:
-                    # Usar alta precisão para o cálculo
-                    with sp.evaluate(False):
-                        integral_definida = antiderivada_simplificada.subs(x, b) - antiderivada_simplificada.subs(x, a)
-                    
-                    valor_numerico = float(integral_definida.evalf(settings.numerical_precision))
+                    # Avaliar F(b) - F(a) com mpmath (precisão definida em set_precision)
+                    F = _lambdify_cached(antiderivada_simplificada, 'mpmath')
+                    valor_numerico = float(F(b) - F(a))
                     resultado['resultado_simbolico'] = valor_numerico
                     
                 except Exception as e:
@@ -387,30 +602,21 @@ class EnhancedMathService:
     @staticmethod
     @cached_calculation(cache_key_func=lambda expr, tipo_derivada, *args, **kwargs: 
                        expression_cache_key(str(expr), "derivada", tipo_derivada, *args, **kwargs))
-    def calcular_derivada_avancada(expr: sp.Expr, tipo_derivada: str = "primeira") -> Dict[str, Any]:
+    def calcular_derivada_avancada(expr: sp.Expr, tipo_derivada: Union[str, int] = "primeira") -> Dict[str, Any]:
         """
         Cálculo de derivada com verificação de continuidade e análise de pontos críticos.
         """
         try:
-            x = sp.Symbol('x')
+            x = _X
             
-            # Determinar ordem da derivada
-            ordem_map = {
-                'primeira': 1, 'segunda': 2, 'terceira': 3,
-                '1': 1, '2': 2, '3': 3
-            }
-            
-            ordem = ordem_map.get(tipo_derivada.lower(), 1)
-            
-            # Extrair número se formato "na" (ex: "4a")
-            if tipo_derivada.lower().endswith('a') and tipo_derivada[:-1].isdigit():
-                ordem = int(tipo_derivada[:-1])
+            # Determinar ordem da derivada (o router já envia a ordem inteira)
+            ordem = ordem_da_derivada(tipo_derivada)
             
             # Calcular derivada com alta precisão
-            derivada = sp.diff(expr, x, ordem)
+            derivada = _memo_diff(expr, x, ordem)
             
             # Simplificar resultado
-            derivada_simplificada = sp.simplify(derivada)
+            derivada_simplificada = _memo_simplify(derivada)
             
             # Análise adicional da derivada
             analise = EnhancedMathService._analisar_derivada(expr, derivada_simplificada, ordem)
@@ -434,7 +640,7 @@ class EnhancedMathService:
         Análise detalhada da derivada calculada.
         """
         try:
-            x = sp.Symbol('x')
+            x = _X
             analise = {
                 'pontos_criticos': [],
                 'singularidades': [],
@@ -445,26 +651,22 @@ class EnhancedMathService:
             # Encontrar pontos críticos (onde derivada = 0)
             if ordem == 1:
                 try:
-                    pontos_criticos = sp.solve(derivada, x)
-                    # Filtrar apenas soluções reais
-                    pontos_reais = []
-                    for ponto in pontos_criticos:
-                        if ponto.is_real:
-                            pontos_reais.append(float(ponto.evalf()))
-                    
-                    analise['pontos_criticos'] = pontos_reais[:10]  # Limitar a 10 pontos
+                    # solveset restrito aos reais evita ramos complexos no solver
+                    pontos_criticos = sp.solveset(derivada, x, domain=sp.S.Reals)
+                    if pontos_criticos.is_FiniteSet:
+                        analise['pontos_criticos'] = [float(p) for p in list(pontos_criticos)[:10]]  # Limitar a 10 pontos
+                    elif pontos_criticos is not sp.S.EmptySet:
+                        analise['pontos_criticos'] = 'infinitos_ou_nao_resolvido'
                 except:
                     analise['pontos_criticos'] = 'cálculo_falhou'
             
             # Verificar singularidades
             try:
-                singularidades = sp.solve(sp.denom(derivada), x)
-                sing_reais = []
-                for sing in singularidades:
-                    if sing.is_real:
-                        sing_reais.append(float(sing.evalf()))
-                
-                analise['singularidades'] = sing_reais[:5]  # Limitar a 5
+                singularidades = sp.solveset(sp.denom(derivada), x, domain=sp.S.Reals)
+                if singularidades.is_FiniteSet:
+                    analise['singularidades'] = [float(s) for s in list(singularidades)[:5]]  # Limitar a 5
+                elif singularidades is not sp.S.EmptySet:
+                    analise['singularidades'] = 'infinitos_ou_nao_resolvido'
             except:
                 analise['singularidades'] = 'cálculo_falhou'
             
@@ -482,7 +684,7 @@ class EnhancedMathService:
         Cálculo de limite com análise de convergência e múltiplas abordagens.
         """
         try:
-            x = sp.Symbol('x')
+            x = _X
             
             # Normalizar ponto limite para casos especiais
             if ponto_limite == float('inf'):
@@ -492,38 +694,43 @@ class EnhancedMathService:
             else:
                 ponto_sp = ponto_limite
             
-            # Calcular limite baseado no tipo com múltiplas abordagens
-            limites_calculados = {}
+            # Calcular limite com múltiplas abordagens
+            direcao = {'esquerda': '-', 'direita': '+'}.get(tipo_limite.lower(), '+')
             
-            # 1. Cálculo direto
-            try:
-                if tipo_limite.lower() == "esquerda":
-                    limite_direto = sp.limit(expr, x, ponto_sp, '-')
-                elif tipo_limite.lower() == "direita":
-                    limite_direto = sp.limit(expr, x, ponto_sp, '+')
-                else:  # bilateral
-                    limite_direto = sp.limit(expr, x, ponto_sp)
-                
-                limites_calculados['direto'] = limite_direto
-            except Exception as e:
-                limites_calculados['direto'] = f'erro: {str(e)}'
+            def _limite_direto():
+                # 1. Cálculo direto
+                return _memo_limit(expr, x, ponto_sp, direcao)
+            
+            def _limite_lhopital():
+                # 2. Usando L'Hôpital para formas indeterminadas
+                return EnhancedMathService._aplicar_lhopital(expr, x, ponto_sp, tipo_limite)
             
-            # 2. Usando L'Hôpital para formas indeterminadas
+            def _limite_serie():
+                # 3. Expansão em série para pontos finitos
+                serie = sp.series(expr, x, ponto_sp, 3).removeO()
+                return _memo_limit(serie, x, ponto_sp)
+            
+            # As alternativas (SymPy puro, presas ao GIL) só rodam, em sequência,
+            # quando o cálculo direto falha
+            limites_calculados = {}
             try:
-                limite_lhopital = EnhancedMathService._aplicar_lhopital(expr, x, ponto_sp, tipo_limite)
-                if limite_lhopital is not None:
-                    limites_calculados['lhopital'] = limite_lhopital
-            except:
-                pass
+                limite_direto = _limite_direto()
+            except Exception as e:
+                limite_direto = f'erro: {str(e)}'
+            limites_calculados['direto'] = limite_direto
             
-            # 3. Expansão em série para pontos finitos
-            if ponto_sp not in [sp.oo, -sp.oo]:
-                try:
-                    serie = sp.series(expr, x, ponto_sp, 3).removeO()
-                    limite_serie = sp.limit(serie, x, ponto_sp)
-                    limites_calculados['serie'] = limite_serie
-                except:
-                    pass
+            if isinstance(limite_direto, str) or limite_direto is None:
+                alternativas = {'lhopital': _limite_lhopital}
+                if ponto_sp not in [sp.oo, -sp.oo]:
+                    alternativas['serie'] = _limite_serie
+                
+                for metodo, func in alternativas.items():
+                    try:
+                        resultado_metodo = func()
+                    except Exception:
+                        continue
+                    if resultado_metodo is not None:
+                        limites_calculados[metodo] = resultado_metodo
             
             # Escolher melhor resultado
             limite_final = limites_calculados.get('direto')
@@ -544,7 +751,8 @@ class EnhancedMathService:
             
             if limite_final not in [sp.oo, -sp.oo, sp.nan, None] and not isinstance(limite_final, str):
                 try:
-                    valor_limite = float(limite_final.evalf(settings.numerical_precision))
+                    # 17 dígitos bastam para o round-trip em float64
+                    valor_limite = float(limite_final.evalf(_DIGITOS_FLOAT64))
                     existe_limite = True
                 except:
                     existe_limite = False
@@ -575,32 +783,26 @@ class EnhancedMathService:
         Aplica a regra de L'Hôpital para formas indeterminadas.
         """
         try:
+            # Numerador e denominador mantidos como estado entre as iterações
+            num, den = sp.numer(expr), sp.denom(expr)
+            
             # Verificar se é forma indeterminada (0/0 ou ∞/∞)
-            limite_num = sp.limit(sp.numer(expr), x, ponto)
-            limite_den = sp.limit(sp.denom(expr), x, ponto)
+            limite_num = _memo_limit(num, x, ponto)
+            limite_den = _memo_limit(den, x, ponto)
+            direcao = {'esquerda': '-', 'direita': '+'}.get(tipo_limite.lower(), '+')
             
             # Aplicar L'Hôpital se necessário (máximo 3 vezes)
-            for i in range(3):
-                if (limite_num == 0 and limite_den == 0) or (limite_num == sp.oo and limite_den == sp.oo):
-                    # Derivar numerador e denominador
-                    num_deriv = sp.diff(sp.numer(expr), x)
-                    den_deriv = sp.diff(sp.denom(expr), x)
-                    
-                    expr = num_deriv / den_deriv
-                    
-                    # Recalcular limites
-                    limite_num = sp.limit(num_deriv, x, ponto)
-                    limite_den = sp.limit(den_deriv, x, ponto)
-                    
-                    if limite_den != 0:
-                        if tipo_limite.lower() == "esquerda":
-                            return sp.limit(expr, x, ponto, '-')
-                        elif tipo_limite.lower() == "direita":
-                            return sp.limit(expr, x, ponto, '+')
-                        else:
-                            return sp.limit(expr, x, ponto)
-                else:
+            for _ in range(3):
+                if not ((limite_num == 0 and limite_den == 0) or (limite_num == sp.oo and limite_den == sp.oo)):
                     break
+                
+                # Derivar numerador e denominador e recalcular limites
+                num, den = _memo_diff(num, x), _memo_diff(den, x)
+                limite_num = _memo_limit(num, x, ponto)
+                limite_den = _memo_limit(den, x, ponto)
+                
+                if limite_den != 0:
+                    return _memo_limit(num / den, x, ponto, direcao)
             
             return None
             
@@ -622,24 +824,37 @@ class EnhancedMathService:
             return "nao_existe"
         else:
             try:
-                valor = float(limite.evalf())
+                valor = float(limite.evalf(_DIGITOS_FLOAT64))
                 return "converge_para_valor_finito"
             except:
                 return "comportamento_complexo"
     
     @staticmethod
-    @cached_calculation(cache_key_func=lambda expr, a, b, resolucao, *args, **kwargs: 
-                       expression_cache_key(str(expr), "grafico", a, b, resolucao, *args, **kwargs))
     def gerar_grafico_otimizado(expr: sp.Expr, a: float, b: float, 
-                              resolucao: int = None) -> Tuple[str, List[PontoGrafico], Dict[str, Any]]:
+                              resolucao: int = None, estilo: str = "matplotlib") -> Tuple[str, np.ndarray, np.ndarray, Dict[str, Any]]:
         """
         Geração de gráfico otimizada com detecção automática de singularidades.
+        Retorna os pontos válidos como arrays x/y; a camada de resposta cria os PontoGrafico.
+        estilo="rapido" rasteriza a curva sem matplotlib (sem título/legenda).
+        """
+        png, x_validos, y_validos, info_grafico = EnhancedMathService.gerar_grafico_png(
+            expr, a, b, resolucao, estilo
+        )
+        return base64.b64encode(png).decode('ascii'), x_validos, y_validos, info_grafico
+    
+    @staticmethod
+    @cached_calculation(cache_key_func=lambda expr, a, b, resolucao, *args, **kwargs: 
+                       expression_cache_key(str(expr), "grafico_png", a, b, resolucao, *args, **kwargs))
+    def gerar_grafico_png(expr: sp.Expr, a: float, b: float, 
+                          resolucao: int = None, estilo: str = "matplotlib") -> Tuple[bytes, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """
+        Mesmo que gerar_grafico_otimizado, mas devolve os bytes PNG crus (sem base64).
         """
         try:
             if resolucao is None:
                 resolucao = settings.default_resolution
             
-            x = sp.Symbol('x')
+            x = _X
             
             # Detectar singularidades no intervalo
             singularidades = EnhancedMathService._detectar_singularidades(expr, a, b)
@@ -648,80 +863,83 @@ class EnhancedMathService:
             pontos_x = EnhancedMathService._gerar_pontos_adaptativos(a, b, resolucao, singularidades)
             
             # Converter para função numérica
-            func_numerica = sp.lambdify(x, expr, 'numpy')
-            
-            # Calcular pontos com tratamento de erro
-            pontos_grafico = []
-            pontos_problematicos = []
+            func_numerica = _lambdify_cached(expr, 'numpy')
             
-            for x_val in pontos_x:
-                try:
-                    y_val = func_numerica(x_val)
+            # Calcular todos os pontos em uma única chamada vetorizada
+            pontos_x = np.asarray(pontos_x, dtype=float)
+            try:
+                with np.errstate(all='ignore'):
+                    valores = np.broadcast_to(func_numerica(pontos_x), pontos_x.shape)
+            except Exception:
+                # Expressões não vetorizáveis: avaliar ponto a ponto
+                valores = np.empty_like(pontos_x)
+                for i, x_val in enumerate(pontos_x):
+                    try:
+                        valores[i] = func_numerica(x_val)
+                    except Exception:
+                        valores[i] = np.nan
+            
+            # Valores complexos só são aceitos quando a parte imaginária é nula
+            if np.iscomplexobj(valores):
+                valores = np.where(valores.imag == 0, valores.real, np.nan)
+            y_arr = np.asarray(valores, dtype=float)
+            
+            # Separar pontos válidos dos problemáticos
+            mask = np.isfinite(y_arr)
+            x_validos = pontos_x[mask]
+            y_validos = y_arr[mask]
+            pontos_problematicos = pontos_x[~mask]
+            
+            if estilo == "rapido":
+                # Rasterização direta da polilinha (sem matplotlib)
+                png = renderizar_grafico_png(pontos_x, y_arr)
+            else:
+                # Gerar gráfico com matplotlib otimizado (estilo local à renderização)
+                with plt.style.context(_ESTILO_GRAFICO):
+                    fig, ax = _obter_figura()
                     
-                    # Verificar se o valor é válido
-                    if np.isfinite(y_val):
-                        pontos_grafico.append(PontoGrafico(x=float(x_val), y=float(y_val)))
-                    else:
-                        pontos_problematicos.append(x_val)
-                        
-                except:
-                    pontos_problematicos.append(x_val)
-            
-            # Gerar gráfico com matplotlib otimizado
-            plt.style.use('seaborn-v0_8')  # Estilo mais moderno
-            fig, ax = plt.subplots(figsize=(settings.graph_width, settings.graph_height), 
-                                 dpi=settings.graph_dpi)
-            
-            # Plotar função
-            x_vals = [p.x for p in pontos_grafico]
-            y_vals = [p.y for p in pontos_grafico]
-            
-            ax.plot(x_vals, y_vals, 'b-', linewidth=2, alpha=0.8, label=f'f(x) = {str(expr)}')
-            
-            # Destacar singularidades se encontradas
-            if singularidades:
-                for sing in singularidades:
-                    if a <= sing <= b:
-                        ax.axvline(x=sing, color='red', linestyle='--', alpha=0.7, 
-                                 label=f'Singularidade em x={sing:.3f}')
-            
-            # Configurações do gráfico
-            ax.grid(True, alpha=0.3)
-            ax.set_xlabel('x', fontsize=12)
-            ax.set_ylabel('f(x)', fontsize=12)
-            ax.set_title(f'Gráfico de f(x) = {str(expr)}', fontsize=14, fontweight='bold')
-            
-            # Auto-escala inteligente
-            if y_vals:
-                y_min, y_max = min(y_vals), max(y_vals)
-                y_range = y_max - y_min
-                if y_range > 0:
-                    margin = y_range * 0.1
-                    ax.set_ylim(y_min - margin, y_max + margin)
-            
-            ax.legend()
-            plt.tight_layout()
-            
-            # Converter para base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', bbox_inches='tight', 
-                       facecolor='white', edgecolor='none')
-            buffer.seek(0)
-            
-            image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            plt.close(fig)  # Liberar memória
+                    # Plotar função diretamente a partir dos arrays
+                    ax.plot(x_validos, y_validos, 'b-', linewidth=2, alpha=0.8, label=f'f(x) = {str(expr)}')
+                    
+                    # Destacar singularidades se encontradas
+                    if singularidades:
+                        for sing in singularidades:
+                            if a <= sing <= b:
+                                ax.axvline(x=sing, color='red', linestyle='--', alpha=0.7, 
+                                         label=f'Singularidade em x={sing:.3f}')
+                    
+                    # Configurações do gráfico
+                    ax.grid(True, alpha=0.3)
+                    ax.set_xlabel('x', fontsize=12)
+                    ax.set_ylabel('f(x)', fontsize=12)
+                    ax.set_title(f'Gráfico de f(x) = {str(expr)}', fontsize=14, fontweight='bold')
+                    
+                    # Auto-escala inteligente
+                    if y_validos.size:
+                        y_min, y_max = float(y_validos.min()), float(y_validos.max())
+                        y_range = y_max - y_min
+                        if y_range > 0:
+                            margin = y_range * 0.1
+                            ax.set_ylim(y_min - margin, y_max + margin)
+                    
+                    ax.legend()
+                    fig.tight_layout()
+                    
+                    # Renderizar direto no canvas Agg (getvalue não copia o buffer interno)
+                    buffer = io.BytesIO()
+                    fig.canvas.print_png(buffer)
+                    png = buffer.getvalue()
             
             # Informações adicionais
             info_grafico = {
-                'pontos_calculados': len(pontos_grafico),
+                'pontos_calculados': int(x_validos.size),
                 'pontos_problematicos': len(pontos_problematicos),
                 'singularidades_detectadas': len(singularidades),
                 'resolucao_efetiva': len(pontos_x),
                 'intervalo': [a, b]
             }
             
-            return image_base64, pontos_grafico, info_grafico
+            return png, x_validos, y_validos, info_grafico
             
         except Exception as e:
             raise ValueError(f"Erro na geração de gráfico otimizado: {str(e)}")
@@ -731,26 +949,8 @@ class EnhancedMathService:
         """
         Detecta singularidades (pontos onde a função não está definida) no intervalo.
         """
-        try:
-            x = sp.Symbol('x')
-            singularidades = []
-            
-            # Encontrar zeros do denominador
-            denominador = sp.denom(expr)
-            if denominador != 1:
-                zeros_denom = sp.solve(denominador, x)
-                for zero in zeros_denom:
-                    try:
-                        zero_val = float(zero.evalf())
-                        if a <= zero_val <= b:
-                            singularidades.append(zero_val)
-                    except:
-                        continue
-            
-            return sorted(singularidades)
-            
-        except:
-            return []
+        # Resolução simbólica memoizada por (expressão, a, b)
+        return list(_memo_singularidades(expr, a, b))
     
     @staticmethod
     def _gerar_pontos_adaptativos(a: float, b: float, resolucao: int, 
@@ -762,33 +962,24 @@ class EnhancedMathService:
             if not singularidades:
                 return np.linspace(a, b, resolucao)
             
-            # Distribuir pontos com mais densidade perto de singularidades
-            pontos_finais = []
+            sings = np.asarray(singularidades, dtype=float)
+            sings = sings[(sings > a) & (sings < b)]
             
             # Pontos base distribuídos uniformemente
             pontos_base = np.linspace(a, b, resolucao // 2)
-            pontos_finais.extend(pontos_base)
+            if sings.size == 0:
+                return pontos_base
             
-            # Pontos adicionais perto de singularidades
-            for sing in singularidades:
-                if a < sing < b:
-                    # Janela ao redor da singularidade
-                    delta = min(0.1 * (b - a), abs(b - a) / 20)
-                    
-                    # Pontos à esquerda da singularidade
-                    left_start = max(a, sing - delta)
-                    left_points = np.linspace(left_start, sing - 1e-6, resolucao // 10)
-                    pontos_finais.extend(left_points)
-                    
-                    # Pontos à direita da singularidade
-                    right_end = min(b, sing + delta)
-                    right_points = np.linspace(sing + 1e-6, right_end, resolucao // 10)
-                    pontos_finais.extend(right_points)
+            # Janela ao redor de cada singularidade, com densificação geométrica
+            # (deslocamentos de 1e-6 até delta) dos dois lados
+            delta = min(0.1 * (b - a), abs(b - a) / 20)
+            offsets = np.geomspace(1e-6, max(delta, 2e-6), max(resolucao // 10, 2))
+            lados = np.concatenate((-offsets, offsets))
+            proximos = (sings[:, None] + lados[None, :]).ravel()
+            proximos = proximos[(proximos >= a) & (proximos <= b)]
             
             # Remover duplicatas e ordenar
-            pontos_finais = sorted(list(set(pontos_finais)))
-            
-            return np.array(pontos_finais)
+            return np.unique(np.concatenate((pontos_base, proximos)))
             
         except Exception:
             return np.linspace(a, b, resolucao) 
\ No newline at end of file
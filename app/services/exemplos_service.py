@@ -1,64 +1,72 @@
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Sequence
+
+# Exemplos por categoria, montados uma única vez na importação (tuplas imutáveis)
+_EXEMPLOS: Dict[str, tuple] = {
+    "basicas": (
+        "x",
+        "x^2",
+        "x^3",
+        "2*x",
+        "x^2 + 3*x",
+        "x^3 - 2*x + 1"
+    ),
+    "trigonometricas": (
+        "sin(x)",
+        "cos(x)",
+        "tan(x)",
+        "sin(x)^2",
+        "cos(2*x)",
+        "sin(x)*cos(x)"
+    ),
+    "exponenciais": (
+        "exp(x)",
+        "2^x",
+        "e^(-x)",
+        "x*exp(x)",
+        "exp(x^2)"
+    ),
+    "logaritmicas": (
+        "log(x)",
+        "ln(x)",
+        "log(x^2)",
+        "x*log(x)",
+        "log(x)/x"
+    ),
+    "radicais": (
+        "sqrt(x)",
+        "sqrt(x^2 + 1)",
+        "x*sqrt(x)",
+        "1/sqrt(x)",
+        "sqrt(1 - x^2)"
+    ),
+    "racionais": (
+        "1/x",
+        "1/x^2",
+        "x/(x^2 + 1)",
+        "(x + 1)/(x - 1)",
+        "x^2/(x + 1)"
+    )
+}
+
+# Visão somente leitura devolvida a cada chamada (nenhuma alocação por requisição)
+_EXEMPLOS_VIEW = MappingProxyType(_EXEMPLOS)
+_TOTAL_EXEMPLOS = sum(len(lista) for lista in _EXEMPLOS.values())
 
 class ExemplosService:
-    
+
     @staticmethod
-    def obter_exemplos() -> Dict[str, List[str]]:
+    def obter_exemplos() -> Mapping[str, Sequence[str]]:
         """
         Retorna exemplos organizados por categoria.
         """
-        exemplos = {
-            "basicas": [
-                "x",
-                "x^2", 
-                "x^3",
-                "2*x",
-                "x^2 + 3*x",
-                "x^3 - 2*x + 1"
-            ],
-            "trigonometricas": [
-                "sin(x)",
-                "cos(x)", 
-                "tan(x)",
-                "sin(x)^2",
-                "cos(2*x)",
-                "sin(x)*cos(x)"
-            ],
-            "exponenciais": [
-                "exp(x)",
-                "2^x",
-                "e^(-x)",
-                "x*exp(x)",
-                "exp(x^2)"
-            ],
-            "logaritmicas": [
-                "log(x)",
-                "ln(x)",
-                "log(x^2)",
-                "x*log(x)",
-                "log(x)/x"
-            ],
-            "radicais": [
-                "sqrt(x)",
-                "sqrt(x^2 + 1)",
-                "x*sqrt(x)",
-                "1/sqrt(x)",
-                "sqrt(1 - x^2)"
-            ],
-            "racionais": [
-                "1/x",
-                "1/x^2",
-                "x/(x^2 + 1)",
-                "(x + 1)/(x - 1)",
-                "x^2/(x + 1)"
-            ]
-        }
-        
-        return exemplos
-    
+        return _EXEMPLOS_VIEW
+
     @staticmethod
-    def contar_total_exemplos(exemplos: Dict[str, List[str]]) -> int:
+    def contar_total_exemplos(exemplos: Mapping[str, Sequence[str]]) -> int:
         """
         Conta o total de exemplos em todas as categorias.
         """
-        return sum(len(lista) for lista in exemplos.values()) 
\ No newline at end of file
+        if exemplos is _EXEMPLOS_VIEW:
+            return _TOTAL_EXEMPLOS
+        return sum(len(lista) for lista in exemplos.values())
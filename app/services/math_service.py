@@ -1,16 +1,241 @@
 import sympy as sp
 import numpy as np
 from scipy import integrate
-from typing import Tuple, List, Optional, Dict, Any
+from typing import Tuple, List, Optional, Dict, Any, Union
 import base64
 import io
 import matplotlib
 matplotlib.use('Agg')  # Backend não-interativo
-import matplotlib.pyplot as plt
-from datetime import datetime
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from datetime import datetime, timezone
+from scipy import LowLevelCallable
+from functools import lru_cache
+from sympy.parsing.sympy_parser import (
+    parse_expr, standard_transformations, implicit_multiplication_application, convert_xor
+)
+from cachetools import LRUCache
+# llvmlite é opcional: sem ele o integrando é avaliado via lambdify
+try:
+    import llvmlite  # noqa: F401
+    from sympy.printing.llvmjitcode import llvm_callable
+    LLVM_DISPONIVEL = True
+except ImportError:
+    LLVM_DISPONIVEL = False
+# numba também é opcional (compila o integrando como cfunc)
+try:
+    from numba import cfunc, njit
+    NUMBA_DISPONIVEL = True
+except ImportError:
+    NUMBA_DISPONIVEL = False
 
 from app.models.responses import PontoGrafico
+from app.models.requests import ordem_da_derivada
 from app.core.config import settings
+from app.core.precompiled_functions import get_precompiled_function
+
+# Variável simbólica compartilhada (mesmas suposições em parsing, cálculo e avaliação)
+_X = sp.Symbol('x', real=True)
+
+# Parser montado uma vez: multiplicação implícita ("2x") e '^' como potência
+_LOCALS = {'x': _X}
+_TRANS = standard_transformations + (implicit_multiplication_application, convert_xor)
+
+@lru_cache(maxsize=512)
+def _parse_expr(funcao_str: str) -> sp.Expr:
+    """
+    Parseia a string da função (memoizado por string).
+    """
+    return parse_expr(funcao_str, local_dict=_LOCALS, transformations=_TRANS)
+
+@lru_cache(maxsize=512)
+def _numeric_func(expr_srepr: str):
+    """
+    Função NumPy lambdificada, memoizada pelo srepr da expressão.
+    """
+    # Funções de exemplo já possuem implementação NumPy pronta
+    func = get_precompiled_function(expr_srepr)
+    if func is not None:
+        return func
+    return sp.lambdify(_X, sp.sympify(expr_srepr), 'numpy')
+
+@lru_cache(maxsize=256)
+def _renderizar_grafico(expr_srepr: str, a: float, b: float, resolucao: int) -> str:
+    """
+    Renderiza o gráfico da função em PNG base64.
+    """
+    expr = sp.sympify(expr_srepr)
+    func_numerica = _numeric_func(expr_srepr)
+    
+    # Figura criada via API orientada a objetos (sem estado global do pyplot)
+    fig = Figure(figsize=(settings.graph_width, settings.graph_height), dpi=settings.graph_dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    
+    # Gerar pontos (avaliação em float64; float32 basta para a renderização)
+    x_vals = np.linspace(a, b, resolucao)
+    y_vals = np.broadcast_to(func_numerica(x_vals), x_vals.shape).astype(np.float32)
+    x_vals = x_vals.astype(np.float32, copy=False)
+    
+    # Plotar função
+    ax.plot(x_vals, y_vals, 'b-', linewidth=2, label=f'f(x) = {str(expr)}')
+    ax.fill_between(x_vals, y_vals, alpha=0.3, color='lightblue')
+    
+    # Configurar gráfico
+    ax.grid(True, alpha=0.3)
+    ax.set_xlabel('x', fontsize=12)
+    ax.set_ylabel('f(x)', fontsize=12)
+    ax.set_title(f'Gráfico da função f(x) = {str(expr)}', fontsize=14)
+    ax.legend()
+    
+    # Salvar em base64
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    
+    # Converter para base64 lendo o buffer via memoryview (sem cópia intermediária)
+    grafico_base64 = base64.b64encode(buffer.getbuffer()).decode('ascii')
+    buffer.close()
+    
+    return grafico_base64
+
+# Acima deste tamanho (em caracteres) a forma cancelada ainda recorre ao sp.simplify
+_LIMITE_SIMPLIFY = 80
+
+def _forma_exibicao(expr: sp.Expr) -> sp.Expr:
+    """
+    Forma usada apenas para exibição (str/latex): sp.cancel é barato e determinístico;
+    o sp.simplify completo só é aplicado quando o resultado continua extenso.
+    """
+    forma = sp.cancel(expr)
+    if len(str(forma)) > _LIMITE_SIMPLIFY:
+        forma = sp.simplify(forma)
+    return forma
+
+def _sem_singularidades(expr: sp.Expr, antiderivada: sp.Expr, a: float, b: float) -> bool:
+    """
+    Indica se integrando e antiderivada são regulares em [a, b] (na dúvida, False).
+    """
+    try:
+        intervalo = sp.Interval(min(a, b), max(a, b))
+        return all(
+            sp.singularities(f, _X, intervalo) == sp.S.EmptySet for f in (expr, antiderivada)
+        )
+    except Exception:
+        return False
+
+# Integrandos compilados indexados pelo srepr da expressão
+_INTEGRANDOS = LRUCache(maxsize=512)
+
+def _compilar_numba(expr: sp.Expr, x: sp.Symbol) -> LowLevelCallable:
+    """
+    Compila o integrando escalar (módulo math) com numba.cfunc("float64(float64)").
+    """
+    func_escalar = njit(sp.lambdify(x, expr, 'math'))
+    
+    @cfunc("float64(float64)")
+    def integrando(valor):
+        return func_escalar(valor)
+    
+    return LowLevelCallable(integrando.ctypes)
+
+def _compilar_integrando(expr: sp.Expr, x: sp.Symbol):
+    """
+    Retorna o integrando para o quad: LowLevelCallable compilado via LLVM ou numba
+    quando disponíveis, senão a função lambdificada com NumPy.
+    """
+    chave = sp.srepr(expr)
+    integrando = _INTEGRANDOS.get(chave)
+    if integrando is None:
+        if LLVM_DISPONIVEL:
+            try:
+                integrando = LowLevelCallable(llvm_callable([x], expr, callback_type='scipy.integrate'))
+            except Exception:
+                integrando = None
+        if integrando is None and NUMBA_DISPONIVEL:
+            try:
+                integrando = _compilar_numba(expr, x)
+            except Exception:
+                integrando = None
+        if integrando is None:
+            integrando = _numeric_func(chave)
+        _INTEGRANDOS[chave] = integrando
+    return integrando
+
+# Regra de Gauss-Kronrod 7/15 (nós positivos em ordem decrescente, como no QUADPACK)
+_XGK = np.array([0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+                 0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+                 0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+                 0.207784955007898467600689403773245])
+_WGK = np.array([0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+                 0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+                 0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+                 0.204432940075298892414161999234649])
+_WGK_CENTRO = 0.209482141084727828012999174891714
+_WG = np.array([0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+                0.381830050505118944950369775488975])
+_WG_CENTRO = 0.417959183673469387755102040816327
+
+# Nós e pesos completos em [-1, 1] (15 pontos); Gauss usa só os nós ímpares de _XGK
+_NOS_GK = np.concatenate((-_XGK, [0.0], _XGK[::-1]))
+_PESOS_K = np.concatenate((_WGK, [_WGK_CENTRO], _WGK[::-1]))
+_PESOS_G = np.zeros(15)
+_PESOS_G[[1, 3, 5]] = _WG
+_PESOS_G[7] = _WG_CENTRO
+_PESOS_G[[13, 11, 9]] = _WG
+# Colunas: [Kronrod, Kronrod - Gauss] (estimativa de erro em um único produto)
+_PESOS_GK = np.column_stack((_PESOS_K, _PESOS_K - _PESOS_G))
+
+# Integrandos baratos ficam com o quad (overhead fixo menor); a partir deste
+# número de operações a avaliação vetorizada compensa
+_OPS_MINIMAS_GK = 10
+
+@lru_cache(maxsize=512)
+def _custo_integrando(expr: sp.Expr) -> int:
+    return sp.count_ops(expr)
+
+def _gauss_kronrod_adaptativo(func, a: float, b: float, epsabs: float = 1.49e-8,
+                              epsrel: float = 1.49e-8, limite: int = 50) -> Optional[Tuple[float, float]]:
+    """
+    Integração adaptativa GK7/15 com avaliação vetorizada: todos os subintervalos
+    ativos são avaliados em uma única chamada NumPy por nível de bisseção.
+    Retorna None quando não converge ou encontra valores não finitos.
+    """
+    inicios = np.array([a], dtype=float)
+    fins = np.array([b], dtype=float)
+    total, erro_total = 0.0, 0.0
+    intervalos = 1
+    largura_total = abs(b - a)
+    
+    with np.errstate(all='ignore'):
+        while inicios.size:
+            centros = 0.5 * (inicios + fins)
+            meias = 0.5 * (fins - inicios)
+            pontos = centros[:, None] + meias[:, None] * _NOS_GK[None, :]
+            valores = func(pontos)
+            if np.shape(valores) != pontos.shape:
+                valores = np.broadcast_to(valores, pontos.shape)
+            
+            somas = valores @ _PESOS_GK
+            if not np.isfinite(somas).all():
+                return None
+            kronrod = meias * somas[:, 0]
+            erros = np.abs(meias * somas[:, 1])
+            
+            # Tolerância local proporcional à largura do subintervalo
+            tolerancia = max(epsabs, epsrel * abs(total + kronrod.sum()))
+            aceitos = erros <= tolerancia * np.abs(fins - inicios) / largura_total
+            total += kronrod[aceitos].sum()
+            erro_total += erros[aceitos].sum()
+            
+            # Bissecção dos subintervalos rejeitados
+            rejeitados = ~aceitos
+            intervalos += int(rejeitados.sum())
+            if intervalos > limite:
+                return None
+            inicios, centros_r, fins = inicios[rejeitados], centros[rejeitados], fins[rejeitados]
+            inicios, fins = np.concatenate((inicios, centros_r)), np.concatenate((centros_r, fins))
+    
+    return float(total), float(erro_total)
 
 class MathService:
     
@@ -21,14 +246,8 @@ class MathService:
         Retorna: (é_válida, expressao_sympy, mensagem_erro)
         """
         try:
-            # Limpar e preparar a string
-            funcao_limpa = funcao_str.replace('^', '**')
-            
-            # Definir variável simbólica
-            x = sp.Symbol('x', real=True)
-            
-            # Tentar parsear a função
-            expr = sp.sympify(funcao_limpa, locals={'x': x})
+            # Tentar parsear a função (memoizado entre requisições; '^' tratado pelo convert_xor)
+            expr = _parse_expr(funcao_str)
             
             # Verificar se é uma expressão válida
             if not isinstance(expr, (sp.Expr, sp.Number)):
@@ -46,9 +265,16 @@ class MathService:
         Retorna: (valor_integral, erro_estimado)
         """
         try:
-            # Converter expressão SymPy para função numérica
-            x = sp.Symbol('x')
-            func_numerica = sp.lambdify(x, expr, 'numpy')
+            # Converter expressão SymPy para função numérica (compilada quando possível)
+            x = _X
+            func_numerica = _compilar_integrando(expr, x)
+            
+            # Integrandos NumPy custosos em intervalo finito: GK adaptativo vetorizado
+            if (not isinstance(func_numerica, LowLevelCallable) and np.isfinite(a) and np.isfinite(b)
+                    and a != b and _custo_integrando(expr) >= _OPS_MINIMAS_GK):
+                resultado_gk = _gauss_kronrod_adaptativo(func_numerica, a, b)
+                if resultado_gk is not None:
+                    return resultado_gk
             
             # Calcular integral numérica com estimativa de erro
             resultado, erro = integrate.quad(func_numerica, a, b)
@@ -58,17 +284,38 @@ class MathService:
         except Exception as e:
             raise ValueError(f"Erro no cálculo numérico: {str(e)}")
     
+    @staticmethod
+    def calcular_integrais_batch(expr: sp.Expr, intervalos: List[Tuple[float, float]]) -> Tuple[np.ndarray, float]:
+        """
+        Calcula a integral em vários intervalos com uma única chamada ao quad_vec.
+        Cada intervalo é mapeado para [0, 1]: ∫_a^b f(x)dx = ∫_0^1 f(a + (b - a)t)(b - a)dt.
+        Retorna: (valores_integral, erro_estimado)
+        """
+        try:
+            func_numerica = _numeric_func(sp.srepr(expr))
+            limites = np.asarray(intervalos, dtype=float)
+            inicios, larguras = limites[:, 0], limites[:, 1] - limites[:, 0]
+            
+            def integrando(t):
+                return np.broadcast_to(func_numerica(inicios + larguras * t), inicios.shape) * larguras
+            
+            valores, erro = integrate.quad_vec(integrando, 0.0, 1.0)
+            return np.asarray(valores, dtype=float), abs(float(erro))
+            
+        except Exception as e:
+            raise ValueError(f"Erro no cálculo numérico em lote: {str(e)}")
+    
     @staticmethod
     def calcular_integral_simbolica(expr: sp.Expr, a: Optional[float] = None, b: Optional[float] = None) -> Dict[str, Any]:
         """
         Calcula integral simbólica (indefinida ou definida).
         """
         try:
-            x = sp.Symbol('x')
+            x = _X
             
             # Calcular antiderivada
             antiderivada = sp.integrate(expr, x)
-            antiderivada_simplificada = sp.simplify(antiderivada)
+            antiderivada_simplificada = _forma_exibicao(antiderivada)
             
             resultado = {
                 'antiderivada': str(antiderivada_simplificada),
@@ -78,7 +325,14 @@ class MathService:
             
             # Se há limites, calcular integral definida
             if a is not None and b is not None:
-                integral_definida = sp.integrate(expr, (x, a, b))
+                # Reaproveitar a antiderivada (F(b) - F(a)) em vez de integrar de novo,
+                # apenas quando integrando e F não têm singularidades em [a, b]
+                if antiderivada.has(sp.Integral):
+                    antiderivada = antiderivada.doit()
+                if not antiderivada.has(sp.Integral) and _sem_singularidades(expr, antiderivada, a, b):
+                    integral_definida = antiderivada.subs(x, b) - antiderivada.subs(x, a)
+                else:
+                    integral_definida = sp.integrate(expr, (x, a, b))
                 resultado['resultado_simbolico'] = float(integral_definida.evalf())
             
             return resultado
@@ -87,25 +341,19 @@ class MathService:
             raise ValueError(f"Erro no cálculo simbólico: {str(e)}")
     
     @staticmethod
-    def calcular_derivada(expr: sp.Expr, tipo_derivada: str = "primeira") -> Dict[str, Any]:
+    def calcular_derivada(expr: sp.Expr, tipo_derivada: Union[str, int] = "primeira") -> Dict[str, Any]:
         """
         Calcula a derivada de uma função.
         """
         try:
-            x = sp.Symbol('x')
+            x = _X
             
             # Determinar ordem da derivada
-            ordem = 1
-            if tipo_derivada.lower() == "segunda":
-                ordem = 2
-            elif tipo_derivada.lower() == "terceira":
-                ordem = 3
-            elif tipo_derivada.lower().startswith("n"):
-                ordem = int(tipo_derivada.lower().replace("n", "").replace("a", ""))
+            ordem = ordem_da_derivada(tipo_derivada)
             
             # Calcular derivada
             derivada = sp.diff(expr, x, ordem)
-            derivada_simplificada = sp.simplify(derivada)
+            derivada_simplificada = _forma_exibicao(derivada)
             
             resultado = {
                 'derivada': str(derivada_simplificada),
@@ -124,7 +372,7 @@ class MathService:
         Calcula o limite de uma função.
         """
         try:
-            x = sp.Symbol('x')
+            x = _X
             
             # Calcular limite baseado no tipo
             if tipo_limite.lower() == "esquerda":
@@ -222,72 +470,56 @@ class MathService:
         Gera pontos para plotagem do gráfico.
         """
         try:
-            x = sp.Symbol('x')
-            func_numerica = sp.lambdify(x, expr, 'numpy')
+            func_numerica = _numeric_func(sp.srepr(expr))
             
-            # Gerar pontos
-            x_vals = np.linspace(a, b, resolucao)
-            y_vals = func_numerica(x_vals)
+            # Gerar pontos em um único buffer contíguo (x, y)
+            pontos = np.empty((resolucao, 2), dtype=np.float64)
+            pontos[:, 0] = np.linspace(a, b, resolucao)
+            pontos[:, 1] = func_numerica(pontos[:, 0])
             
-            # Filtrar valores inválidos (inf, nan)
-            mask = np.isfinite(y_vals)
-            x_vals = x_vals[mask]
-            y_vals = y_vals[mask]
+            # Filtrar valores inválidos (inf, nan) com uma única seleção
+            pontos = pontos[np.isfinite(pontos[:, 1])]
             
-            return [PontoGrafico(x=float(x), y=float(y)) for x, y in zip(x_vals, y_vals)]
+            # model_construct dispensa a validação: os valores já são floats finitos
+            return [PontoGrafico.model_construct(x=xv, y=yv) for xv, yv in pontos.tolist()]
             
         except Exception as e:
             raise ValueError(f"Erro ao gerar pontos do gráfico: {str(e)}")
     
     @staticmethod
-    def gerar_grafico_base64(expr: sp.Expr, a: float, b: float, resolucao: int = 400) -> str:
+    def gerar_pontos_grafico_colunar(expr: sp.Expr, a: float, b: float, resolucao: int = 400) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Gera gráfico da função em formato base64.
+        Gera os pontos do gráfico como arrays x/y (formato colunar, sem objeto por ponto).
         """
         try:
-            x = sp.Symbol('x')
-            func_numerica = sp.lambdify(x, expr, 'numpy')
-            
-            # Configurar matplotlib
-            plt.style.use('default')
-            fig, ax = plt.subplots(figsize=(settings.graph_width, settings.graph_height), dpi=settings.graph_dpi)
+            func_numerica = _numeric_func(sp.srepr(expr))
             
-            # Gerar pontos
             x_vals = np.linspace(a, b, resolucao)
-            y_vals = func_numerica(x_vals)
+            with np.errstate(all='ignore'):
+                y_vals = np.broadcast_to(func_numerica(x_vals), x_vals.shape)
             
-            # Plotar função
-            ax.plot(x_vals, y_vals, 'b-', linewidth=2, label=f'f(x) = {str(expr)}')
-            ax.fill_between(x_vals, y_vals, alpha=0.3, color='lightblue')
-            
-            # Configurar gráfico
-            ax.grid(True, alpha=0.3)
-            ax.set_xlabel('x', fontsize=12)
-            ax.set_ylabel('f(x)', fontsize=12)
-            ax.set_title(f'Gráfico da função f(x) = {str(expr)}', fontsize=14)
-            ax.legend()
-            
-            # Salvar em base64
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', bbox_inches='tight', dpi=settings.graph_dpi)
-            buffer.seek(0)
-            
-            # Converter para base64
-            grafico_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            # Limpar memória
-            plt.close(fig)
-            buffer.close()
+            # Filtrar valores inválidos (inf, nan)
+            mask = np.isfinite(y_vals)
+            return x_vals[mask], np.asarray(y_vals[mask], dtype=np.float64)
             
-            return grafico_base64
+        except Exception as e:
+            raise ValueError(f"Erro ao gerar pontos do gráfico: {str(e)}")
+    
+    @staticmethod
+    def gerar_grafico_base64(expr: sp.Expr, a: float, b: float, resolucao: int = 400) -> str:
+        """
+        Gera gráfico da função em formato base64.
+        """
+        try:
+            # Renderização determinística: memoizada por (srepr, a, b, resolucao)
+            return _renderizar_grafico(sp.srepr(expr), a, b, resolucao)
             
         except Exception as e:
-            plt.close('all')  # Garantir limpeza em caso de erro
             raise ValueError(f"Erro ao gerar gráfico: {str(e)}")
     
     @staticmethod
     def obter_timestamp() -> str:
         """
-        Retorna timestamp atual em formato ISO 8601.
+        Retorna timestamp atual em formato ISO 8601 (UTC, precisão de microssegundos).
         """
-        return datetime.now().isoformat() 
\ No newline at end of file
+        return datetime.now(timezone.utc).isoformat(timespec='microseconds') 
\ No newline at end of file
@@ -1,23 +1,492 @@
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import StandardScaler, PolynomialFeatures
+import joblib
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
-import joblib
 import sympy as sp
-from sympy import lambdify, symbols, diff, integrate
+from sympy import lambdify, symbols, diff
 import logging
-from typing import Dict, List, Tuple, Any, Optional, Union
+from typing import Callable, Dict, List, Mapping, Tuple, Any, Optional, Union
 import warnings
 from datetime import datetime, timedelta
 import os
 import hashlib
 import json
+import copy
+import asyncio
+import functools
+from dataclasses import dataclass
+from collections import Counter
+from types import MappingProxyType
+from functools import lru_cache
+import threading
+from cachetools import LRUCache
+
+from app.core.config import settings
+from app.core.cache_manager import SharedPayloadCache
+from app.core.executor import executar_em_pool
+
+# numba é opcional: sem ele os escores heurísticos rodam em Python puro
+try:
+    from numba import njit, vectorize
+    NUMBA_DISPONIVEL = True
+except ImportError:
+    NUMBA_DISPONIVEL = False
 
 warnings.filterwarnings('ignore')
 logger = logging.getLogger(__name__)
 
+# Variável simbólica compartilhada pelas análises
+_X = symbols('x')
+
+# Segundo nível de cache (disco) para características e análises, sobrevive a reinícios
+_DIRETORIO_CACHE_ML = "ml_models_cache"
+_VERSAO_CACHE_ML = 3  # incrementar quando o formato das características mudar
+_TTL_CACHE_ML = 86400  # resultados determinísticos: um dia
+_CACHE_DISCO = SharedPayloadCache(
+    directory=os.path.join(_DIRETORIO_CACHE_ML, "features"),
+    ttl=_TTL_CACHE_ML,
+    enabled=settings.shared_cache_enabled
+)
+
+def _chave_disco(tipo: str, function_canon: str) -> str:
+    """
+    Chave blake2b do item persistido (tipo + versão + string canônica).
+    """
+    dados = f"{tipo}:{_VERSAO_CACHE_ML}:{function_canon}".encode()
+    return hashlib.blake2b(dados, digest_size=16).hexdigest()
+
+def _ler_disco(tipo: str, function_canon: str) -> Optional[Any]:
+    """
+    Lê um resultado persistido (JSON); None se ausente ou inválido.
+    """
+    payload = _CACHE_DISCO.get(_chave_disco(tipo, function_canon))
+    if payload is None:
+        return None
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+def _gravar_disco(tipo: str, function_canon: str, valor: Any) -> None:
+    """
+    Persiste um resultado serializável em JSON.
+    """
+    try:
+        payload = json.dumps(valor, ensure_ascii=False).encode()
+    except (TypeError, ValueError):
+        return
+    _CACHE_DISCO.set(_chave_disco(tipo, function_canon), payload)
+
+def canonizar_funcao(function_str: str) -> str:
+    """
+    Forma canônica da string da função (entradas equivalentes compartilham cache).
+    """
+    return function_str.strip().replace(' ', '').replace('^', '**')
+
+# Grupos de classes SymPy usados nas classificações (comparação por tipo, não por substring)
+_GRUPOS_OPERACOES = {
+    'trig': ('sin', 'cos', 'tan', 'sec', 'csc', 'cot'),
+    'hyperbolic': ('sinh', 'cosh', 'tanh'),
+    'inverse_trig': ('asin', 'acos'),
+    'special': ('erf', 'gamma', 'beta'),
+}
+
+def _contar_operacoes(expr: sp.Expr) -> Mapping[str, int]:
+    """
+    Conta os nós da expressão por classe em uma única travessia.
+    Inclui contagens derivadas: divisões, radicais, raízes quadradas e agrupamentos.
+    """
+    contagem = Counter()
+    for no in sp.preorder_traversal(expr):
+        contagem[type(no).__name__] += 1
+        if isinstance(no, sp.Function):
+            contagem['function_call'] += 1
+        elif isinstance(no, sp.Pow):
+            expoente = no.exp
+            if expoente.is_negative:
+                contagem['division'] += 1
+            if expoente.is_Rational and not expoente.is_Integer:
+                contagem['radical'] += 1
+                if abs(expoente) == sp.S.Half:
+                    contagem['sqrt'] += 1
+            if isinstance(no.base, sp.Add):
+                contagem['grouping'] += 1
+        elif isinstance(no, sp.Mul):
+            for arg in no.args:
+                # Coeficientes fracionários (x/2) e somas entre parênteses
+                if arg.is_Rational and not arg.is_Integer:
+                    contagem['division'] += 1
+                elif isinstance(arg, sp.Add):
+                    contagem['grouping'] += 1
+    
+    for grupo, nomes in _GRUPOS_OPERACOES.items():
+        contagem[grupo] = sum(contagem[nome] for nome in nomes)
+    contagem['nesting'] = contagem['function_call'] + contagem['grouping']
+    return MappingProxyType(dict(contagem))
+
+# Pesos da heurística de dificuldade: trig, exp, log, racional, radical, hiperbólica
+_PESOS_TIPOS = np.array([0.2, 0.15, 0.25, 0.3, 0.2, 0.2])
+
+def _score_difficulty(feat: np.ndarray) -> float:
+    """
+    Escore heurístico de dificuldade em [0, 1].
+    feat = [complexidade, trig, exp, log, racional, radical, hiperbólica, aninhamento]
+    """
+    score = min(0.3, feat[0] / 100.0)
+    for i in range(6):
+        if feat[i + 1] > 0:
+            score += _PESOS_TIPOS[i]
+    score += min(0.2, feat[7] / 10.0)
+    return max(0.0, min(1.0, score))
+
+def _fatores_tempo(comprimento: float, codigo_metodo: float, largura: float) -> Tuple[float, float, float, float]:
+    """
+    Fatores (complexidade, método, intervalo) e tempo estimado em segundos.
+    """
+    complexity_factor = min(5.0, comprimento / 20.0)
+    method_factor = codigo_metodo * 2.0
+    interval_factor = max(1.0, largura / 10.0)
+    return (complexity_factor, method_factor, interval_factor,
+            0.1 * complexity_factor * method_factor * interval_factor)
+
+if NUMBA_DISPONIVEL:
+    # Compilação persistida no __pycache__ (sem custo de JIT a cada inicialização)
+    _score_difficulty = njit(cache=True)(_score_difficulty)
+    _fatores_tempo = njit(cache=True)(_fatores_tempo)
+
+@lru_cache(maxsize=8)
+def _indices_grau2(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Índices (i <= j) dos produtos de grau 2, calculados uma vez por número de colunas.
+    """
+    return np.triu_indices(n)
+
+def _expandir_grau2(linhas: np.ndarray) -> np.ndarray:
+    """
+    Equivalente a PolynomialFeatures(degree=2, include_bias=False).transform:
+    colunas originais seguidas dos produtos x_i * x_j (i <= j), na mesma ordem.
+    """
+    linhas = np.atleast_2d(np.asarray(linhas, dtype=np.float32))
+    i, j = _indices_grau2(linhas.shape[1])
+    return np.hstack((linhas, linhas[:, i] * linhas[:, j]))
+
+@dataclass(frozen=True)
+class SymBundle:
+    """
+    Resultados simbólicos de uma função, calculados uma única vez por análise.
+    """
+    expr: sp.Expr
+    texto: str
+    d1: Optional[sp.Expr]
+    d2: Optional[sp.Expr]
+    lim_pos: Optional[sp.Expr]
+    lim_neg: Optional[sp.Expr]
+    lim_zero: Optional[sp.Expr]
+    degree: Optional[int]
+    elementar: bool
+    op_counts: Mapping[str, int]
+
+def _tentar(func: Callable[[], Any]) -> Any:
+    """
+    Executa func e devolve None se ela falhar.
+    """
+    try:
+        return func()
+    except Exception:
+        return None
+
+def _limites_racionais(expr: sp.Expr, x: sp.Symbol) -> Optional[Tuple[Any, Any, Any]]:
+    """
+    Limites em +oo, -oo e 0 de polinômios/funções racionais a partir dos graus
+    e coeficientes líderes (sem o algoritmo de Gruntz). None para outras funções.
+    """
+    if not expr.is_rational_function(x):
+        return None
+    
+    num, den = sp.fraction(sp.cancel(sp.together(expr)))
+    p_num, p_den = sp.Poly(num, x), sp.Poly(den, x)
+    grau = p_num.degree() - p_den.degree()
+    lc = p_num.LC() / p_den.LC()
+    
+    if grau > 0:
+        lim_pos = sp.oo * sp.sign(lc)
+        lim_neg = lim_pos if grau % 2 == 0 else -lim_pos
+    elif grau == 0:
+        lim_pos = lim_neg = lc
+    else:
+        lim_pos = lim_neg = sp.Integer(0)
+    
+    # Em 0: menor potência presente no numerador e no denominador
+    v_num = min(m[0] for m in p_num.monoms())
+    v_den = min(m[0] for m in p_den.monoms())
+    if v_num > v_den:
+        lim_zero = sp.Integer(0)
+    elif v_num == v_den:
+        lim_zero = p_num.coeff_monomial(x**v_num) / p_den.coeff_monomial(x**v_den)
+    else:
+        # Polo em 0: deixa o caso (sinal lateral) para sp.limit
+        lim_zero = sp.limit(expr, x, 0)
+    
+    return lim_pos, lim_neg, lim_zero
+
+@lru_cache(maxsize=4096)
+def _sympify(function_canon: str) -> sp.Expr:
+    """
+    Converte a string canônica em expressão SymPy (imutável, compartilhável).
+    """
+    return sp.sympify(function_canon)
+
+@lru_cache(maxsize=1024)
+def _compute_symbolic_bundle(function_canon: str) -> SymBundle:
+    """
+    Calcula derivadas, limites e grau da função (memoizado pela string canônica).
+    """
+    x = _X
+    expr = _sympify(function_canon)
+    
+    d1 = _tentar(lambda: diff(expr, x))
+    d2 = _tentar(lambda: diff(d1, x)) if d1 is not None else None
+    
+    # Grau só existe para polinômios em x
+    degree = _tentar(lambda: int(sp.degree(expr, x))) if expr.is_polynomial(x) else None
+    
+    # Polinômios e funções racionais têm primitiva elementar garantida; a
+    # integração simbólica completa é cara demais para virar uma feature
+    elementar = bool(expr.is_polynomial(x) or expr.is_rational_function(x))
+    
+    limites = _tentar(lambda: _limites_racionais(expr, x)) if elementar else None
+    if limites is None:
+        limites = (
+            _tentar(lambda: sp.limit(expr, x, sp.oo)),
+            _tentar(lambda: sp.limit(expr, x, -sp.oo)),
+            _tentar(lambda: sp.limit(expr, x, 0)),
+        )
+    lim_pos, lim_neg, lim_zero = limites
+    
+    return SymBundle(
+        expr=expr,
+        texto=str(expr),
+        d1=d1,
+        d2=d2,
+        lim_pos=lim_pos,
+        lim_neg=lim_neg,
+        lim_zero=lim_zero,
+        degree=degree,
+        elementar=elementar,
+        op_counts=_contar_operacoes(expr)
+    )
+
+@lru_cache(maxsize=1024)
+def _derivada_numerica(function_canon: str) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """
+    Primeira derivada como função vetorizada, construída uma vez por função
+    (ufunc compilada com numba quando disponível; senão lambdify NumPy).
+    """
+    d1 = _compute_symbolic_bundle(function_canon).d1
+    if d1 is None:
+        return None
+    
+    if NUMBA_DISPONIVEL:
+        try:
+            return vectorize(['float64(float64)'])(lambdify(_X, d1, modules='math'))
+        except Exception:
+            pass
+    
+    return lambdify(_X, d1, modules=['numpy'])
+
+# Acima deste grau (ou fora de polinômios) o sp.solve da derivada não compensa
+_GRAU_MAXIMO_SOLVE = 6
+
+def _contar_pontos_criticos(d1: sp.Expr) -> int:
+    """
+    Número de raízes da derivada, resolvido só para polinômios de grau baixo.
+    """
+    if not d1.is_polynomial(_X):
+        return 0
+    try:
+        if sp.degree(d1, _X) > _GRAU_MAXIMO_SOLVE:
+            return 0
+        return len(sp.solve(d1, _X))
+    except (sp.PolynomialError, NotImplementedError):
+        return 0
+
+def _caracteristicas_do_bundle(bundle: SymBundle) -> Tuple[float, ...]:
+    """
+    Vetor de características para ML a partir dos resultados simbólicos.
+    """
+    x = _X
+    expr = bundle.expr
+    ops = bundle.op_counts
+    features = []
+    
+    # 1. Características básicas
+    complexity = len(bundle.texto)
+    features.append(complexity)
+    
+    # 2. Grau do polinômio (se aplicável)
+    features.append(bundle.degree if bundle.degree is not None else 0)
+    
+    # 3. Número de operações
+    operations = ('Add', 'Mul', 'Pow', 'sin', 'cos', 'tan', 'exp', 'log', 'sqrt')
+    features.extend(ops.get(op, 0) for op in operations)
+    
+    # 4. Características das derivadas
+    if bundle.d1 is not None and bundle.d2 is not None:
+        features.append(len(str(bundle.d1)))
+        features.append(len(str(bundle.d2)))
+        
+        # Singularidades aparentes
+        features.append(_contar_pontos_criticos(bundle.d1))
+    else:
+        features.extend([0, 0, 0])
+    
+    # 5. Características de integração
+    features.append(10 if bundle.elementar else 100)
+    features.append(0 if bundle.elementar else 1)
+    
+    # 6. Características de estabilidade numérica
+    # Verificar crescimento da função
+    growth_factor = 0
+    if bundle.lim_pos == sp.oo or bundle.lim_neg == sp.oo:
+        growth_factor = 2
+    elif bundle.lim_pos == -sp.oo or bundle.lim_neg == -sp.oo:
+        growth_factor = 2
+    elif bundle.lim_pos is None or bundle.lim_neg is None:
+        growth_factor = 1
+    
+    features.append(growth_factor)
+    
+    # 7. Densidade de singularidades
+    singularity_indicators = ops.get('division', 0) + ops.get('log', 0)
+    features.append(singularity_indicators)
+    
+    return tuple(float(f) for f in features)
+
+@lru_cache(maxsize=4096)
+def _extrair_caracteristicas(function_canon: str) -> Tuple[float, ...]:
+    """
+    Extrai as características da função (memoizado pela string canônica).
+    """
+    persistidas = _ler_disco("features", function_canon)
+    if persistidas is not None:
+        return tuple(float(f) for f in persistidas)
+    
+    try:
+        features = _caracteristicas_do_bundle(_compute_symbolic_bundle(function_canon))
+        _gravar_disco("features", function_canon, features)
+        return features
+    except Exception as e:
+        logger.warning(f"Erro ao extrair características: {str(e)}")
+        # Retornar features padrão em caso de erro
+        return (0.0,) * 20
+
+def _gerar_funcoes_sinteticas(quantidade: int = 600, semente: int = 42) -> List[str]:
+    """
+    Corpus sintético para o treino: somas e produtos de termos elementares.
+    """
+    rng = np.random.default_rng(semente)
+    termos = [
+        'x', 'x**2', 'x**3', 'sqrt(x)', '1/(x+2)', 'sin(x)', 'cos(x)', 'tan(x)',
+        'exp(x)', 'exp(-x**2)', 'log(x+1)', 'sinh(x)', 'cosh(x)', 'atan(x)',
+        'sin(x**2)', 'exp(sin(x))', 'log(x**2+1)', '1/(x**2+1)', 'sqrt(x**2+1)'
+    ]
+    funcoes = []
+    for _ in range(quantidade):
+        partes = rng.choice(termos, size=rng.integers(1, 4))
+        operadores = rng.choice(['+', '*', '-'], size=len(partes) - 1)
+        funcao = str(partes[0])
+        for operador, parte in zip(operadores, partes[1:]):
+            funcao = f"{funcao} {operador} {int(rng.integers(1, 5))}*{parte}"
+        funcoes.append(funcao)
+    return list(dict.fromkeys(funcoes))
+
+class _LotePredicoes:
+    """
+    Agrupa predições de uma única amostra feitas dentro de uma janela curta
+    em uma só chamada predict sobre a matriz empilhada (micro-batching).
+    """
+    
+    def __init__(self, prever_matriz: Callable[[np.ndarray], np.ndarray],
+                 janela: float = 0.01, tamanho_maximo: int = 64):
+        self.prever_matriz = prever_matriz
+        self.janela = janela
+        self.tamanho_maximo = tamanho_maximo
+        self._fila: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._consumidor: Optional[asyncio.Task] = None
+        # Matriz float32 reaproveitada entre lotes (um único consumidor por loop)
+        self._buffer: Optional[np.ndarray] = None
+    
+    def iniciar(self):
+        """
+        Cria a fila e a task consumidora no event loop em execução.
+        """
+        self.encerrar()
+        self._loop = asyncio.get_running_loop()
+        self._fila = asyncio.Queue()
+        # Referência mantida na instância: o loop guarda tasks apenas como weakref
+        self._consumidor = self._loop.create_task(self._consumir(self._fila))
+    
+    def encerrar(self):
+        """
+        Cancela a task consumidora, se houver.
+        """
+        if self._consumidor is not None:
+            self._consumidor.cancel()
+            self._consumidor = None
+        self._loop = None
+        self._fila = None
+    
+    async def prever(self, linha: np.ndarray) -> float:
+        """
+        Enfileira uma linha de características e aguarda a predição do lote.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Fila e consumidor pertencem ao event loop em execução (normalmente
+            # criados no lifespan; aqui só quando usado fora da aplicação)
+            self.iniciar()
+        
+        futuro = loop.create_future()
+        await self._fila.put((linha, futuro))
+        return await futuro
+    
+    async def _consumir(self, fila: asyncio.Queue):
+        """
+        Coleta pedidos por até `janela` segundos e resolve todos com um único predict.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await fila.get()]
+            limite = loop.time() + self.janela
+            while len(lote) < self.tamanho_maximo:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                n_colunas = lote[0][0].shape[-1]
+                if self._buffer is None or self._buffer.shape[1] != n_colunas:
+                    self._buffer = np.empty((self.tamanho_maximo, n_colunas), dtype=np.float32)
+                matriz = self._buffer[:len(lote)]
+                np.stack([linha for linha, _ in lote], out=matriz)
+                # predict fora do event loop; o buffer só é reutilizado após o retorno
+                resultados = await executar_em_pool(self.prever_matriz, matriz)
+                for (_, futuro), valor in zip(lote, resultados):
+                    if not futuro.done():
+                        futuro.set_result(float(valor))
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+
 class MLPredictionService:
     """
     Serviço de Machine Learning para predições matemáticas inteligentes.
@@ -26,32 +495,52 @@ class MLPredictionService:
     def __init__(self):
         self.models = {}
         self.scalers = {}
-        self.feature_generators = {}
-        self.model_cache_dir = "ml_models_cache"
-        self.x = symbols('x')
+        self.model_cache_dir = _DIRETORIO_CACHE_ML
+        self.x = _X
+        
+        # Análises completas já calculadas, indexadas pela string canônica
+        self._analysis_cache = LRUCache(maxsize=1024)
+        self._analysis_lock = threading.Lock()
+        
+        # Linha float32 (1, n) reaproveitada por thread nas predições individuais
+        self._buffers = threading.local()
         
         # Criar diretório de cache se não existir
         os.makedirs(self.model_cache_dir, exist_ok=True)
         
-        # Inicializar modelos base
+        # Inicializar modelos base e substituir pelos já treinados salvos em disco
         self._initialize_base_models()
+        self._carregar_modelos_persistidos()
+        
+        # Predições agrupadas entre requisições concorrentes, uma fila por modelo
+        self._lotes = {
+            model_name: _LotePredicoes(functools.partial(self._prever_matriz, model_name))
+            for model_name in self.models
+        }
+    
+    def iniciar_lotes(self):
+        """
+        Inicia os consumidores de micro-batching no event loop em execução.
+        """
+        for lote in self._lotes.values():
+            lote.iniciar()
+    
+    def encerrar_lotes(self):
+        """
+        Cancela os consumidores de micro-batching.
+        """
+        for lote in self._lotes.values():
+            lote.encerrar()
     
     def _initialize_base_models(self):
         """
-        Inicializa modelos base para diferentes tipos de predições.
+        Inicializa os modelos base consultados pelas predições.
         """
+        # Só a dificuldade de integração consulta um modelo treinado; tempo,
+        # estabilidade e convergência usam heurísticas até existir treino para elas
         self.models = {
             'integration_difficulty': RandomForestRegressor(
-                n_estimators=100, random_state=42
-            ),
-            'computation_time': GradientBoostingRegressor(
-                n_estimators=100, random_state=42
-            ),
-            'numerical_stability': RandomForestRegressor(
-                n_estimators=50, random_state=42
-            ),
-            'convergence_predictor': GradientBoostingRegressor(
-                n_estimators=80, random_state=42
+                n_estimators=50, n_jobs=settings.max_workers, random_state=42
             )
         }
         
@@ -59,192 +548,197 @@ class MLPredictionService:
             model_name: StandardScaler() 
             for model_name in self.models.keys()
         }
+    
+    def _caminho_modelo(self, model_name: str) -> str:
+        return os.path.join(self.model_cache_dir, f"{model_name}.joblib")
+    
+    def _carregar_modelos_persistidos(self):
+        """
+        Carrega modelos e scalers treinados salvos em disco (mmap somente leitura,
+        compartilhado entre workers); modelos ausentes seguem com as heurísticas.
+        """
+        for model_name in self.models:
+            caminho = self._caminho_modelo(model_name)
+            if not os.path.exists(caminho):
+                continue
+            try:
+                model, scaler = joblib.load(caminho, mmap_mode='r')
+                self.models[model_name] = model
+                self.scalers[model_name] = scaler
+                logger.info(f"Modelo '{model_name}' carregado de {caminho}")
+            except Exception as e:
+                logger.warning(f"Falha ao carregar modelo '{model_name}': {str(e)}")
+    
+    def treinar_modelos(self, funcoes: Optional[List[str]] = None, salvar: bool = True) -> Dict[str, Any]:
+        """
+        Treina o modelo de dificuldade de integração e, por padrão, persiste em disco
+        para os próximos inícios. Sem corpus, usa funções sintéticas rotuladas pela
+        heurística (o modelo passa a generalizá-la sobre as 18 características).
+        """
+        if funcoes is None:
+            funcoes = _gerar_funcoes_sinteticas()
         
-        self.feature_generators = {
-            model_name: PolynomialFeatures(degree=2, include_bias=False)
-            for model_name in self.models.keys()
+        linhas, alvos = [], []
+        for funcao in funcoes:
+            try:
+                linhas.append(self.extract_function_features(funcao))
+                alvos.append(self._heuristic_integration_difficulty(funcao)['difficulty_score'] * 100)
+            except Exception as e:
+                logger.debug(f"Função ignorada no treino ({funcao}): {str(e)}")
+        if len(linhas) < 10:
+            raise ValueError("Funções insuficientes para treinar o modelo")
+        
+        X, y = np.vstack(linhas), np.asarray(alvos)
+        X_treino, X_teste, y_treino, y_teste = train_test_split(X, y, test_size=0.2, random_state=42)
+        
+        scaler = StandardScaler().fit(X_treino)
+        model = RandomForestRegressor(n_estimators=50, n_jobs=settings.max_workers, random_state=42)
+        model.fit(_expandir_grau2(scaler.transform(X_treino)), y_treino)
+        previsto = model.predict(_expandir_grau2(scaler.transform(X_teste)))
+        
+        self.models['integration_difficulty'] = model
+        self.scalers['integration_difficulty'] = scaler
+        
+        return {
+            'amostras': len(linhas),
+            'r2': float(r2_score(y_teste, previsto)),
+            'mse': float(mean_squared_error(y_teste, previsto)),
+            'salvos': self.salvar_modelos() if salvar else []
         }
     
-    def extract_function_features(self, function_str: str) -> np.ndarray:
+    def salvar_modelos(self) -> List[str]:
+        """
+        Persiste em disco os modelos já treinados (com seus scalers).
+        """
+        salvos = []
+        for model_name in self.models:
+            if not self._modelo_treinado(model_name):
+                continue
+            # Sem compressão: permite carregar com mmap_mode='r'
+            joblib.dump((self.models[model_name], self.scalers[model_name]),
+                        self._caminho_modelo(model_name))
+            salvos.append(model_name)
+        return salvos
+    
+    def extract_function_features(self, function_str: str, bundle: Optional[SymBundle] = None) -> np.ndarray:
         """
-        Extrai características matemáticas de uma função para ML.
+        Extrai características matemáticas de uma função para ML (float64: os valores
+        reportados nas respostas saem daqui; só a entrada do predict vira float32).
+        """
+        if bundle is not None:
+            return np.asarray(_caracteristicas_do_bundle(bundle), dtype=float)
+        return np.asarray(_extrair_caracteristicas(canonizar_funcao(function_str)), dtype=float)
+    
+    def predict_integration_difficulty(self, function_str: str, features: np.ndarray = None,
+                                       bundle: Optional[SymBundle] = None) -> Dict[str, Any]:
+        """
+        Prediz a dificuldade de integração de uma função.
         """
         try:
-            expr = sp.sympify(function_str.replace('^', '**'))
-            
-            features = []
+            if features is None:
+                features = self.extract_function_features(function_str, bundle=bundle)
             
-            # 1. Características básicas
-            complexity = len(str(expr))
-            features.append(complexity)
-            
-            # 2. Grau do polinômio (se aplicável)
-            try:
-                degree = sp.degree(expr, self.x)
-                features.append(degree if degree is not None else 0)
-            except:
-                features.append(0)
-            
-            # 3. Número de operações
-            operations = {
-                'add': expr.count(sp.Add),
-                'mul': expr.count(sp.Mul),
-                'pow': expr.count(sp.Pow),
-                'sin': expr.count(sp.sin),
-                'cos': expr.count(sp.cos),
-                'tan': expr.count(sp.tan),
-                'exp': expr.count(sp.exp),
-                'log': expr.count(sp.log),
-                'sqrt': expr.count(sp.sqrt)
-            }
-            
-            features.extend(list(operations.values()))
-            
-            # 4. Características das derivadas
-            try:
-                first_deriv = diff(expr, self.x)
-                second_deriv = diff(first_deriv, self.x)
-                
-                features.append(len(str(first_deriv)))
-                features.append(len(str(second_deriv)))
-                
-                # Singularidades aparentes
-                critical_points = sp.solve(first_deriv, self.x)
-                features.append(len(critical_points) if isinstance(critical_points, list) else 0)
-            except:
-                features.extend([0, 0, 0])
-            
-            # 5. Características de integração
-            try:
-                # Tentar integração simbólica simples
-                antiderivative = integrate(expr, self.x)
-                features.append(len(str(antiderivative)))
-                
-                # Verificar se há funções especiais
-                has_special_functions = any(
-                    func in str(antiderivative) 
-                    for func in ['Integral', 'erf', 'gamma', 'Ei', 'Si', 'Ci']
-                )
-                features.append(int(has_special_functions))
-            except:
-                features.extend([1000, 1])  # Valores indicando dificuldade
-            
-            # 6. Características de estabilidade numérica
-            # Verificar crescimento da função
-            try:
-                limit_inf = sp.limit(expr, self.x, sp.oo)
-                limit_neg_inf = sp.limit(expr, self.x, -sp.oo)
-                
-                growth_factor = 0
-                if limit_inf == sp.oo or limit_neg_inf == sp.oo:
-                    growth_factor = 2
-                elif limit_inf == -sp.oo or limit_neg_inf == -sp.oo:
-                    growth_factor = 2
-                elif limit_inf is None or limit_neg_inf is None:
-                    growth_factor = 1
-                
-                features.append(growth_factor)
-            except:
-                features.append(1)
-            
-            # 7. Densidade de singularidades
-            function_str_clean = str(expr)
-            singularity_indicators = function_str_clean.count('/') + function_str_clean.count('log')
-            features.append(singularity_indicators)
+            # Se o modelo não foi treinado, usar heurísticas
+            if not self._modelo_treinado('integration_difficulty'):
+                return self._heuristic_integration_difficulty(function_str, features, bundle=bundle)
             
-            return np.array(features, dtype=float)
+            # Usar modelo treinado
+            difficulty_score = self._prever_matriz('integration_difficulty', self._linha_unica(features))[0]
+            return self._formatar_dificuldade(difficulty_score, features)
             
         except Exception as e:
-            logger.warning(f"Erro ao extrair características: {str(e)}")
-            # Retornar features padrão em caso de erro
-            return np.zeros(20, dtype=float)
+            logger.error(f"Erro na predição de dificuldade: {str(e)}")
+            return self._heuristic_integration_difficulty(function_str, bundle=bundle)
     
-    def predict_integration_difficulty(self, function_str: str) -> Dict[str, Any]:
+    async def predict_integration_difficulty_async(self, function_str: str) -> Dict[str, Any]:
         """
-        Prediz a dificuldade de integração de uma função.
+        Versão assíncrona: com modelo treinado, a predição entra no lote compartilhado.
         """
         try:
             features = self.extract_function_features(function_str)
-            
-            # Se o modelo não foi treinado, usar heurísticas
-            if not hasattr(self.models['integration_difficulty'], 'feature_importances_'):
+            if not self._modelo_treinado('integration_difficulty'):
                 return self._heuristic_integration_difficulty(function_str, features)
             
-            # Usar modelo treinado
-            features_scaled = self.scalers['integration_difficulty'].transform([features])
-            features_poly = self.feature_generators['integration_difficulty'].transform(features_scaled)
-            
-            difficulty_score = self.models['integration_difficulty'].predict(features_poly)[0]
-            
-            # Normalizar score entre 0 e 1
-            difficulty_normalized = max(0, min(1, difficulty_score / 100))
-            
-            # Classificar dificuldade
-            if difficulty_normalized < 0.3:
-                difficulty_level = "Fácil"
-                recommended_method = "simpson"
-            elif difficulty_normalized < 0.7:
-                difficulty_level = "Moderada"
-                recommended_method = "adaptativo"
-            else:
-                difficulty_level = "Difícil"
-                recommended_method = "monte_carlo"
-            
-            return {
-                'difficulty_score': float(difficulty_normalized),
-                'difficulty_level': difficulty_level,
-                'recommended_method': recommended_method,
-                'confidence': 0.8,  # Placeholder para confiança
-                'features_used': len(features)
-            }
+            difficulty_score = await self._lotes['integration_difficulty'].prever(features)
+            return self._formatar_dificuldade(difficulty_score, features)
             
         except Exception as e:
             logger.error(f"Erro na predição de dificuldade: {str(e)}")
             return self._heuristic_integration_difficulty(function_str)
     
-    def _heuristic_integration_difficulty(self, function_str: str, features: np.ndarray = None) -> Dict[str, Any]:
+    def _modelo_treinado(self, model_name: str) -> bool:
+        """
+        Indica se o modelo já foi ajustado (caso contrário usam-se heurísticas).
+        """
+        return hasattr(self.models[model_name], 'n_features_in_')
+    
+    def _linha_unica(self, features: np.ndarray) -> np.ndarray:
+        """
+        Copia as características para o buffer (1, n) da thread atual; o scaler
+        transforma esse buffer no lugar sem alterar o array do chamador.
+        """
+        buffer = getattr(self._buffers, 'linha', None)
+        if buffer is None or buffer.shape[1] != features.shape[-1]:
+            buffer = np.empty((1, features.shape[-1]), dtype=np.float32)
+            self._buffers.linha = buffer
+        buffer[0] = features
+        return buffer
+    
+    def _prever_matriz(self, model_name: str, matriz: np.ndarray) -> np.ndarray:
+        """
+        Escala, expande (grau 2) e prediz um lote de linhas de características.
+        """
+        features_scaled = self.scalers[model_name].transform(matriz, copy=False)
+        return self.models[model_name].predict(_expandir_grau2(features_scaled))
+    
+    def _formatar_dificuldade(self, difficulty_score: float, features: np.ndarray) -> Dict[str, Any]:
+        """
+        Normaliza o escore do modelo e classifica a dificuldade.
+        """
+        # Normalizar score entre 0 e 1
+        difficulty_normalized = max(0, min(1, difficulty_score / 100))
+        
+        # Classificar dificuldade
+        if difficulty_normalized < 0.3:
+            difficulty_level = "Fácil"
+            recommended_method = "simpson"
+        elif difficulty_normalized < 0.7:
+            difficulty_level = "Moderada"
+            recommended_method = "adaptativo"
+        else:
+            difficulty_level = "Difícil"
+            recommended_method = "monte_carlo"
+        
+        return {
+            'difficulty_score': float(difficulty_normalized),
+            'difficulty_level': difficulty_level,
+            'recommended_method': recommended_method,
+            'confidence': 0.8,  # Placeholder para confiança
+            'features_used': len(features)
+        }
+    
+    def _heuristic_integration_difficulty(self, function_str: str, features: np.ndarray = None,
+                                          bundle: Optional[SymBundle] = None) -> Dict[str, Any]:
         """
         Heurística para estimar dificuldade quando modelo não está disponível.
         """
         try:
-            expr = sp.sympify(function_str.replace('^', '**'))
-            
-            difficulty_score = 0.0
-            
-            # Analisar complexidade básica
-            complexity = len(str(expr))
-            difficulty_score += min(0.3, complexity / 100)
-            
-            # Analisar tipos de funções
-            function_types = {
-                'trigonometric': any(f in str(expr) for f in ['sin', 'cos', 'tan', 'sec', 'csc', 'cot']),
-                'exponential': 'exp' in str(expr),
-                'logarithmic': 'log' in str(expr),
-                'rational': '/' in str(expr),
-                'radical': any(f in str(expr) for f in ['sqrt', 'cbrt']),
-                'hyperbolic': any(f in str(expr) for f in ['sinh', 'cosh', 'tanh'])
-            }
-            
-            # Pontuar baseado nos tipos de função
-            type_scores = {
-                'trigonometric': 0.2,
-                'exponential': 0.15,
-                'logarithmic': 0.25,
-                'rational': 0.3,
-                'radical': 0.2,
-                'hyperbolic': 0.2
-            }
-            
-            for func_type, present in function_types.items():
-                if present:
-                    difficulty_score += type_scores[func_type]
-            
-            # Analisar composição de funções
-            nesting_level = str(expr).count('(')
-            difficulty_score += min(0.2, nesting_level / 10)
-            
-            # Normalizar
-            difficulty_score = max(0, min(1, difficulty_score))
+            if bundle is None:
+                bundle = _compute_symbolic_bundle(canonizar_funcao(function_str))
+            ops = bundle.op_counts
+            
+            # Complexidade, presença de cada tipo de função e nível de composição
+            feat = np.array([
+                len(bundle.texto),
+                ops.get('trig', 0),
+                ops.get('exp', 0),
+                ops.get('log', 0),
+                ops.get('division', 0),
+                ops.get('radical', 0),
+                ops.get('hyperbolic', 0),
+                ops.get('nesting', 0)
+            ], dtype=np.float64)
+            difficulty_score = _score_difficulty(feat)
             
             # Classificar
             if difficulty_score < 0.3:
@@ -299,24 +793,10 @@ class MLPredictionService:
             
             extended_features = np.concatenate([features, additional_features])
             
-            # Heurística para tempo de computação
-            base_time = 0.1  # 100ms base
-            
-            # Fator de complexidade da função
-            complexity_factor = min(5.0, len(str(function_str)) / 20)
-            
-            # Fator do método
-            method_factor = method_encoding.get(method, 0.5) * 2
-            
-            # Fator do intervalo
-            interval_factor = max(1.0, abs(bounds[1] - bounds[0]) / 10)
-            
-            estimated_time = base_time * complexity_factor * method_factor * interval_factor
-            
-            # Adicionar variação aleatória pequena
-            import random
-            random_factor = 1 + (random.random() - 0.5) * 0.2
-            estimated_time *= random_factor
+            # Heurística para tempo de computação (100ms base × fatores)
+            complexity_factor, method_factor, interval_factor, estimated_time = _fatores_tempo(
+                float(len(function_str)), method_encoding.get(method, 0.5), abs(bounds[1] - bounds[0])
+            )
             
             return {
                 'estimated_time_seconds': float(estimated_time),
@@ -341,36 +821,32 @@ class MLPredictionService:
         Prediz resolução ótima para visualização/cálculo.
         """
         try:
-            features = self.extract_function_features(function_str)
+            chave = canonizar_funcao(function_str)
+            bundle = _compute_symbolic_bundle(chave)
+            features = self.extract_function_features(function_str, bundle=bundle)
             
-            # Análise da variação da função
-            expr = sp.sympify(function_str.replace('^', '**'))
-            
-            # Calcular derivada para estimar variação
+            # Derivada numérica construída uma vez por função e reaproveitada
             try:
-                first_deriv = diff(expr, self.x)
+                deriv_func = _derivada_numerica(chave)
                 
-                # Amostrar alguns pontos para estimar variação
+                # Amostrar alguns pontos para estimar variação (uma única chamada vetorizada)
                 x_vals = np.linspace(bounds[0], bounds[1], 20)
-                func = lambdify(self.x, expr, modules=['numpy'])
-                deriv_func = lambdify(self.x, first_deriv, modules=['numpy'])
                 
-                variations = []
-                for x_val in x_vals:
-                    try:
-                        deriv_val = abs(float(deriv_func(x_val)))
-                        if np.isfinite(deriv_val):
-                            variations.append(deriv_val)
-                    except:
-                        continue
+                with np.errstate(all='ignore'):
+                    variations = np.abs(np.asarray(
+                        np.broadcast_to(deriv_func(x_vals), x_vals.shape), dtype=float
+                    ))
+                variations = variations[np.isfinite(variations)]
                 
-                if variations:
-                    max_variation = max(variations)
-                    avg_variation = sum(variations) / len(variations)
+                if variations.size:
+                    max_variation = float(variations.max())
+                    avg_variation = float(variations.mean())
                 else:
                     max_variation = avg_variation = 1.0
                     
-            except:
+            except (TypeError, ValueError, NameError, ZeroDivisionError, OverflowError) as e:
+                # Derivada indisponível (None) ou não avaliável numericamente
+                logger.debug(f"Derivada numérica indisponível para {chave}: {str(e)}")
                 max_variation = avg_variation = 1.0
             
             # Calcular resolução baseada na variação
@@ -412,21 +888,47 @@ class MLPredictionService:
         """
         Análise completa do comportamento de uma função usando ML.
         """
+        # A análise é determinística: reaproveitar o resultado da mesma função
+        chave = canonizar_funcao(function_str)
+        with self._analysis_lock:
+            em_cache = self._analysis_cache.get(chave)
+        if em_cache is None:
+            em_cache = _ler_disco("analysis", chave)
+            if em_cache is not None:
+                with self._analysis_lock:
+                    self._analysis_cache[chave] = em_cache
+        if em_cache is not None:
+            # A chave é canônica: devolver a grafia enviada nesta requisição
+            analysis = copy.deepcopy(em_cache)
+            analysis['function'] = function_str
+            return analysis
+        
         try:
-            features = self.extract_function_features(function_str)
-            expr = sp.sympify(function_str.replace('^', '**'))
+            # Trabalho simbólico (derivadas, limites, grau) feito uma única vez
+            bundle = _compute_symbolic_bundle(chave)
+            expr = bundle.expr
+            features = self.extract_function_features(function_str, bundle=bundle)
+            integration_analysis = self.predict_integration_difficulty(
+                function_str, features=features, bundle=bundle
+            )
             
             analysis = {
                 'function': function_str,
                 'complexity_score': float(features[0] / 100),  # Normalizado
-                'function_type': self._classify_function_type(expr),
-                'integration_analysis': self.predict_integration_difficulty(function_str),
-                'stability_analysis': self._analyze_numerical_stability(expr),
-                'domain_analysis': self._analyze_domain_restrictions(expr),
-                'asymptotic_behavior': self._analyze_asymptotic_behavior(expr),
-                'recommended_strategies': self._recommend_computation_strategies(function_str, features)
+                'function_type': self._classify_function_type(expr, bundle=bundle),
+                'integration_analysis': integration_analysis,
+                'stability_analysis': self._analyze_numerical_stability(expr, bundle=bundle),
+                'domain_analysis': self._analyze_domain_restrictions(expr, bundle=bundle),
+                'asymptotic_behavior': self._analyze_asymptotic_behavior(expr, bundle=bundle),
+                'recommended_strategies': self._recommend_computation_strategies(
+                    function_str, features, integration_analysis
+                )
             }
             
+            with self._analysis_lock:
+                self._analysis_cache[chave] = copy.deepcopy(analysis)
+            _gravar_disco("analysis", chave, analysis)
+            
             return analysis
             
         except Exception as e:
@@ -437,46 +939,52 @@ class MLPredictionService:
                 'basic_analysis': True
             }
     
-    def _classify_function_type(self, expr) -> Dict[str, Any]:
+    def _classify_function_type(self, expr, bundle: Optional[SymBundle] = None) -> Dict[str, Any]:
         """
         Classifica o tipo da função.
         """
-        function_str = str(expr)
+        if bundle is None:
+            bundle = _compute_symbolic_bundle(str(expr))
+        ops = bundle.op_counts
         
         types = {
-            'polynomial': sp.degree(expr, self.x) is not None and sp.degree(expr, self.x) >= 0,
-            'rational': '/' in function_str,
-            'trigonometric': any(f in function_str for f in ['sin', 'cos', 'tan']),
-            'exponential': 'exp' in function_str,
-            'logarithmic': 'log' in function_str,
-            'radical': any(f in function_str for f in ['sqrt', 'cbrt']),
-            'hyperbolic': any(f in function_str for f in ['sinh', 'cosh', 'tanh']),
-            'special': any(f in function_str for f in ['erf', 'gamma', 'beta'])
+            'polynomial': bundle.degree is not None,
+            'rational': ops.get('division', 0) > 0,
+            'trigonometric': ops.get('trig', 0) > 0,
+            'exponential': ops.get('exp', 0) > 0,
+            'logarithmic': ops.get('log', 0) > 0,
+            'radical': ops.get('radical', 0) > 0,
+            'hyperbolic': ops.get('hyperbolic', 0) > 0,
+            'special': ops.get('special', 0) > 0
         }
         
-        primary_type = max(types.items(), key=lambda x: x[1])[0] if any(types.values()) else 'unknown'
+        # Tipos presentes calculados uma única vez (primeiro presente = tipo primário)
+        all_types = [k for k, v in types.items() if v]
+        primary_type = all_types[0] if all_types else 'unknown'
+        n_types = len(all_types)
         
         return {
             'primary_type': primary_type,
-            'all_types': [k for k, v in types.items() if v],
-            'complexity_level': 'high' if len([k for k, v in types.items() if v]) > 2 else 'medium' if len([k for k, v in types.items() if v]) > 1 else 'low'
+            'all_types': all_types,
+            'complexity_level': 'high' if n_types > 2 else 'medium' if n_types > 1 else 'low'
         }
     
-    def _analyze_numerical_stability(self, expr) -> Dict[str, Any]:
+    def _analyze_numerical_stability(self, expr, bundle: Optional[SymBundle] = None) -> Dict[str, Any]:
         """
         Analisa estabilidade numérica da função.
         """
         try:
+            if bundle is None:
+                bundle = _compute_symbolic_bundle(str(expr))
+            
             # Verificar crescimento da função
             limits = {
-                'at_infinity': sp.limit(expr, self.x, sp.oo),
-                'at_neg_infinity': sp.limit(expr, self.x, -sp.oo),
-                'at_zero': sp.limit(expr, self.x, 0)
+                'at_infinity': bundle.lim_pos,
+                'at_neg_infinity': bundle.lim_neg,
+                'at_zero': bundle.lim_zero
             }
-            
-            # Analisar derivadas para detectar oscilações
-            first_deriv = diff(expr, self.x)
-            second_deriv = diff(first_deriv, self.x)
+            if any(v is None for v in limits.values()):
+                raise ValueError("Não foi possível calcular os limites da função")
             
             stability_score = 1.0
             issues = []
@@ -486,16 +994,18 @@ class MLPredictionService:
                 stability_score -= 0.3
                 issues.append("Crescimento explosivo detectado")
             
+            ops = bundle.op_counts
+            
             # Verificar oscilações rápidas
-            if any(f in str(expr) for f in ['sin', 'cos', 'tan']):
-                # Verificar frequência alta
-                if any(str(coef).replace('.', '').isdigit() and float(str(coef)) > 10 
-                       for coef in expr.atoms(sp.Number) if str(coef) != '1'):
+            if ops.get('trig', 0) > 0:
+                # Verificar frequência alta (uma redução NumPy sobre os coeficientes)
+                coeficientes = np.fromiter((float(n) for n in expr.atoms(sp.Number)), dtype=float)
+                if coeficientes.size and (np.abs(coeficientes) > 10).any():
                     stability_score -= 0.2
                     issues.append("Oscilações de alta frequência")
             
             # Verificar singularidades
-            if '/' in str(expr):
+            if ops.get('division', 0) > 0:
                 stability_score -= 0.2
                 issues.append("Possíveis singularidades")
             
@@ -516,33 +1026,33 @@ class MLPredictionService:
                 'error': str(e)
             }
     
-    def _analyze_domain_restrictions(self, expr) -> Dict[str, Any]:
+    def _analyze_domain_restrictions(self, expr, bundle: Optional[SymBundle] = None) -> Dict[str, Any]:
         """
         Analisa restrições de domínio da função.
         """
         try:
+            if bundle is None:
+                bundle = _compute_symbolic_bundle(str(expr))
+            ops = bundle.op_counts
+            
             restrictions = []
             critical_points = []
             
             # Verificar logaritmos
-            if any(f in str(expr) for f in ['log', 'ln']):
+            if ops.get('log', 0) > 0:
                 restrictions.append("Argumentos de logaritmos devem ser positivos")
             
             # Verificar raízes pares
-            if 'sqrt' in str(expr):
+            if ops.get('sqrt', 0) > 0:
                 restrictions.append("Argumentos de raízes quadradas devem ser não-negativos")
             
             # Verificar divisões por zero
-            if '/' in str(expr):
-                # Tentar encontrar zeros do denominador
-                try:
-                    # Esta é uma análise simplificada
-                    restrictions.append("Verificar zeros do denominador")
-                except:
-                    pass
+            if ops.get('division', 0) > 0:
+                # Análise simplificada: apenas sinaliza os zeros do denominador
+                restrictions.append("Verificar zeros do denominador")
             
             # Verificar funções trigonométricas inversas
-            if any(f in str(expr) for f in ['asin', 'acos']):
+            if ops.get('inverse_trig', 0) > 0:
                 restrictions.append("Argumentos de funções trigonométricas inversas devem estar em [-1, 1]")
             
             return {
@@ -559,20 +1069,25 @@ class MLPredictionService:
                 'domain_type': 'unknown'
             }
     
-    def _analyze_asymptotic_behavior(self, expr) -> Dict[str, Any]:
+    def _analyze_asymptotic_behavior(self, expr, bundle: Optional[SymBundle] = None) -> Dict[str, Any]:
         """
         Analisa comportamento assintótico.
         """
         try:
+            if bundle is None:
+                bundle = _compute_symbolic_bundle(str(expr))
+            if bundle.lim_pos is None or bundle.lim_neg is None:
+                raise ValueError("Não foi possível calcular os limites no infinito")
+            
             behavior = {}
             
             # Limites no infinito
-            behavior['lim_inf'] = str(sp.limit(expr, self.x, sp.oo))
-            behavior['lim_neg_inf'] = str(sp.limit(expr, self.x, -sp.oo))
+            behavior['lim_inf'] = str(bundle.lim_pos)
+            behavior['lim_neg_inf'] = str(bundle.lim_neg)
             
             # Assíntotas verticais (verificação simplificada)
             vertical_asymptotes = []
-            if '/' in str(expr):
+            if bundle.op_counts.get('division', 0) > 0:
                 vertical_asymptotes.append("Possíveis assíntotas verticais em zeros do denominador")
             
             # Assíntotas horizontais
@@ -614,11 +1129,13 @@ class MLPredictionService:
         else:
             return 'mixed'
     
-    def _recommend_computation_strategies(self, function_str: str, features: np.ndarray) -> Dict[str, Any]:
+    def _recommend_computation_strategies(self, function_str: str, features: np.ndarray,
+                                          integration_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Recomenda estratégias computacionais baseadas na análise.
         """
-        integration_analysis = self.predict_integration_difficulty(function_str)
+        if integration_analysis is None:
+            integration_analysis = self.predict_integration_difficulty(function_str, features=features)
         
         strategies = {
             'integration': {
@@ -690,5 +1207,21 @@ class MLPredictionService:
         
         return recommendations
 
-# Instância global do serviço
-ml_prediction_service = MLPredictionService() 
\ No newline at end of file
+# Instância do serviço criada sob demanda (no lifespan da aplicação ou na primeira chamada, não na importação)
+_INSTANCIA: Optional[MLPredictionService] = None
+_INSTANCIA_LOCK = threading.Lock()
+
+def get_ml_prediction_service() -> MLPredictionService:
+    """
+    Retorna a instância compartilhada do serviço, criando-a na primeira chamada.
+    """
+    global _INSTANCIA
+    if _INSTANCIA is None:
+        with _INSTANCIA_LOCK:
+            if _INSTANCIA is None:
+                _INSTANCIA = MLPredictionService()
+    return _INSTANCIA
+
+if __name__ == "__main__":
+    # Treina e persiste os modelos: python -m app.services.ml_prediction_service
+    print(get_ml_prediction_service().treinar_modelos())
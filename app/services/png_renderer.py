@@ -0,0 +1,80 @@
+import io
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Renderizador leve de gráficos de linha (sem matplotlib) para respostas rápidas
+_MARGEM = 40
+_DIVISOES_GRADE = 10
+_COR_FUNDO = (255, 255, 255)
+_COR_GRADE = (230, 230, 230)
+_COR_EIXOS = (120, 120, 120)
+_COR_LINHA = (0, 0, 255)
+
+@lru_cache(maxsize=8)
+def _fundo(largura: int, altura: int) -> Image.Image:
+    """
+    Fundo com grade e moldura, renderizado uma vez por tamanho.
+    """
+    img = Image.new('RGB', (largura, altura), _COR_FUNDO)
+    draw = ImageDraw.Draw(img)
+    for i in range(_DIVISOES_GRADE + 1):
+        gx = _MARGEM + i * (largura - 2 * _MARGEM) / _DIVISOES_GRADE
+        gy = _MARGEM + i * (altura - 2 * _MARGEM) / _DIVISOES_GRADE
+        draw.line([(gx, _MARGEM), (gx, altura - _MARGEM)], fill=_COR_GRADE)
+        draw.line([(_MARGEM, gy), (largura - _MARGEM, gy)], fill=_COR_GRADE)
+    draw.rectangle([_MARGEM, _MARGEM, largura - _MARGEM, altura - _MARGEM], outline=_COR_EIXOS)
+    return img
+
+def _intervalo(valores: np.ndarray) -> Tuple[float, float]:
+    """
+    Intervalo [min, max] com margem de 10% (expandido quando constante).
+    """
+    v_min, v_max = float(valores.min()), float(valores.max())
+    if v_max == v_min:
+        return v_min - 1.0, v_max + 1.0
+    margem = 0.1 * (v_max - v_min)
+    return v_min - margem, v_max + margem
+
+def renderizar_grafico_png(x_vals: np.ndarray, y_vals: np.ndarray,
+                           largura: int = 768, altura: int = 512) -> bytes:
+    """
+    Rasteriza a polilinha (x, y) em PNG; valores não finitos quebram a linha.
+    """
+    x_vals = np.asarray(x_vals, dtype=float)
+    y_vals = np.asarray(y_vals, dtype=float)
+    img = _fundo(largura, altura).copy()
+    draw = ImageDraw.Draw(img)
+
+    finitos = np.isfinite(y_vals)
+    if finitos.any() and x_vals.size > 1:
+        x_min, x_max = float(x_vals.min()), float(x_vals.max())
+        y_min, y_max = _intervalo(y_vals[finitos])
+
+        # Transformação afim vetorizada para coordenadas de pixel
+        escala_x = (largura - 2 * _MARGEM) / ((x_max - x_min) or 1.0)
+        escala_y = (altura - 2 * _MARGEM) / (y_max - y_min)
+        px = _MARGEM + (x_vals - x_min) * escala_x
+        py = altura - _MARGEM - (y_vals - y_min) * escala_y
+
+        # Eixos x = 0 e y = 0 quando visíveis
+        if y_min <= 0.0 <= y_max:
+            y0 = altura - _MARGEM - (0.0 - y_min) * escala_y
+            draw.line([(_MARGEM, y0), (largura - _MARGEM, y0)], fill=_COR_EIXOS)
+        if x_min <= 0.0 <= x_max:
+            x0 = _MARGEM + (0.0 - x_min) * escala_x
+            draw.line([(x0, _MARGEM), (x0, altura - _MARGEM)], fill=_COR_EIXOS)
+
+        # Segmentos contínuos entre valores não finitos
+        pontos = np.column_stack((px, py))
+        quebras = np.flatnonzero(~finitos)
+        for segmento in np.split(pontos, quebras):
+            segmento = segmento[np.isfinite(segmento[:, 1])]
+            if len(segmento) >= 2:
+                draw.line([tuple(p) for p in segmento.tolist()], fill=_COR_LINHA, width=2)
+
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG', optimize=False)
+    return buffer.getvalue()
@@ -1,25 +1,174 @@
 import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
+import plotly.io as pio
+from plotly.colors import get_colorscale
+import orjson
 from plotly.subplots import make_subplots
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
 import sympy as sp
 from sympy import lambdify, symbols
 import base64
-import io
-import json
 from typing import Dict, List, Tuple, Optional, Any, Union
 import logging
-from scipy.interpolate import griddata
-from scipy.spatial import ConvexHull
+from functools import lru_cache
+from scipy.integrate import trapezoid
 import warnings
 
+from app.core.precompiled_surfaces import get_precompiled_surface
+
+# numba é opcional: sem ele as funções são avaliadas pelo lambdify NumPy
+try:
+    from numba import njit, prange, vectorize, float64
+    NUMBA_DISPONIVEL = True
+except ImportError:
+    NUMBA_DISPONIVEL = False
+
+# GPU (numba.cuda) é usada apenas quando presente e para grades grandes
+try:
+    from numba import cuda
+    CUDA_DISPONIVEL = cuda.is_available()
+except Exception:
+    CUDA_DISPONIVEL = False
+
+# Abaixo deste número de pontos a transferência para a GPU não compensa
+_PONTOS_MINIMOS_GPU = 27_000
+
+# Serialização do Plotly sempre via orjson
+pio.json.config.default_engine = 'orjson'
+
 # Suprimir warnings desnecessários
 warnings.filterwarnings('ignore')
 
 logger = logging.getLogger(__name__)
 
+# Strings acima deste tamanho não entram no cache de parse (limita a memória)
+_TAMANHO_MAXIMO_CACHE = 500
+
+@lru_cache(maxsize=512)
+def _parse_cacheado(funcao_normalizada: str) -> sp.Expr:
+    return sp.sympify(funcao_normalizada.replace('^', '**'))
+
+def _parse(funcao_str: str) -> sp.Expr:
+    """
+    Converte a string em expressão SymPy, memoizando pela forma normalizada.
+    """
+    funcao_normalizada = funcao_str.strip().replace(' ', '')
+    if len(funcao_normalizada) > _TAMANHO_MAXIMO_CACHE:
+        return sp.sympify(funcao_normalizada.replace('^', '**'))
+    return _parse_cacheado(funcao_normalizada)
+
+def _lambdify_cse(variaveis, expr, modules):
+    """
+    lambdify com eliminação de subexpressões comuns (SymPy >= 1.9 aceita cse=True).
+    """
+    try:
+        return lambdify(variaveis, expr, modules=modules, cse=True)
+    except TypeError:
+        return lambdify(variaveis, expr, modules=modules)
+
+@lru_cache(maxsize=512)
+def _compilar(expr: sp.Expr, variaveis: Tuple[sp.Symbol, ...], alvo: str = 'parallel'):
+    """
+    Compila a expressão uma vez: ufunc numba quando disponível (alvo 'parallel'
+    = SIMD + multithread na CPU; 'cuda' = um ponto por thread na GPU), senão
+    lambdify NumPy.
+    """
+    if NUMBA_DISPONIVEL:
+        try:
+            assinatura = float64(*(float64,) * len(variaveis))
+            return vectorize([assinatura], target=alvo)(
+                _lambdify_cse(variaveis, expr, 'math')
+            )
+        except Exception as e:
+            logger.debug(f"numba indisponível para {expr}: {str(e)}")
+    return _lambdify_cse(variaveis, expr, ['numpy'])
+
+if NUMBA_DISPONIVEL:
+    # Preenchimento escalar paralelo (uma faixa de pontos por thread)
+    @njit(parallel=True, error_model='numpy')
+    def _preencher_2(a, b, saida, func_escalar):
+        for p in prange(saida.shape[0]):
+            saida[p] = func_escalar(a[p], b[p])
+    
+    @njit(parallel=True, error_model='numpy')
+    def _preencher_3(a, b, c, saida, func_escalar):
+        for p in prange(saida.shape[0]):
+            saida[p] = func_escalar(a[p], b[p], c[p])
+    
+    _PREENCHEDORES = {2: _preencher_2, 3: _preencher_3}
+else:
+    _PREENCHEDORES = {}
+
+@lru_cache(maxsize=512)
+def _escalar_jit(func):
+    return njit(error_model='numpy')(func)
+
+def _avaliar_paralelo(func, eixos: List[np.ndarray]) -> Optional[np.ndarray]:
+    """
+    Fallback para expressões que não vetorizam: a função escalar compilada pelo
+    numba é avaliada ponto a ponto em paralelo (prange). None se numba não estiver
+    disponível ou não conseguir compilar a função.
+    """
+    preencher = _PREENCHEDORES.get(len(eixos))
+    if preencher is None:
+        return None
+    try:
+        densos = np.broadcast_arrays(*eixos)
+        planos = [np.ascontiguousarray(e, dtype=np.float64).ravel() for e in densos]
+        saida = np.empty(planos[0].shape[0])
+        preencher(*planos, saida, _escalar_jit(func))
+        return saida.reshape(densos[0].shape)
+    except Exception as e:
+        logger.debug(f"Avaliação escalar paralela indisponível: {str(e)}")
+        return None
+
+def _para_json(fig: go.Figure) -> str:
+    """
+    Serializa a figura com orjson, sem a segunda validação de schema do Plotly.
+    """
+    return pio.to_json(fig, validate=False, pretty=False, engine='orjson')
+
+@lru_cache(maxsize=1)
+def _template_padrao() -> Dict[str, Any]:
+    """
+    Template de layout que o go.Figure embutiria no JSON, extraído uma única vez.
+    """
+    return orjson.loads(_para_json(go.Figure()))['layout']['template']
+
+def _f32(valores: np.ndarray) -> np.ndarray:
+    """
+    Dados de malha em float32: metade dos bytes no JSON enviado ao navegador.
+    """
+    return np.asarray(valores, dtype=np.float32)
+
+def _array_plotly(valores: np.ndarray) -> Dict[str, str]:
+    """
+    Codificação binária (base64, float32) de arrays usada pelo Plotly no JSON da figura.
+    """
+    valores = np.ascontiguousarray(valores, dtype=np.float32)
+    codificado = {'dtype': 'f4', 'bdata': base64.b64encode(valores.tobytes()).decode('ascii')}
+    if valores.ndim > 1:
+        codificado['shape'] = ', '.join(str(n) for n in valores.shape)
+    return codificado
+
+def _figura_json(data: List[Dict[str, Any]], layout: Dict[str, Any]) -> str:
+    """
+    Serializa traces e layout já no formato do Plotly direto com orjson,
+    sem construir objetos go.* (nenhuma validação campo a campo).
+    """
+    figura = {'data': data, 'layout': {'template': _template_padrao(), **layout}}
+    return orjson.dumps(figura, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+@lru_cache(maxsize=512)
+def _compilar_gradiente(expr: sp.Expr, x: sp.Symbol, y: sp.Symbol):
+    """
+    Gradiente simbólico (já impresso como texto) e avaliador único
+    (f, ∂f/∂x, ∂f/∂y) com subexpressões compartilhadas, construídos uma vez por expressão.
+    """
+    grad_x = sp.diff(expr, x)
+    grad_y = sp.diff(expr, y)
+    gradiente_texto = (str(grad_x), str(grad_y))
+    return gradiente_texto, _lambdify_cse((x, y), (expr, grad_x, grad_y), ['numpy'])
+
 class Advanced3DVisualizationService:
     """
     Serviço avançado para visualizações 3D de funções matemáticas.
@@ -27,73 +176,177 @@ class Advanced3DVisualizationService:
     
     def __init__(self):
         self.x, self.y, self.z = symbols('x y z')
+        self.u, self.v = symbols('u v')
+    
+    @staticmethod
+    def _to_expr(function: Union[str, sp.Expr]) -> Tuple[sp.Expr, str]:
+        """
+        Retorna a expressão SymPy e sua representação textual (aceita Expr já parseada).
+        """
+        if isinstance(function, sp.Basic):
+            return function, str(function)
+        return _parse(function), function
+    
+    @staticmethod
+    def _evaluate_tiled(func, x_vals: np.ndarray, y_vals: np.ndarray, tile: int = 64) -> np.ndarray:
+        """
+        Avalia func(x, y) na grade em blocos tile x tile; Z[i, j] = func(x_vals[j], y_vals[i]).
+        Valores não finitos viram NaN.
+        """
+        Z = np.full((len(y_vals), len(x_vals)), np.nan)
+        
+        for i in range(0, len(y_vals), tile):
+            ys = y_vals[i:i + tile].reshape(-1, 1)
+            for j in range(0, len(x_vals), tile):
+                xs = x_vals[j:j + tile].reshape(1, -1)
+                block = Z[i:i + tile, j:j + tile]
+                try:
+                    with np.errstate(all='ignore'):
+                        values = func(xs, ys)
+                        if np.iscomplexobj(values):
+                            values = np.where(np.abs(values.imag) < 1e-12, values.real, np.nan)
+                        block[...] = values
+                except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+                    # Expressões não vetorizáveis: versão escalar compilada em paralelo
+                    paralelo = _avaliar_paralelo(func, [xs, ys])
+                    if paralelo is not None:
+                        block[...] = paralelo
+                        continue
+                    
+                    # Sem numba: avaliar ponto a ponto no bloco
+                    for bi in range(block.shape[0]):
+                        for bj in range(block.shape[1]):
+                            try:
+                                block[bi, bj] = float(func(xs[0, bj], ys[bi, 0]))
+                            except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+                                block[bi, bj] = np.nan
+        
+        # Tratamento em lote (uma máscara) em vez de verificações por ponto
+        Z[~np.isfinite(Z)] = np.nan
+        return Z
+    
+    @staticmethod
+    def _evaluate_grid(func, grade: List[np.ndarray], forma: Tuple[int, ...]) -> np.ndarray:
+        """
+        Avalia func sobre a grade esparsa em uma chamada (constantes são expandidas);
+        ponto a ponto apenas se a expressão não vetorizar. Falhas e valores não
+        finitos viram NaN.
+        """
+        try:
+            with np.errstate(all='ignore'):
+                valores = func(*grade)
+                if np.iscomplexobj(valores):
+                    valores = np.where(np.abs(valores.imag) < 1e-12, valores.real, np.nan)
+                valores = np.broadcast_to(np.asarray(valores, dtype=float), forma).copy()
+        except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+            valores = _avaliar_paralelo(func, grade)
+            if valores is None:
+                def avaliar_ponto(*ponto):
+                    try:
+                        return float(func(*ponto))
+                    except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+                        return np.nan
+                valores = np.vectorize(avaliar_ponto, otypes=[float])(*np.broadcast_arrays(*grade))
+        
+        valores[~np.isfinite(valores)] = np.nan
+        return valores
+    
+    @classmethod
+    def _resolucao_por_rugosidade(cls, func, x_range: Tuple[float, float],
+                                  y_range: Tuple[float, float], resolucao_maxima: int) -> int:
+        """
+        Escolhe a resolução pela curvatura medida numa grade piloto 16x16:
+        média das segundas diferenças relativa à amplitude de z.
+        """
+        piloto = cls._evaluate_tiled(
+            func, np.linspace(x_range[0], x_range[1], 16), np.linspace(y_range[0], y_range[1], 16)
+        )
+        if not np.isfinite(piloto).any():
+            return resolucao_maxima
+        
+        with np.errstate(all='ignore'):
+            amplitude = np.nanmax(piloto) - np.nanmin(piloto)
+            if amplitude == 0:
+                return min(32, resolucao_maxima)
+            curvatura = (np.nanmean(np.abs(np.diff(piloto, 2, axis=1))) +
+                         np.nanmean(np.abs(np.diff(piloto, 2, axis=0)))) / amplitude
+        
+        if not np.isfinite(curvatura):
+            return resolucao_maxima
+        if curvatura < 0.05:
+            return min(32, resolucao_maxima)
+        if curvatura < 0.2:
+            return min(50, resolucao_maxima)
+        return resolucao_maxima
+    
+    def precompilar_superficie(self, function_str: Union[str, sp.Expr]) -> None:
+        """
+        Compila o avaliador de f(x, y) usado por create_surface_plot, sem gerar a figura.
+        """
+        expr, _ = self._to_expr(function_str)
+        if get_precompiled_surface(expr) is None:
+            _compilar(expr, (self.x, self.y))
     
     def create_surface_plot(self, 
-                          function_str: str, 
+                          function_str: Union[str, sp.Expr], 
                           x_range: Tuple[float, float] = (-5, 5),
                           y_range: Tuple[float, float] = (-5, 5),
                           resolution: int = 50,
                           colorscale: str = 'viridis',
-                          title: str = None) -> Dict[str, Any]:
+                          title: str = None,
+                          adaptive: bool = True) -> Dict[str, Any]:
         """
-        Cria gráfico 3D de superfície para função de duas variáveis.
+        Cria gráfico 3D de superfície para função de duas variáveis
+        (resolution é o máximo quando adaptive=True).
         """
         try:
             # Processar função
-            expr = sp.sympify(function_str.replace('^', '**'))
-            func = lambdify((self.x, self.y), expr, modules=['numpy'])
+            expr, function_str = self._to_expr(function_str)
+            
+            # Superfícies comuns já possuem implementação NumPy pronta
+            func = get_precompiled_surface(expr)
+            if func is None:
+                func = _compilar(expr, (self.x, self.y))
+            
+            # Superfícies suaves não precisam da resolução máxima
+            if adaptive:
+                resolution = self._resolucao_por_rugosidade(func, x_range, y_range, resolution)
             
             # Criar grade de pontos
+            # (eixos 1-D: o Plotly aceita x/y vetoriais com z 2-D, sem materializar a grade)
             x_vals = np.linspace(x_range[0], x_range[1], resolution)
             y_vals = np.linspace(y_range[0], y_range[1], resolution)
-            X, Y = np.meshgrid(x_vals, y_vals)
-            
-            # Calcular valores Z com tratamento de erros
-            Z = np.zeros_like(X)
-            valid_mask = np.ones_like(X, dtype=bool)
-            
-            for i in range(resolution):
-                for j in range(resolution):
-                    try:
-                        z_val = func(X[i, j], Y[i, j])
-                        if np.isfinite(z_val) and not np.isnan(z_val):
-                            Z[i, j] = float(z_val)
-                        else:
-                            valid_mask[i, j] = False
-                    except:
-                        valid_mask[i, j] = False
-            
-            # Aplicar máscara para valores inválidos
-            Z[~valid_mask] = np.nan
-            
-            # Criar gráfico Plotly
-            fig = go.Figure(data=[go.Surface(
-                x=X, y=Y, z=Z,
-                colorscale=colorscale,
-                showscale=True,
-                hovertemplate='x: %{x}<br>y: %{y}<br>z: %{z}<extra></extra>',
-                opacity=0.9
-            )])
             
-            fig.update_layout(
-                title=title or f'Superfície: {function_str}',
-                scene=dict(
-                    xaxis_title='X',
-                    yaxis_title='Y',
-                    zaxis_title='Z',
-                    camera=dict(
-                        eye=dict(x=1.5, y=1.5, z=1.5)
-                    ),
-                    aspectmode='cube'
-                ),
-                width=800,
-                height=600,
-                font=dict(size=12)
+            # Calcular valores Z em blocos (cabem no cache L2 junto com os intermediários)
+            # (valores inválidos já chegam como NaN)
+            Z = self._evaluate_tiled(func, x_vals, y_vals)
+            valid_mask = np.isfinite(Z)
+            
+            # Gráfico Plotly montado como dicionário (mesmo JSON do go.Figure, sem validação)
+            plotly_json = _figura_json(
+                [{
+                    'type': 'surface',
+                    'x': _array_plotly(x_vals), 'y': _array_plotly(y_vals), 'z': _array_plotly(Z),
+                    'colorscale': get_colorscale(colorscale),
+                    'showscale': True,
+                    'hovertemplate': 'x: %{x}<br>y: %{y}<br>z: %{z}<extra></extra>',
+                    'opacity': 0.9
+                }],
+                {
+                    'title': {'text': title or f'Superfície: {function_str}'},
+                    'scene': {
+                        'xaxis': {'title': {'text': 'X'}},
+                        'yaxis': {'title': {'text': 'Y'}},
+                        'zaxis': {'title': {'text': 'Z'}},
+                        'camera': {'eye': {'x': 1.5, 'y': 1.5, 'z': 1.5}},
+                        'aspectmode': 'cube'
+                    },
+                    'width': 800,
+                    'height': 600,
+                    'font': {'size': 12}
+                }
             )
             
-            # Converter para JSON
-            plotly_json = fig.to_json()
-            
             # Estatísticas da superfície
             valid_z = Z[valid_mask]
             stats = {
@@ -110,6 +363,7 @@ class Advanced3DVisualizationService:
                 'plot_type': 'surface',
                 'function': function_str,
                 'statistics': stats,
+                'resolution': resolution,
                 'interactive': True
             }
             
@@ -121,7 +375,7 @@ class Advanced3DVisualizationService:
             }
     
     def create_contour_3d(self,
-                         function_str: str,
+                         function_str: Union[str, sp.Expr],
                          x_range: Tuple[float, float] = (-5, 5),
                          y_range: Tuple[float, float] = (-5, 5),
                          z_levels: int = 20,
@@ -131,22 +385,15 @@ class Advanced3DVisualizationService:
         """
         try:
             # Processar função
-            expr = sp.sympify(function_str.replace('^', '**'))
-            func = lambdify((self.x, self.y), expr, modules=['numpy'])
+            expr, function_str = self._to_expr(function_str)
+            func = _compilar(expr, (self.x, self.y))
             
             # Criar grade de pontos
             x_vals = np.linspace(x_range[0], x_range[1], resolution)
             y_vals = np.linspace(y_range[0], y_range[1], resolution)
-            X, Y = np.meshgrid(x_vals, y_vals)
             
-            # Calcular valores Z
-            Z = np.zeros_like(X)
-            for i in range(resolution):
-                for j in range(resolution):
-                    try:
-                        Z[i, j] = func(X[i, j], Y[i, j])
-                    except:
-                        Z[i, j] = np.nan
+            # Calcular valores Z (avaliação vetorizada em blocos)
+            Z = self._evaluate_tiled(func, x_vals, y_vals)
             
             # Criar subplots com contorno 2D e superfície 3D
             fig = make_subplots(
@@ -158,10 +405,11 @@ class Advanced3DVisualizationService:
             # Adicionar superfície 3D
             fig.add_trace(
                 go.Surface(
-                    x=X, y=Y, z=Z,
-                    colorscale='viridis',
+                    x=_f32(x_vals), y=_f32(y_vals), z=_f32(Z),
+                    colorscale=get_colorscale('viridis'),
                     showscale=False,
-                    opacity=0.8
+                    opacity=0.8,
+                    _validate=False
                 ),
                 row=1, col=1
             )
@@ -169,10 +417,11 @@ class Advanced3DVisualizationService:
             # Adicionar contorno 2D
             fig.add_trace(
                 go.Contour(
-                    x=x_vals, y=y_vals, z=Z,
-                    colorscale='viridis',
+                    x=_f32(x_vals), y=_f32(y_vals), z=_f32(Z),
+                    colorscale=get_colorscale('viridis'),
                     ncontours=z_levels,
-                    showscale=True
+                    showscale=True,
+                    _validate=False
                 ),
                 row=1, col=2
             )
@@ -185,7 +434,7 @@ class Advanced3DVisualizationService:
             
             return {
                 'success': True,
-                'plotly_json': fig.to_json(),
+                'plotly_json': _para_json(fig),
                 'plot_type': 'contour_3d',
                 'function': function_str,
                 'levels': z_levels
@@ -199,9 +448,9 @@ class Advanced3DVisualizationService:
             }
     
     def create_vector_field_3d(self,
-                              fx_str: str,
-                              fy_str: str, 
-                              fz_str: str,
+                              fx_str: Union[str, sp.Expr],
+                              fy_str: Union[str, sp.Expr], 
+                              fz_str: Union[str, sp.Expr],
                               x_range: Tuple[float, float] = (-3, 3),
                               y_range: Tuple[float, float] = (-3, 3),
                               z_range: Tuple[float, float] = (-3, 3),
@@ -211,51 +460,55 @@ class Advanced3DVisualizationService:
         """
         try:
             # Processar funções vetoriais
-            fx_expr = sp.sympify(fx_str.replace('^', '**'))
-            fy_expr = sp.sympify(fy_str.replace('^', '**'))
-            fz_expr = sp.sympify(fz_str.replace('^', '**'))
+            fx_expr, fx_str = self._to_expr(fx_str)
+            fy_expr, fy_str = self._to_expr(fy_str)
+            fz_expr, fz_str = self._to_expr(fz_str)
             
-            fx_func = lambdify((self.x, self.y, self.z), fx_expr, modules=['numpy'])
-            fy_func = lambdify((self.x, self.y, self.z), fy_expr, modules=['numpy'])
-            fz_func = lambdify((self.x, self.y, self.z), fz_expr, modules=['numpy'])
+            # Grades grandes vão para a GPU quando houver uma disponível
+            usar_gpu = CUDA_DISPONIVEL and density ** 3 >= _PONTOS_MINIMOS_GPU
+            alvo = 'cuda' if usar_gpu else 'parallel'
+            fx_func = _compilar(fx_expr, (self.x, self.y, self.z), alvo)
+            fy_func = _compilar(fy_expr, (self.x, self.y, self.z), alvo)
+            fz_func = _compilar(fz_expr, (self.x, self.y, self.z), alvo)
             
             # Criar grade de pontos
             x_vals = np.linspace(x_range[0], x_range[1], density)
             y_vals = np.linspace(y_range[0], y_range[1], density)
             z_vals = np.linspace(z_range[0], z_range[1], density)
-            X, Y, Z = np.meshgrid(x_vals, y_vals, z_vals)
-            
-            # Calcular componentes do campo vetorial
-            U = np.zeros_like(X)
-            V = np.zeros_like(Y)
-            W = np.zeros_like(Z)
-            
-            for i in range(density):
-                for j in range(density):
-                    for k in range(density):
-                        try:
-                            U[i, j, k] = fx_func(X[i, j, k], Y[i, j, k], Z[i, j, k])
-                            V[i, j, k] = fy_func(X[i, j, k], Y[i, j, k], Z[i, j, k])
-                            W[i, j, k] = fz_func(X[i, j, k], Y[i, j, k], Z[i, j, k])
-                        except:
-                            U[i, j, k] = V[i, j, k] = W[i, j, k] = 0
-            
-            # Achatar arrays para Plotly
-            x_flat = X.flatten()
-            y_flat = Y.flatten()
-            z_flat = Z.flatten()
-            u_flat = U.flatten()
-            v_flat = V.flatten()
-            w_flat = W.flatten()
+            # Grade esparsa: as componentes são avaliadas por broadcast
+            grade = np.meshgrid(x_vals, y_vals, z_vals, sparse=True)
+            X, Y, Z = np.broadcast_arrays(*grade)
+            if usar_gpu:
+                # Ufuncs CUDA recebem arrays densos e contíguos
+                grade = [np.ascontiguousarray(eixo) for eixo in (X, Y, Z)]
+            
+            # Calcular componentes do campo vetorial (três chamadas vetorizadas)
+            U = self._evaluate_grid(fx_func, grade, X.shape)
+            V = self._evaluate_grid(fy_func, grade, X.shape)
+            W = self._evaluate_grid(fz_func, grade, X.shape)
+            
+            # Ponto inválido em qualquer componente vira vetor nulo
+            invalidos = ~(np.isfinite(U) & np.isfinite(V) & np.isfinite(W))
+            U[invalidos] = V[invalidos] = W[invalidos] = 0
+            
+            # Achatar arrays para Plotly: a conversão para float32 já produz arrays
+            # contíguos, então ravel devolve visões (uma única cópia por array)
+            x_flat = _f32(X).ravel()
+            y_flat = _f32(Y).ravel()
+            z_flat = _f32(Z).ravel()
+            u_flat = _f32(U).ravel()
+            v_flat = _f32(V).ravel()
+            w_flat = _f32(W).ravel()
             
             # Criar gráfico de campo vetorial
             fig = go.Figure(data=go.Cone(
                 x=x_flat, y=y_flat, z=z_flat,
                 u=u_flat, v=v_flat, w=w_flat,
-                colorscale='viridis',
+                colorscale=get_colorscale('viridis'),
                 sizemode="absolute",
                 sizeref=0.3,
-                showscale=True
+                showscale=True,
+                _validate=False
             ))
             
             fig.update_layout(
@@ -272,7 +525,7 @@ class Advanced3DVisualizationService:
             
             return {
                 'success': True,
-                'plotly_json': fig.to_json(),
+                'plotly_json': _para_json(fig),
                 'plot_type': 'vector_field_3d',
                 'functions': [fx_str, fy_str, fz_str]
             }
@@ -285,9 +538,9 @@ class Advanced3DVisualizationService:
             }
     
     def create_parametric_surface(self,
-                                x_func: str,
-                                y_func: str,
-                                z_func: str,
+                                x_func: Union[str, sp.Expr],
+                                y_func: Union[str, sp.Expr],
+                                z_func: Union[str, sp.Expr],
                                 u_range: Tuple[float, float] = (0, 2*np.pi),
                                 v_range: Tuple[float, float] = (0, np.pi),
                                 resolution: int = 50) -> Dict[str, Any]:
@@ -295,42 +548,36 @@ class Advanced3DVisualizationService:
         Cria superfície paramétrica 3D.
         """
         try:
-            u, v = symbols('u v')
+            u, v = self.u, self.v
             
             # Processar funções paramétricas
-            x_expr = sp.sympify(x_func.replace('^', '**'))
-            y_expr = sp.sympify(y_func.replace('^', '**'))
-            z_expr = sp.sympify(z_func.replace('^', '**'))
+            x_expr, x_func = self._to_expr(x_func)
+            y_expr, y_func = self._to_expr(y_func)
+            z_expr, z_func = self._to_expr(z_func)
             
-            x_func_lambda = lambdify((u, v), x_expr, modules=['numpy'])
-            y_func_lambda = lambdify((u, v), y_expr, modules=['numpy'])
-            z_func_lambda = lambdify((u, v), z_expr, modules=['numpy'])
+            x_func_lambda = _compilar(x_expr, (u, v))
+            y_func_lambda = _compilar(y_expr, (u, v))
+            z_func_lambda = _compilar(z_expr, (u, v))
             
             # Criar grade paramétrica
             u_vals = np.linspace(u_range[0], u_range[1], resolution)
             v_vals = np.linspace(v_range[0], v_range[1], resolution)
-            U, V = np.meshgrid(u_vals, v_vals)
+            # Calcular coordenadas (U[i, j] = u_vals[j], V[i, j] = v_vals[i])
+            X = self._evaluate_tiled(x_func_lambda, u_vals, v_vals)
+            Y = self._evaluate_tiled(y_func_lambda, u_vals, v_vals)
+            Z = self._evaluate_tiled(z_func_lambda, u_vals, v_vals)
             
-            # Calcular coordenadas
-            X = np.zeros_like(U)
-            Y = np.zeros_like(U)
-            Z = np.zeros_like(U)
-            
-            for i in range(resolution):
-                for j in range(resolution):
-                    try:
-                        X[i, j] = x_func_lambda(U[i, j], V[i, j])
-                        Y[i, j] = y_func_lambda(U[i, j], V[i, j])
-                        Z[i, j] = z_func_lambda(U[i, j], V[i, j])
-                    except:
-                        X[i, j] = Y[i, j] = Z[i, j] = np.nan
+            # Ponto inválido em qualquer coordenada invalida o ponto inteiro
+            invalidos = np.isnan(X) | np.isnan(Y) | np.isnan(Z)
+            X[invalidos] = Y[invalidos] = Z[invalidos] = np.nan
             
             # Criar gráfico
             fig = go.Figure(data=[go.Surface(
-                x=X, y=Y, z=Z,
-                colorscale='plasma',
+                x=_f32(X), y=_f32(Y), z=_f32(Z),
+                colorscale=get_colorscale('plasma'),
                 showscale=True,
-                opacity=0.9
+                opacity=0.9,
+                _validate=False
             )])
             
             fig.update_layout(
@@ -347,7 +594,7 @@ class Advanced3DVisualizationService:
             
             return {
                 'success': True,
-                'plotly_json': fig.to_json(),
+                'plotly_json': _para_json(fig),
                 'plot_type': 'parametric_surface',
                 'functions': [x_func, y_func, z_func],
                 'parameters': ['u', 'v']
@@ -360,8 +607,30 @@ class Advanced3DVisualizationService:
                 'error': f"Erro ao gerar superfície paramétrica: {str(e)}"
             }
     
+    @staticmethod
+    def _paredes_volume(x_vals: np.ndarray, y_vals: np.ndarray, Z: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Vértices e triângulos (i, j, k) das paredes entre z = 0 e a superfície
+        ao longo do contorno da região (y mín., x máx., y máx., x mín.).
+        """
+        px = np.concatenate((x_vals, np.full_like(y_vals, x_vals[-1]), x_vals[::-1], np.full_like(y_vals, x_vals[0])))
+        py = np.concatenate((np.full_like(x_vals, y_vals[0]), y_vals, np.full_like(x_vals, y_vals[-1]), y_vals[::-1]))
+        pz = np.concatenate((Z[0, :], Z[:, -1], Z[-1, ::-1], Z[::-1, 0]))
+        
+        # Vértices 0..n-1 na base (z = 0) e n..2n-1 no topo; cada quadrilátero vira dois triângulos
+        n = len(px)
+        base = np.arange(n - 1)
+        return {
+            'x': _f32(np.concatenate((px, px))),
+            'y': _f32(np.concatenate((py, py))),
+            'z': _f32(np.concatenate((np.zeros(n), pz))),
+            'i': np.concatenate((base, base)),
+            'j': np.concatenate((base + 1, base + n + 1)),
+            'k': np.concatenate((base + n + 1, base + n)),
+        }
+    
     def create_integration_volume_3d(self,
-                                   function_str: str,
+                                   function_str: Union[str, sp.Expr],
                                    x_range: Tuple[float, float],
                                    y_range: Tuple[float, float],
                                    show_volume: bool = True,
@@ -371,60 +640,41 @@ class Advanced3DVisualizationService:
         """
         try:
             # Processar função
-            expr = sp.sympify(function_str.replace('^', '**'))
-            func = lambdify((self.x, self.y), expr, modules=['numpy'])
+            expr, function_str = self._to_expr(function_str)
+            func = _compilar(expr, (self.x, self.y))
             
             # Criar grade de pontos
             x_vals = np.linspace(x_range[0], x_range[1], resolution)
             y_vals = np.linspace(y_range[0], y_range[1], resolution)
-            X, Y = np.meshgrid(x_vals, y_vals)
             
-            # Calcular valores Z
-            Z = np.zeros_like(X)
-            for i in range(resolution):
-                for j in range(resolution):
-                    try:
-                        z_val = func(X[i, j], Y[i, j])
-                        Z[i, j] = max(0, float(z_val))  # Apenas valores positivos para volume
-                    except:
-                        Z[i, j] = 0
+            # Calcular valores Z (apenas valores positivos para volume; inválidos viram 0)
+            Z = self._evaluate_tiled(func, x_vals, y_vals)
+            Z = np.where(np.isnan(Z), 0.0, np.maximum(Z, 0.0))
             
             fig = go.Figure()
             
             # Adicionar superfície
             fig.add_trace(go.Surface(
-                x=X, y=Y, z=Z,
-                colorscale='Blues',
+                x=_f32(x_vals), y=_f32(y_vals), z=_f32(Z),
+                colorscale=get_colorscale('Blues'),
                 opacity=0.7,
                 name='f(x,y)',
-                showscale=True
+                showscale=True,
+                _validate=False
             ))
             
             if show_volume:
-                # Criar "paredes" do volume
-                # Parede frontal (y mínimo)
-                y_min = np.full_like(X[0, :], y_range[0])
-                x_front = X[0, :]
-                z_front_top = Z[0, :]
-                z_front_bottom = np.zeros_like(z_front_top)
-                
-                # Criar mesh para parede frontal
-                for i in range(len(x_front)-1):
-                    x_wall = [x_front[i], x_front[i+1], x_front[i+1], x_front[i]]
-                    y_wall = [y_min[i], y_min[i+1], y_min[i+1], y_min[i]]
-                    z_wall = [z_front_bottom[i], z_front_bottom[i+1], z_front_top[i+1], z_front_top[i]]
-                    
-                    fig.add_trace(go.Mesh3d(
-                        x=x_wall, y=y_wall, z=z_wall,
-                        color='lightblue',
-                        opacity=0.3,
-                        showscale=False
-                    ))
-            
-            # Calcular volume aproximado
-            dx = (x_range[1] - x_range[0]) / resolution
-            dy = (y_range[1] - y_range[0]) / resolution
-            volume = np.sum(Z) * dx * dy
+                # "Paredes" do volume nas quatro bordas, em um único Mesh3d triangulado
+                fig.add_trace(go.Mesh3d(
+                    **self._paredes_volume(x_vals, y_vals, Z),
+                    color='lightblue',
+                    opacity=0.3,
+                    showscale=False,
+                    _validate=False
+                ))
+            
+            # Calcular volume aproximado (regra do trapézio nas duas direções)
+            volume = trapezoid(trapezoid(Z, x_vals, axis=1), y_vals)
             
             fig.update_layout(
                 title=f'Volume sob f(x,y) = {function_str}<br>Volume ≈ {volume:.4f}',
@@ -440,7 +690,7 @@ class Advanced3DVisualizationService:
             
             return {
                 'success': True,
-                'plotly_json': fig.to_json(),
+                'plotly_json': _para_json(fig),
                 'plot_type': 'integration_volume',
                 'function': function_str,
                 'volume_approximation': float(volume),
@@ -458,7 +708,7 @@ class Advanced3DVisualizationService:
             }
     
     def create_gradient_field(self,
-                            function_str: str,
+                            function_str: Union[str, sp.Expr],
                             x_range: Tuple[float, float] = (-3, 3),
                             y_range: Tuple[float, float] = (-3, 3),
                             density: int = 15) -> Dict[str, Any]:
@@ -467,32 +717,34 @@ class Advanced3DVisualizationService:
         """
         try:
             # Processar função e calcular gradiente
-            expr = sp.sympify(function_str.replace('^', '**'))
-            grad_x = sp.diff(expr, self.x)
-            grad_y = sp.diff(expr, self.y)
-            
-            func = lambdify((self.x, self.y), expr, modules=['numpy'])
-            grad_x_func = lambdify((self.x, self.y), grad_x, modules=['numpy'])
-            grad_y_func = lambdify((self.x, self.y), grad_y, modules=['numpy'])
+            expr, function_str = self._to_expr(function_str)
+            gradiente_texto, fused_func = _compilar_gradiente(expr, self.x, self.y)
             
             # Criar grade de pontos
             x_vals = np.linspace(x_range[0], x_range[1], density)
             y_vals = np.linspace(y_range[0], y_range[1], density)
-            X, Y = np.meshgrid(x_vals, y_vals)
+            X, Y = np.meshgrid(x_vals, y_vals, sparse=True)
+            forma = (density, density)
             
             # Calcular valores da função e gradiente
-            Z = np.zeros_like(X)
-            U = np.zeros_like(X)  # Componente x do gradiente
-            V = np.zeros_like(X)  # Componente y do gradiente
-            
-            for i in range(density):
-                for j in range(density):
-                    try:
-                        Z[i, j] = func(X[i, j], Y[i, j])
-                        U[i, j] = grad_x_func(X[i, j], Y[i, j])
-                        V[i, j] = grad_y_func(X[i, j], Y[i, j])
-                    except:
-                        Z[i, j] = U[i, j] = V[i, j] = 0
+            # (U, V = componentes x e y do gradiente; constantes são expandidas para a grade)
+            try:
+                with np.errstate(all='ignore'):
+                    Z, U, V = (
+                        np.broadcast_to(np.asarray(valores, dtype=float), forma).copy()
+                        for valores in fused_func(X, Y)
+                    )
+            except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+                # Expressões não vetorizáveis: avaliar ponto a ponto
+                Z = np.zeros(forma)
+                U = np.zeros(forma)
+                V = np.zeros(forma)
+                for i in range(density):
+                    for j in range(density):
+                        try:
+                            Z[i, j], U[i, j], V[i, j] = fused_func(x_vals[j], y_vals[i])
+                        except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+                            Z[i, j] = U[i, j] = V[i, j] = 0
             
             # Criar subplots
             fig = make_subplots(
@@ -504,28 +756,40 @@ class Advanced3DVisualizationService:
             # Adicionar superfície 3D
             fig.add_trace(
                 go.Surface(
-                    x=X, y=Y, z=Z,
-                    colorscale='viridis',
+                    x=_f32(x_vals), y=_f32(y_vals), z=_f32(Z),
+                    colorscale=get_colorscale('viridis'),
                     showscale=False,
-                    opacity=0.8
+                    opacity=0.8,
+                    _validate=False
                 ),
                 row=1, col=1
             )
             
-            # Adicionar campo vetorial 2D (gradiente)
-            for i in range(0, density, 2):
-                for j in range(0, density, 2):
-                    if np.isfinite(U[i, j]) and np.isfinite(V[i, j]):
-                        fig.add_trace(
-                            go.Scatter(
-                                x=[X[i, j], X[i, j] + U[i, j] * 0.2],
-                                y=[Y[i, j], Y[i, j] + V[i, j] * 0.2],
-                                mode='lines',
-                                line=dict(color='red', width=2),
-                                showlegend=False
-                            ),
-                            row=1, col=2
-                        )
+            # Adicionar campo vetorial 2D (gradiente): um único trace com
+            # segmentos separados por NaN, um a cada dois pontos da grade
+            U_sel, V_sel = U[::2, ::2], V[::2, ::2]
+            X_sel, Y_sel = np.meshgrid(x_vals[::2], y_vals[::2])
+            validos = np.isfinite(U_sel) & np.isfinite(V_sel)
+            n_setas = int(validos.sum())
+            
+            xs = np.full(3 * n_setas, np.nan)
+            ys = np.full(3 * n_setas, np.nan)
+            xs[0::3] = X_sel[validos]
+            xs[1::3] = X_sel[validos] + U_sel[validos] * 0.2
+            ys[0::3] = Y_sel[validos]
+            ys[1::3] = Y_sel[validos] + V_sel[validos] * 0.2
+            
+            fig.add_trace(
+                go.Scatter(
+                    x=_f32(xs),
+                    y=_f32(ys),
+                    mode='lines',
+                    line=dict(color='red', width=2),
+                    showlegend=False,
+                    _validate=False
+                ),
+                row=1, col=2
+            )
             
             fig.update_layout(
                 title=f'Campo Gradiente: ∇({function_str})',
@@ -535,10 +799,10 @@ class Advanced3DVisualizationService:
             
             return {
                 'success': True,
-                'plotly_json': fig.to_json(),
+                'plotly_json': _para_json(fig),
                 'plot_type': 'gradient_field',
                 'function': function_str,
-                'gradient': [str(grad_x), str(grad_y)]
+                'gradient': list(gradiente_texto)
             }
             
         except Exception as e:
@@ -1,5 +1,6 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from datetime import datetime
 import uvicorn
 import os
@@ -8,14 +9,29 @@ from app.routers import health, area, simbolico, derivada, limite, validar, exem
 from app.core.config import settings
 from app.core.logging_config import setup_logging
 from app.core.security_middleware import security_middleware
+from app.core.executor import iniciar_pool, encerrar_pool, iniciar_pool_processos, encerrar_pool_processos
+from app.services.ml_prediction_service import get_ml_prediction_service
 
 # Configurar logging
 setup_logging(debug=settings.debug, log_file="logs/integramente.log" if not settings.debug else None)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pools de cálculo criados na inicialização e encerrados no desligamento
+    iniciar_pool()
+    iniciar_pool_processos()
+    # Consumidores do micro-batching de predições presos ao loop da aplicação
+    get_ml_prediction_service().iniciar_lotes()
+    yield
+    get_ml_prediction_service().encerrar_lotes()
+    encerrar_pool_processos()
+    encerrar_pool()
+
 app = FastAPI(
     title="IntegraMente Backend API Otimizado",
     description="Backend matemático avançado com cache, monitoramento, alta precisão e segurança",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Configuração CORS para Flutter
@@ -3,60 +3,97 @@
 Script de teste para validar os endpoints da API IntegraMente
 """
 
-import requests
-import json
+import asyncio
+import aiohttp
+import orjson
 from datetime import datetime
+from typing import Any, Dict, Tuple
 
 BASE_URL = "http://localhost:8000"
 
-def test_health():
+# Limite do pool da sessão única compartilhada pelos testes concorrentes
+POOL_CONEXOES = 20
+
+def _orjson_dumps(obj: Any) -> str:
+    """Serializador JSON (orjson) usado pela sessão aiohttp"""
+    return orjson.dumps(obj).decode()
+
+# GETs idempotentes memoizados por URL durante a execução (tasks compartilhadas
+# também deduplicam chamadas simultâneas); limpar com cached_get_clear()
+_CACHE_GET: Dict[str, asyncio.Task] = {}
+
+async def _get_json(session, url: str) -> Tuple[int, Any]:
+    async with session.get(url) as response:
+        return response.status, await response.json(loads=orjson.loads)
+
+async def cached_get(session, url: str) -> Tuple[int, Any]:
+    """GET memoizado por URL; retorna (status, json)"""
+    tarefa = _CACHE_GET.get(url)
+    if tarefa is None:
+        tarefa = _CACHE_GET[url] = asyncio.ensure_future(_get_json(session, url))
+    try:
+        status, data = await asyncio.shield(tarefa)
+    except Exception:
+        _CACHE_GET.pop(url, None)
+        raise
+    if status != 200:
+        # Só respostas bem-sucedidas permanecem em cache
+        _CACHE_GET.pop(url, None)
+    return status, data
+
+def cached_get_clear():
+    """Invalida o cache de GETs (entre suítes)"""
+    _CACHE_GET.clear()
+
+async def test_health(session):
     """Testa o endpoint de health check"""
     print("🔍 Testando Health Check...")
     try:
-        response = requests.get(f"{BASE_URL}/health")
-        print(f"Status: {response.status_code}")
-        print(f"Resposta: {response.json()}")
-        return response.status_code == 200
+        status, data = await cached_get(session, f"{BASE_URL}/health")
+        print(f"Status: {status}")
+        print(f"Resposta: {data}")
+        return status == 200
     except Exception as e:
         print(f"❌ Erro: {e}")
         return False
 
-def test_validar():
+async def test_validar(session):
     """Testa o endpoint de validação"""
     print("\n🔍 Testando Validação de Função...")
     
     # Teste função válida
     data = {"funcao": "x^2 + 3*x"}
     try:
-        response = requests.post(f"{BASE_URL}/validar", json=data)
-        print(f"Status: {response.status_code}")
-        print(f"Função válida - Resposta: {response.json()}")
+        async with session.post(f"{BASE_URL}/validar", json=data) as response:
+            resultado = await response.json(loads=orjson.loads)
+        print(f"Status: {response.status}")
+        print(f"Função válida - Resposta: {resultado}")
     except Exception as e:
         print(f"❌ Erro: {e}")
     
     # Teste função inválida
     data = {"funcao": "x^&invalid"}
     try:
-        response = requests.post(f"{BASE_URL}/validar", json=data)
-        print(f"Função inválida - Resposta: {response.json()}")
+        async with session.post(f"{BASE_URL}/validar", json=data) as response:
+            resultado = await response.json(loads=orjson.loads)
+        print(f"Função inválida - Resposta: {resultado}")
     except Exception as e:
         print(f"❌ Erro: {e}")
 
-def test_exemplos():
+async def test_exemplos(session):
     """Testa o endpoint de exemplos"""
     print("\n🔍 Testando Exemplos...")
     try:
-        response = requests.get(f"{BASE_URL}/exemplos")
-        print(f"Status: {response.status_code}")
-        data = response.json()
+        status, data = await cached_get(session, f"{BASE_URL}/exemplos")
+        print(f"Status: {status}")
         print(f"Total de exemplos: {data['total']}")
         print(f"Categorias: {list(data['exemplos'].keys())}")
-        return response.status_code == 200
+        return status == 200
     except Exception as e:
         print(f"❌ Erro: {e}")
         return False
 
-def test_simbolico():
+async def test_simbolico(session):
     """Testa o endpoint de cálculo simbólico"""
     print("\n🔍 Testando Cálculo Simbólico...")
     
@@ -67,9 +104,9 @@ def test_simbolico():
         "formato_latex": True
     }
     try:
-        response = requests.post(f"{BASE_URL}/simbolico", json=data)
-        print(f"Status: {response.status_code}")
-        result = response.json()
+        async with session.post(f"{BASE_URL}/simbolico", json=data) as response:
+            result = await response.json(loads=orjson.loads)
+        print(f"Status: {response.status}")
         if result.get("sucesso"):
             print(f"Antiderivada: {result.get('antiderivada')}")
             print(f"LaTeX: {result.get('antiderivada_latex')}")
@@ -78,7 +115,7 @@ def test_simbolico():
     except Exception as e:
         print(f"❌ Erro: {e}")
 
-def test_area():
+async def test_area(session):
     """Testa o endpoint de cálculo de área"""
     print("\n🔍 Testando Cálculo de Área...")
     
@@ -89,9 +126,9 @@ def test_area():
         "resolucao": 100  # Resolução menor para teste
     }
     try:
-        response = requests.post(f"{BASE_URL}/area", json=data)
-        print(f"Status: {response.status_code}")
-        result = response.json()
+        async with session.post(f"{BASE_URL}/area", json=data) as response:
+            result = await response.json(loads=orjson.loads)
+        print(f"Status: {response.status}")
         if result.get("sucesso"):
             print(f"Valor da integral: {result.get('valor_integral')}")
             print(f"Área total: {result.get('area_total')}")
@@ -102,8 +139,8 @@ def test_area():
     except Exception as e:
         print(f"❌ Erro: {e}")
 
-def main():
-    """Executa todos os testes"""
+async def main():
+    """Executa todos os testes concorrentemente"""
     print("🚀 Iniciando testes da API IntegraMente")
     print(f"Base URL: {BASE_URL}")
     print("=" * 50)
@@ -117,14 +154,16 @@ def main():
         test_area
     ]
     
-    results = []
-    for test in tests:
-        try:
-            result = test()
-            results.append(result)
-        except Exception as e:
-            print(f"❌ Erro no teste {test.__name__}: {e}")
-            results.append(False)
+    # Testes independentes: o tempo total passa a ser o do teste mais lento
+    connector = aiohttp.TCPConnector(limit=POOL_CONEXOES)
+    async with aiohttp.ClientSession(connector=connector, json_serialize=_orjson_dumps) as session:
+        results = await asyncio.gather(*[test(session) for test in tests], return_exceptions=True)
+    cached_get_clear()
+    
+    for test, result in zip(tests, results):
+        if isinstance(result, Exception):
+            print(f"❌ Erro no teste {test.__name__}: {result}")
+    results = [False if isinstance(r, Exception) else r for r in results]
     
     print("\n" + "=" * 50)
     print("📊 Resumo dos Testes:")
@@ -137,4 +176,4 @@ def main():
         print("⚠️  Alguns testes falharam. Verifique os logs acima.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file